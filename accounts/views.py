@@ -7,6 +7,7 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib import messages
 from core.utils.lang import load_translation
+from orders.guest_cart import merge_guest_cart
 import json
 
 
@@ -41,7 +42,10 @@ def login_user(request):
         if form.is_valid():
             user = form.get_user()
             login(request, user)
-            return redirect('profile')
+            response = redirect('profile')
+            # El carrito que armó como visitante pasa a su carrito guardado
+            merge_guest_cart(request, response, user)
+            return response
     else:
         form = LoginForm()
     return render(request, 'accounts/login.html', {'form': form})
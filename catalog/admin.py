@@ -1,4 +1,8 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.core.exceptions import ValidationError
+from django.template.response import TemplateResponse
+from .forms import ProductAdjustmentForm
 from .models import Collection, Category, Product
 
 @admin.register(Collection)
@@ -21,5 +25,38 @@ class CategoryAdmin(admin.ModelAdmin):
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'collection', 'category', 'price', 'stock', 'is_active')
     list_filter = ('collection', 'category', 'is_active')
+    list_select_related = ('collection', 'category')
     search_fields = ('name', 'description')
     list_editable = ('price', 'stock', 'is_active')
+    actions = ['adjust_price_and_stock']
+
+    @admin.action(description='Adjust price and stock of selected products')
+    def adjust_price_and_stock(self, request, queryset):
+        """Ask for the change, then apply it to every selected product in one UPDATE"""
+        form = ProductAdjustmentForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            try:
+                rows = queryset.adjust(**form.cleaned_data)
+            except ValidationError as error:
+                form.add_error(None, error.messages)
+            else:
+                self.message_user(request, f'Updated price and stock of {rows} products', messages.SUCCESS)
+                return None
+
+        # "Seleccionar todo" aplica el cambio al filtro completo del listado
+        select_across = request.POST.get('select_across') == '1'
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Adjust price and stock',
+            'opts': self.model._meta,
+            'form': form,
+            'count': queryset.count(),
+            # El admin solo despacha la acción si llega algún _selected_action, como en delete_selected
+            'selected': (
+                request.POST.getlist(helpers.ACTION_CHECKBOX_NAME) if select_across
+                else queryset.values_list('pk', flat=True)
+            ),
+            'select_across': select_across,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(request, 'admin/catalog/product/adjust_price_and_stock.html', context)
@@ -0,0 +1,124 @@
+"""
+Listing backends for the shop, collection pages and products API.
+
+A backend answers "which active products match these ShopFilters, in which
+order" plus the sidebar data. The one used by the views is selected with
+``settings.CATALOG_LISTING_BACKEND``:
+
+- ``catalog.backends.ORMBackend`` builds SQL queries (default).
+- ``catalog.backends.SnapshotBackend`` answers from the in-memory catalog
+  snapshot without touching the database; full-text searches still go
+  through the ORM backend because they need the FTS index.
+- ``catalog.backends.NumpyBackend`` answers from a columnar (NumPy) view of
+  the same snapshot: filters are boolean masks and sorts precomputed
+  permutations. Searches fall back to the ORM backend as well.
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .columnar import get_columnar
+from .facets import count_facets, get_facets
+from .models import Category, Collection, Product
+from .pagination import DEFAULT_PAGE_SIZE, SORT_ORDERS, paginate
+from .snapshot import get_snapshot
+
+# Relations joined by default so templates and the API never query per product
+RELATED = ('category', 'collection')
+
+
+class ORMBackend:
+    """Answers listings with database queries"""
+
+    def queryset(self, filters, only=None, related=RELATED):
+        """
+        Active products matching ``filters``.
+
+        ``only`` restricts the loaded columns and ``related`` the joined
+        relations; in-memory backends ignore both since their products are
+        already fully loaded.
+        """
+        products = Product.objects.filter(is_active=True)
+        if related:
+            products = products.select_related(*related)
+        if only is not None:
+            products = products.only(*only)
+        return filters.apply(products)
+
+    def listing(self, filters, only=None, related=RELATED):
+        return self.queryset(filters, only, related).order_by(*SORT_ORDERS[filters.sort])
+
+    def page(self, filters, cursor=None, limit=DEFAULT_PAGE_SIZE, only=None, related=RELATED):
+        return paginate(self.queryset(filters, only, related), filters.sort, cursor, limit)
+
+    def facets(self, filters):
+        return get_facets(filters)
+
+    def categories(self):
+        return list(Category.objects.all())
+
+    def collections(self):
+        return list(Collection.objects.all())
+
+    def collection(self, collection_id):
+        try:
+            return Collection.objects.get(id=collection_id)
+        except Collection.DoesNotExist:
+            return None
+
+
+class SnapshotBackend(ORMBackend):
+    """Answers listings from the process-local catalog snapshot"""
+
+    def listing(self, filters, only=None, related=RELATED):
+        if filters.search:
+            return super().listing(filters, only, related)
+        return get_snapshot().listing(filters)
+
+    def page(self, filters, cursor=None, limit=DEFAULT_PAGE_SIZE, only=None, related=RELATED):
+        if filters.search:
+            return super().page(filters, cursor, limit, only, related)
+        return get_snapshot().page(filters, cursor, limit)
+
+    def facets(self, filters):
+        if filters.search:
+            return super().facets(filters)
+        return count_facets(get_snapshot().listing(filters))
+
+    def categories(self):
+        return list(get_snapshot().categories)
+
+    def collections(self):
+        return list(get_snapshot().collections)
+
+    def collection(self, collection_id):
+        return get_snapshot().collections_by_id.get(collection_id)
+
+
+class NumpyBackend(SnapshotBackend):
+    """Answers listings from the columnar view of the catalog snapshot"""
+
+    def listing(self, filters, only=None, related=RELATED):
+        if filters.search:
+            return super().listing(filters, only, related)
+        return get_columnar().listing(filters)
+
+    def page(self, filters, cursor=None, limit=DEFAULT_PAGE_SIZE, only=None, related=RELATED):
+        if filters.search:
+            return super().page(filters, cursor, limit, only, related)
+        return get_columnar().page(filters, cursor, limit)
+
+    def facets(self, filters):
+        if filters.search:
+            return super().facets(filters)
+        return get_columnar().facets(filters)
+
+
+_backends = {}
+
+
+def get_backend():
+    """Return the listing backend configured in settings.CATALOG_LISTING_BACKEND"""
+    path = settings.CATALOG_LISTING_BACKEND
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
@@ -0,0 +1,41 @@
+"""
+System checks for the catalog version and the in-memory listing backends.
+
+Both depend on the catalog version kept in the default cache (see
+catalog.versioning), which must be shared by every worker.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.utils.module_loading import import_string
+
+from core.checks import default_cache_is_per_process
+
+
+@register(Tags.caches)
+def check_listing_backend(app_configs, **kwargs):
+    from .backends import SnapshotBackend
+
+    if settings.DEBUG or not default_cache_is_per_process():
+        return []
+    if issubclass(import_string(settings.CATALOG_LISTING_BACKEND), SnapshotBackend):
+        return [Error(
+            f'{settings.CATALOG_LISTING_BACKEND} needs a catalog version shared by every '
+            'worker, but the default cache is per-process: other workers would keep '
+            'serving their old snapshot after a catalog write.',
+            hint='Use a shared cache backend (Redis or Memcached) for CACHES["default"], '
+                 'or catalog.backends.ORMBackend.',
+            id='catalog.E001',
+        )]
+    return []
+
+
+@register(Tags.caches, deploy=True)
+def check_catalog_version_cache(app_configs, **kwargs):
+    if default_cache_is_per_process():
+        return [Warning(
+            'The catalog version is stored in a per-process cache; with several workers '
+            'ETags, 304 responses and cached API bodies go stale after catalog writes.',
+            hint='Use a shared cache backend (Redis or Memcached) for CACHES["default"].',
+            id='catalog.W001',
+        )]
+    return []
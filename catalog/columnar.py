@@ -0,0 +1,200 @@
+"""
+Columnar (NumPy) view of the catalog snapshot.
+
+Every active product of a ``CatalogSnapshot`` becomes one row of a set of
+parallel arrays (id, price in cents, stock, category id, collection id,
+created_at in microseconds and the rank of its name). Shop filters are
+evaluated as boolean masks over those arrays and every sort is a permutation
+computed once with ``argsort``, so a listing is a couple of vector operations
+instead of a Python loop or a SQL query.
+
+Like the snapshot it is built from, a columnar view is read-only and shared
+between requests and threads.
+"""
+import calendar
+import math
+import threading
+from bisect import bisect_left
+
+import numpy as np
+
+from .facets import PRICE_BUCKETS
+from .models import Product
+from .pagination import SORT_ORDERS, CursorPage, decode_cursor, encode_cursor
+from .snapshot import get_snapshot
+
+_lock = threading.Lock()
+_columnar = None
+
+# Las filas sin categoría o colección guardan este valor
+NO_PARENT = -1
+
+
+def _cents(price):
+    return int(price * 100)
+
+
+def _micros(value):
+    # Aritmética entera: float pierde microsegundos con fechas actuales
+    return calendar.timegm(value.utctimetuple()) * 10 ** 6 + value.microsecond
+
+
+class ColumnarCatalog:
+    """Arrays, masks and precomputed orders over one catalog snapshot"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.version = snapshot.version
+        products = snapshot.products
+
+        self.names = sorted({product.name for product in products})
+        name_rank = {name: rank for rank, name in enumerate(self.names)}
+
+        self.ids = np.array([product.id for product in products], dtype=np.int64)
+        self.price = np.array([_cents(product.price) for product in products], dtype=np.int64)
+        self.stock = np.array([product.stock for product in products], dtype=np.int64)
+        self.category = np.array(
+            [NO_PARENT if product.category_id is None else product.category_id for product in products],
+            dtype=np.int64,
+        )
+        self.collection = np.array(
+            [NO_PARENT if product.collection_id is None else product.collection_id for product in products],
+            dtype=np.int64,
+        )
+        self.created_at = np.array([_micros(product.created_at) for product in products], dtype=np.int64)
+        self.name_rank = np.array([name_rank[product.name] for product in products], dtype=np.int64)
+
+        self.columns = {
+            'id': self.ids,
+            'name': self.name_rank,
+            'price': self.price,
+            'created_at': self.created_at,
+        }
+
+        # np.lexsort ordena por la última clave; el id desempata. Los órdenes
+        # descendentes son los ascendentes invertidos porque el id es único.
+        by_name = np.lexsort((self.ids, self.name_rank))
+        by_price = np.lexsort((self.ids, self.price))
+        by_created = np.lexsort((self.ids, self.created_at))
+        self.orders = {
+            'name': by_name,
+            'price_low': by_price,
+            'price_high': by_price[::-1].copy(),
+            'oldest': by_created,
+            'newest': by_created[::-1].copy(),
+        }
+        for order in self.orders.values():
+            order.flags.writeable = False
+
+        self.bucket_bounds = np.array([_cents(bound) for bound in PRICE_BUCKETS], dtype=np.int64)
+
+    def mask(self, filters):
+        """Boolean mask of the rows matching ``filters`` (search is not supported)"""
+        mask = np.ones(len(self.ids), dtype=bool)
+        if filters.category is not None:
+            mask &= self.category == filters.category
+        if filters.collection is not None:
+            mask &= self.collection == filters.collection
+        if filters.min_price is not None:
+            mask &= self.price >= math.ceil(filters.min_price * 100)
+        if filters.max_price is not None:
+            mask &= self.price <= math.floor(filters.max_price * 100)
+        if filters.stock == 'in_stock':
+            mask &= self.stock > 0
+        elif filters.stock == 'out_of_stock':
+            mask &= self.stock == 0
+        return mask
+
+    def _cursor_value(self, field, value):
+        """Map a decoded cursor value onto the scale of its column"""
+        value = Product._meta.get_field(field).to_python(value)
+        if field == 'name':
+            # Un nombre que ya no existe cae entre dos rangos consecutivos
+            rank = bisect_left(self.names, value)
+            if rank < len(self.names) and self.names[rank] == value:
+                return rank
+            return rank - 0.5
+        if field == 'price':
+            return float(value * 100)
+        if field == 'created_at':
+            return _micros(value)
+        return value
+
+    def after(self, sort, cursor):
+        """Boolean mask of the rows that come after ``cursor`` in ``sort`` order"""
+        ordering = SORT_ORDERS[sort]
+        values = decode_cursor(cursor, sort)
+        after = np.zeros(len(self.ids), dtype=bool)
+        equal = np.ones(len(self.ids), dtype=bool)
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            column = self.columns[name]
+            value = self._cursor_value(name, value)
+            beyond = column < value if field.startswith('-') else column > value
+            after |= equal & beyond
+            equal &= column == value
+        return after
+
+    def rows(self, filters, cursor=None):
+        """Row indexes matching ``filters`` in ``filters.sort`` order"""
+        mask = self.mask(filters)
+        if cursor:
+            mask &= self.after(filters.sort, cursor)
+        order = self.orders[filters.sort]
+        return order[mask[order]]
+
+    def listing(self, filters):
+        products = self.snapshot.products
+        return [products[row] for row in self.rows(filters).tolist()]
+
+    def page(self, filters, cursor=None, limit=None):
+        """Keyset page over ``listing(filters)``, with the same cursors as the ORM"""
+        rows = self.rows(filters, cursor)
+        if limit is not None:
+            rows = rows[:limit + 1]
+        products = [self.snapshot.products[row] for row in rows.tolist()]
+
+        next_cursor = None
+        if limit is not None and len(products) > limit:
+            products = products[:limit]
+            last = products[-1]
+            next_cursor = encode_cursor(
+                filters.sort, [getattr(last, field.lstrip('-')) for field in SORT_ORDERS[filters.sort]]
+            )
+        return CursorPage(products, next_cursor)
+
+    def facets(self, filters):
+        """Same counts as catalog.facets.count_facets, computed on the arrays"""
+        mask = self.mask(filters)
+        stock = self.stock[mask]
+        in_stock = int(np.count_nonzero(stock > 0))
+        buckets = np.bincount(
+            np.searchsorted(self.bucket_bounds, self.price[mask], side='right'),
+            minlength=len(PRICE_BUCKETS) + 1,
+        )
+        return {
+            'total': len(stock),
+            'categories': self._counts(self.category[mask]),
+            'collections': self._counts(self.collection[mask]),
+            'stock': {'in_stock': in_stock, 'out_of_stock': len(stock) - in_stock},
+            'price_buckets': buckets.tolist(),
+        }
+
+    def _counts(self, values):
+        ids, counts = np.unique(values[values != NO_PARENT], return_counts=True)
+        return dict(zip(ids.tolist(), counts.tolist()))
+
+
+def get_columnar():
+    """Return the columnar view of the current snapshot, rebuilding it if needed"""
+    global _columnar
+    snapshot = get_snapshot()
+    columnar = _columnar
+    if columnar is not None and columnar.snapshot is snapshot:
+        return columnar
+    with _lock:
+        columnar = _columnar
+        if columnar is None or columnar.snapshot is not snapshot:
+            columnar = ColumnarCatalog(snapshot)
+            _columnar = columnar
+    return columnar
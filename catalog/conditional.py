@@ -0,0 +1,108 @@
+"""
+Conditional GET (ETag / Last-Modified) for catalog endpoints.
+
+Catalog pages only change when the catalog does, so their validators are
+derived from the catalog version and last-modified time kept in the cache by
+``catalog.versioning``. Computing them needs no database query, which lets
+Django's ``condition`` decorator answer a matching ``If-None-Match`` /
+``If-Modified-Since`` with a 304 before the view runs.
+
+HTML pages also depend on who is asking (navigation for logged-in users,
+CSRF tokens in the add-to-cart forms) and on the active language, so their
+ETags include those too. The session, CSRF and guest cart cookies are hashed
+rather than looked up, which keeps the check query-free. A pending flash
+message (the ``messages`` cookie) always gets a full response. These pages
+are sent as ``no-cache`` so browsers revalidate them instead of reusing them
+heuristically after a login or logout, and as ``private`` once they carry a
+session, a guest cart or a CSRF token; anonymous pages without any of those
+stay shareable for core.page_cache. JSON APIs are the same for
+everyone; the bodies served from core.response_cache come in several
+content codings, each with its own ETag, while uncompressed responses keep
+one ETag whatever the client accepts.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from core.response_cache import negotiate_encoding
+
+from .versioning import get_catalog_modified, get_catalog_version
+
+# Mismo nombre que en orders.guest_cart; el catálogo no depende de la app orders
+GUEST_CART_COOKIE = 'guest_cart'
+
+
+def _client_key(request):
+    cookies = (
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME, ''),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        request.COOKIES.get(GUEST_CART_COOKIE, ''),
+    )
+    return hashlib.md5('|'.join(cookies).encode()).hexdigest()[:16]
+
+
+def catalog_etag(request, personalized=True, encoded=None):
+    """
+    Strong ETag of a catalog response for this request. ``encoded(request)``
+    tells whether the response is served precompressed by core.response_cache.
+    """
+    parts = [str(get_catalog_version())]
+    if encoded is not None and encoded(request):
+        # Cada codificación de un cuerpo precomprimido es otra representación
+        parts.append(negotiate_encoding(request) or 'identity')
+    if personalized:
+        parts.append(getattr(request, 'LANGUAGE_CODE', settings.LANGUAGE_CODE))
+        # Las vistas que devuelven HTML o JSON según Accept no deben compartir ETag
+        parts.append('json' if 'application/json' in request.headers.get('Accept', '') else 'html')
+        parts.append(_client_key(request))
+    return '-'.join(parts)
+
+
+def _has_pending_messages(request):
+    return bool(request.COOKIES.get(CookieStorage.cookie_name))
+
+
+def _is_private(request):
+    return (
+        settings.SESSION_COOKIE_NAME in request.COOKIES
+        or GUEST_CART_COOKIE in request.COOKIES
+        or settings.CSRF_COOKIE_NAME in request.COOKIES
+        or request.META.get('CSRF_COOKIE_NEEDS_UPDATE', False)
+    )
+
+
+def catalog_condition(personalized=True, encoded=None):
+    """``condition`` decorator driven by the catalog version and modified time"""
+    if not personalized:
+        return condition(
+            etag_func=lambda request, *args, **kwargs: catalog_etag(request, personalized, encoded),
+            last_modified_func=lambda request, *args, **kwargs: get_catalog_modified(),
+        )
+
+    # Sin validadores, ``condition`` no responde 304 y la página muestra el mensaje
+    conditional = condition(
+        etag_func=lambda request, *args, **kwargs: (
+            None if _has_pending_messages(request) else catalog_etag(request, personalized)
+        ),
+        last_modified_func=lambda request, *args, **kwargs: (
+            None if _has_pending_messages(request) else get_catalog_modified()
+        ),
+    )
+
+    def decorator(view):
+        conditional_view = conditional(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if _is_private(request):
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
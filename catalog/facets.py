@@ -0,0 +1,87 @@
+"""
+Faceted counts for the shop sidebar.
+
+A single grouped aggregate query counts the filtered products per
+(category, collection, stock state, price bucket) combination; the rows are
+then folded into one count per facet value. Results are cached by catalog
+version and normalized filter key.
+"""
+import hashlib
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, Count, IntegerField, Value, When
+
+from .models import Product
+from .versioning import get_catalog_version
+
+# Upper bounds (exclusive) of the price buckets, in COP
+PRICE_BUCKETS = (Decimal('50000'), Decimal('100000'), Decimal('200000'))
+
+
+def price_bucket_ranges():
+    """Return the (min, max) bounds of every bucket; None means unbounded"""
+    bounds = (None, *PRICE_BUCKETS, None)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def compute_facets(queryset):
+    """Count ``queryset`` per facet value with one GROUP BY query"""
+    price_bucket = Case(
+        *[When(price__lt=bound, then=Value(index)) for index, bound in enumerate(PRICE_BUCKETS)],
+        default=Value(len(PRICE_BUCKETS)),
+        output_field=IntegerField(),
+    )
+    in_stock = Case(When(stock__gt=0, then=Value(True)), default=Value(False), output_field=BooleanField())
+    rows = (
+        queryset.order_by()
+        .annotate(facet_in_stock=in_stock, facet_price_bucket=price_bucket)
+        .values('category_id', 'collection_id', 'facet_in_stock', 'facet_price_bucket')
+        .annotate(total=Count('id'))
+    )
+
+    return _fold(
+        (row['category_id'], row['collection_id'], row['facet_in_stock'], row['facet_price_bucket'], row['total'])
+        for row in rows
+    )
+
+
+def count_facets(products):
+    """Same counts as compute_facets for products already in memory"""
+    return _fold(
+        (product.category_id, product.collection_id, product.stock > 0, bisect_right(PRICE_BUCKETS, product.price), 1)
+        for product in products
+    )
+
+
+def _fold(rows):
+    """Fold (category, collection, in_stock, bucket, total) rows into per-facet counts"""
+    facets = {
+        'total': 0,
+        'categories': {},
+        'collections': {},
+        'stock': {'in_stock': 0, 'out_of_stock': 0},
+        'price_buckets': [0] * (len(PRICE_BUCKETS) + 1),
+    }
+    for category_id, collection_id, in_stock, bucket, total in rows:
+        facets['total'] += total
+        if category_id is not None:
+            facets['categories'][category_id] = facets['categories'].get(category_id, 0) + total
+        if collection_id is not None:
+            facets['collections'][collection_id] = facets['collections'].get(collection_id, 0) + total
+        facets['stock']['in_stock' if in_stock else 'out_of_stock'] += total
+        facets['price_buckets'][bucket] += total
+    return facets
+
+
+def get_facets(filters):
+    """Return the (cached) facet counts of the active products matching ``filters``"""
+    digest = hashlib.md5(filters.cache_key(include_sort=False).encode()).hexdigest()
+    key = f'catalog:facets:{get_catalog_version()}:{digest}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(filters.apply(Product.objects.filter(is_active=True)))
+        cache.set(key, facets, settings.CATALOG_FACETS_TIMEOUT)
+    return facets
@@ -0,0 +1,103 @@
+"""
+Sparse fieldsets for products_api.
+
+``?fields=id,name,price`` limits the attributes returned for each product and
+``?expand=category,collection`` embeds the related objects. A relation listed
+in ``fields`` but not expanded is returned as its id. Without either
+parameter the full representation is returned, as before.
+
+The fieldset also tells the ORM what to load: only the requested columns
+(plus the ones the sort needs for cursors) are selected and the category and
+collection joins are skipped unless they are expanded.
+"""
+from .pagination import SORT_ORDERS
+
+PRODUCT_FIELDS = ('id', 'name', 'description', 'price', 'stock', 'is_active', 'created_at', 'image')
+
+# Attributes embedded for each expandable relation
+PRODUCT_RELATIONS = {
+    'category': ('id', 'name', 'status'),
+    'collection': ('id', 'name', 'season', 'status'),
+}
+
+
+class InvalidFieldset(ValueError):
+    """Raised when ?fields= or ?expand= name something that does not exist"""
+
+
+def _split(value, allowed, parameter):
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise InvalidFieldset(
+            f'Campos no válidos en {parameter}: {", ".join(unknown)}. '
+            f'Opciones: {", ".join(allowed)}'
+        )
+    # Orden canónico y sin duplicados
+    return tuple(name for name in allowed if name in names)
+
+
+class ProductFieldset:
+    """Which product attributes and relations a products_api client asked for"""
+
+    def __init__(self, fields=PRODUCT_FIELDS + tuple(PRODUCT_RELATIONS), expand=tuple(PRODUCT_RELATIONS)):
+        self.fields = tuple(fields)
+        self.expand = tuple(expand)
+
+    @classmethod
+    def from_query(cls, params):
+        """Build the fieldset from request.GET; raises InvalidFieldset"""
+        if 'fields' not in params and 'expand' not in params:
+            return cls()
+        allowed = PRODUCT_FIELDS + tuple(PRODUCT_RELATIONS)
+        fields = _split(params['fields'], allowed, 'fields') if 'fields' in params else PRODUCT_FIELDS
+        expand = _split(params.get('expand', ''), tuple(PRODUCT_RELATIONS), 'expand')
+        # id siempre se incluye: los clientes lo necesitan para enlazar
+        if 'id' not in fields:
+            fields = ('id', *fields)
+        fields = tuple(name for name in allowed if name in fields or name in expand)
+        return cls(fields, expand)
+
+    @property
+    def is_complete(self):
+        everything = set(PRODUCT_FIELDS) | set(PRODUCT_RELATIONS)
+        return set(self.fields) == everything and set(self.expand) == set(PRODUCT_RELATIONS)
+
+    def only(self, sort=None):
+        """Model field paths to pass to ``QuerySet.only()``, or None to load everything"""
+        if self.is_complete:
+            return None
+        paths = [name for name in self.fields if name in PRODUCT_FIELDS]
+        if sort in SORT_ORDERS and sort != 'relevance':
+            paths += [field.lstrip('-') for field in SORT_ORDERS[sort]]
+        for relation in PRODUCT_RELATIONS:
+            if relation in self.fields:
+                paths.append(relation)
+            if relation in self.expand:
+                paths += [f'{relation}__{name}' for name in PRODUCT_RELATIONS[relation]]
+        return list(dict.fromkeys(paths))
+
+    def related(self):
+        """Relations worth joining with ``select_related()``"""
+        return self.expand
+
+    def serialize(self, product, request):
+        data = {}
+        for name in self.fields:
+            if name == 'image':
+                data['image'] = request.build_absolute_uri(product.image.url) if product.image else None
+            elif name == 'price':
+                data['price'] = int(product.price)  # Convert to integer as shown in example
+            elif name == 'created_at':
+                data['created_at'] = product.created_at.isoformat()
+            elif name in PRODUCT_RELATIONS:
+                if name in self.expand:
+                    related = getattr(product, name)
+                    data[name] = {
+                        attribute: getattr(related, attribute) for attribute in PRODUCT_RELATIONS[name]
+                    } if related else None
+                else:
+                    data[name] = getattr(product, f'{name}_id')
+            else:
+                data[name] = getattr(product, name)
+        return data
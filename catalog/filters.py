@@ -0,0 +1,109 @@
+"""
+Shop filter parameters.
+
+ShopFilters parses the ``?search=&category=&collection=&min_price=&max_price=
+&stock=&sort=`` query string once, so shop_view, the listing backends and the
+benchmark command all build exactly the same queries.
+"""
+import copy
+from decimal import Decimal, InvalidOperation
+
+from . import search
+from .pagination import MAX_ID, SORT_ORDERS
+
+STOCK_CHOICES = ('in_stock', 'out_of_stock')
+
+
+def _parse_id(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    # Fuera del rango de ids SQLite lanza OverflowError en la consulta
+    return value if 0 < value <= MAX_ID else None
+
+
+def _parse_price(value):
+    try:
+        price = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+    return price if price.is_finite() else None
+
+
+class ShopFilters:
+    """Normalized filter set of the shop listing"""
+
+    def __init__(self, search='', category=None, collection=None, min_price=None,
+                 max_price=None, stock='', sort=''):
+        self.search = (search or '').strip()
+        self.category = _parse_id(category)
+        self.collection = _parse_id(collection)
+        self.min_price = _parse_price(min_price) if min_price not in (None, '') else None
+        self.max_price = _parse_price(max_price) if max_price not in (None, '') else None
+        self.stock = stock if stock in STOCK_CHOICES else ''
+
+        # Search results default to relevance, which only exists with a search
+        if not sort:
+            sort = 'relevance' if self.search else 'name'
+        if sort not in SORT_ORDERS or (sort == 'relevance' and not self.search):
+            sort = 'name'
+        self.sort = sort
+
+    @classmethod
+    def from_query(cls, params):
+        """Build the filters from a request's GET QueryDict"""
+        return cls(
+            search=params.get('search', ''),
+            category=params.get('category'),
+            collection=params.get('collection'),
+            min_price=params.get('min_price'),
+            max_price=params.get('max_price'),
+            stock=params.get('stock', ''),
+            sort=params.get('sort', ''),
+        )
+
+    def with_search(self, text):
+        """Copy of these filters searching ``text`` instead"""
+        filters = copy.copy(self)
+        filters.search = text.strip()
+        return filters
+
+    @property
+    def is_filtered(self):
+        return bool(
+            self.search or self.category or self.collection or self.stock
+            or self.min_price is not None or self.max_price is not None
+        )
+
+    def apply(self, queryset):
+        """Return ``queryset`` restricted by every filter (ordering is left to the caller)"""
+        if self.search:
+            queryset = search.search_products(queryset, self.search)
+        if self.category is not None:
+            queryset = queryset.filter(category_id=self.category)
+        if self.collection is not None:
+            queryset = queryset.filter(collection_id=self.collection)
+        if self.min_price is not None:
+            queryset = queryset.filter(price__gte=self.min_price)
+        if self.max_price is not None:
+            queryset = queryset.filter(price__lte=self.max_price)
+        if self.stock == 'in_stock':
+            queryset = queryset.filter(stock__gt=0)
+        elif self.stock == 'out_of_stock':
+            queryset = queryset.filter(stock=0)
+        return queryset
+
+    def cache_key(self, include_sort=True):
+        """Stable string identifying the filter set, for cache keys"""
+        parts = [
+            self.search.lower(),
+            self.category if self.category is not None else '',
+            self.collection if self.collection is not None else '',
+            self.min_price if self.min_price is not None else '',
+            self.max_price if self.max_price is not None else '',
+            self.stock,
+        ]
+        if include_sort:
+            parts.append(self.sort)
+        return '|'.join(str(part) for part in parts)
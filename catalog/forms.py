@@ -0,0 +1,24 @@
+from django import forms
+from django.core.exceptions import ValidationError
+
+
+class ProductAdjustmentForm(forms.Form):
+    """Price and stock change applied to a set of products, see ProductQuerySet.adjust"""
+    price_percent = forms.DecimalField(
+        label="Price change (%)", required=False, max_digits=5, decimal_places=2, min_value=-99.99,
+        help_text="Example: -15 for a 15% discount, 10 for a 10% increase",
+    )
+    price_amount = forms.DecimalField(
+        label="Price change (amount)", required=False, max_digits=10, decimal_places=2,
+        help_text="Added after the percentage. Example: -5000",
+    )
+    stock_delta = forms.IntegerField(
+        label="Stock change (units)", required=False,
+        help_text="Example: 20 to restock, -5 to remove units (stock never goes below 0)",
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not any(cleaned_data.get(field) for field in self.fields):
+            raise ValidationError("Enter a price or stock change.")
+        return cleaned_data
@@ -0,0 +1,131 @@
+"""
+Typo-tolerant search over product, collection and category names.
+
+Every word of a catalog name is split into trigrams ("neon" -> "  n",
+" ne", "neo", "eon", "on ") and listed under each of them. A misspelled
+search word is matched to the vocabulary word with the highest trigram
+similarity (shared / union, as in PostgreSQL's pg_trgm). Candidates are
+pruned before any similarity is computed:
+
+- a word can only reach ``MIN_SIMILARITY`` if it shares at least
+  ``ceil(MIN_SIMILARITY * q)`` of the query's ``q`` trigrams, so only the
+  posting lists of the ``q - that + 1`` rarest query trigrams are read;
+- words whose trigram count is out of reach are skipped without comparing.
+
+shop_view uses ``correct_search`` when an exact search finds nothing and
+retries with the corrected words. The index is refreshed incrementally with
+the catalog (see ``catalog.names``).
+"""
+import math
+
+from .names import NameIndex, fold, get_index
+from .search import TOKEN_RE
+
+# Lowest trigram similarity accepted as a correction; "nihgts" -> "nights" scores 0.27
+MIN_SIMILARITY = 0.25
+
+# Shorter words are too ambiguous to correct and are searched as typed
+MIN_WORD_LENGTH = 3
+
+
+def trigrams(word):
+    """Trigrams of ``word`` padded like pg_trgm: two spaces before, one after"""
+    padded = f'  {word} '
+    return frozenset(padded[start:start + 3] for start in range(len(padded) - 2))
+
+
+def _words(name):
+    return {word for word in TOKEN_RE.findall(fold(name)) if len(word) >= MIN_WORD_LENGTH}
+
+
+class TrigramIndex(NameIndex):
+    """Vocabulary of catalog name words with a trigram -> words inverted index"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Palabra -> cuántos nombres la usan; se borra del índice al llegar a cero
+        self.words = {}
+        self.postings = {}
+        self._owned = set()
+
+    def copy(self, version, synced_at):
+        index = super().copy(version, synced_at)
+        index.words = dict(self.words)
+        # Las listas se comparten hasta que la copia modifica alguna
+        index.postings = dict(self.postings)
+        return index
+
+    def _posting(self, gram):
+        if gram not in self._owned:
+            self.postings[gram] = set(self.postings.get(gram, ()))
+            self._owned.add(gram)
+        return self.postings[gram]
+
+    def add(self, kind, pk, name):
+        super().add(kind, pk, name)
+        for word in _words(name):
+            count = self.words.get(word, 0)
+            self.words[word] = count + 1
+            if not count:
+                for gram in trigrams(word):
+                    self._posting(gram).add(word)
+
+    def remove(self, kind, pk):
+        name = super().remove(kind, pk)
+        if name is None:
+            return
+        for word in _words(name):
+            count = self.words.pop(word) - 1
+            if count:
+                self.words[word] = count
+                continue
+            for gram in trigrams(word):
+                posting = self._posting(gram)
+                posting.discard(word)
+                if not posting:
+                    del self.postings[gram]
+                    self._owned.discard(gram)
+
+    def closest(self, word, min_similarity=MIN_SIMILARITY):
+        """Return the vocabulary word most similar to ``word``, or None"""
+        grams = trigrams(word)
+        size = len(grams)
+        min_shared = max(1, math.ceil(min_similarity * size))
+        # Toda palabra válida comparte al menos un trigrama con las listas más cortas
+        postings = sorted((self.postings.get(gram, ()) for gram in grams), key=len)
+        candidates = set().union(*postings[:size - min_shared + 1])
+
+        best, best_rank = None, None
+        for candidate in candidates:
+            other = trigrams(candidate)
+            if not min_similarity * size <= len(other) <= size / min_similarity:
+                continue
+            shared = len(grams & other)
+            similarity = shared / (size + len(other) - shared)
+            if similarity < min_similarity:
+                continue
+            rank = (-similarity, -self.words[candidate], candidate)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = candidate, rank
+        return best
+
+    def correct(self, text):
+        """Return ``text`` with its unknown words corrected, or None if nothing changed"""
+        words = TOKEN_RE.findall(fold(text))
+        corrected = []
+        for word in words:
+            if len(word) < MIN_WORD_LENGTH or word.isdigit() or word in self.words:
+                corrected.append(word)
+            else:
+                corrected.append(self.closest(word) or word)
+        return ' '.join(corrected) if corrected != words else None
+
+
+def get_trigram_index():
+    """Return the trigram index of the current catalog version"""
+    return get_index(TrigramIndex)
+
+
+def correct_search(text):
+    """Corrected version of a search that found nothing, or None"""
+    return get_trigram_index().correct(text)
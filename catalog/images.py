@@ -0,0 +1,208 @@
+"""
+Resized image derivatives for products, collections and categories.
+
+For every uploaded image a WebP and a JPEG copy is written at each width in
+``settings.CATALOG_IMAGE_WIDTHS`` that is narrower than the original, next
+to a tiny blurred JPEG placeholder kept inline as a data URI. Files follow a
+fixed naming scheme (see ``derivative_name``), so the model only stores the
+original dimensions and which widths exist, in ``image_width``,
+``image_height`` and ``image_variants``.
+
+Derivatives are built after an upload is committed (catalog.signals), in a
+process pool of ``settings.CATALOG_IMAGE_WORKERS`` workers so the request
+does not wait for Pillow, or in bulk with ``manage.py build_image_derivatives``.
+The copies of a replaced or removed image are deleted once the new metadata
+is stored. The ``responsive_image`` template tag turns the stored data into
+``srcset``/``sizes`` markup.
+"""
+import base64
+import io
+import os
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image, ImageFilter, ImageOps
+
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+QUALITY = 80
+PLACEHOLDER_WIDTH = 16
+DERIVATIVES_DIR = 'derivatives'
+
+_pool = None
+_lock = threading.Lock()
+
+
+def derivative_name(source_name, width, image_format):
+    """Storage name of the ``width`` pixels wide ``image_format`` copy of ``source_name``"""
+    stem, _ = posixpath.splitext(source_name)
+    return f'{DERIVATIVES_DIR}/{stem}-{width}w.{"jpg" if image_format == "jpeg" else image_format}'
+
+
+def render(source_path, source_name, media_root, widths):
+    """
+    Write the derivatives of one image and return its metadata.
+
+    Runs in worker processes, so it only takes and returns plain values.
+    """
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGB')
+    width, height = image.size
+
+    # Solo anchos menores al original; una imagen pequeña conserva su tamaño
+    targets = sorted({target for target in widths if target < width}) or [width]
+    for target in targets:
+        resized = image if target == width else image.resize(
+            (target, max(1, round(height * target / width))), Image.LANCZOS
+        )
+        for image_format, pil_format in FORMATS.items():
+            path = os.path.join(media_root, derivative_name(source_name, target, image_format))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            resized.save(path, pil_format, quality=QUALITY, optimize=image_format == 'jpeg')
+
+    tiny = image.resize(
+        (PLACEHOLDER_WIDTH, max(1, round(height * PLACEHOLDER_WIDTH / width))), Image.BILINEAR
+    ).filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    tiny.save(buffer, 'JPEG', quality=40)
+    placeholder = 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+    return {
+        'width': width,
+        'height': height,
+        'variants': {'source': source_name, 'widths': targets, 'placeholder': placeholder},
+    }
+
+
+def needs_derivatives(instance):
+    """True when the stored variants were not built from the current image"""
+    variants = instance.image_variants or {}
+    if not instance.image:
+        return bool(variants)
+    return variants.get('source') != instance.image.name
+
+
+def _job(instance):
+    name = instance.image.name
+    return (default_storage.path(name), name, str(settings.MEDIA_ROOT), tuple(settings.CATALOG_IMAGE_WIDTHS))
+
+
+def _apply(instance, result):
+    if result is None:
+        instance.image_width = instance.image_height = None
+        instance.image_variants = {}
+    else:
+        instance.image_width = result['width']
+        instance.image_height = result['height']
+        instance.image_variants = result['variants']
+
+
+def remove_derivatives(variants):
+    """Delete the files of the derivatives described by ``variants``"""
+    source = (variants or {}).get('source')
+    if not source:
+        return
+    for width in variants.get('widths', ()):
+        for image_format in FORMATS:
+            default_storage.delete(derivative_name(source, width, image_format))
+
+
+def _save(instances, previous=()):
+    """Store the new image metadata without triggering the save signals again"""
+    by_model = {}
+    for instance in instances:
+        by_model.setdefault(type(instance), []).append(instance)
+    for model, objs in by_model.items():
+        model.objects.bulk_update(objs, ['image_width', 'image_height', 'image_variants'], batch_size=500)
+    # Las copias de la imagen anterior solo se borran una vez guardada la nueva
+    for variants in previous:
+        remove_derivatives(variants)
+
+
+def _store(instance, result):
+    previous = instance.image_variants or {}
+    _apply(instance, result)
+    replaced = previous.get('source') != instance.image_variants.get('source')
+    _save([instance], [previous] if replaced else [])
+
+
+def build_derivatives(instance):
+    """Build the derivatives of a single instance in this process"""
+    try:
+        result = render(*_job(instance)) if instance.image else None
+    except (OSError, ValueError):
+        # Archivo ausente o ilegible: se sirve el original
+        result = None
+    _store(instance, result)
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.CATALOG_IMAGE_WORKERS)
+        return _pool
+
+
+def submit_derivatives(instance):
+    """Build the derivatives of ``instance`` in the worker pool, or here when it is disabled"""
+    if not settings.CATALOG_IMAGE_WORKERS or not instance.image:
+        build_derivatives(instance)
+        return
+    model, pk, job = type(instance), instance.pk, _job(instance)
+    future = _get_pool().submit(render, *job)
+    future.add_done_callback(lambda future: _finish(model, pk, job[1], future))
+
+
+def _finish(model, pk, source_name, future):
+    """Store the result of a pool job; runs in a thread of this process"""
+    # El hilo usa su propia conexión; se cierra como al final de una petición
+    close_old_connections()
+    try:
+        try:
+            result = future.result()
+        except (OSError, ValueError):
+            result = None
+        instance = model.objects.filter(pk=pk).first()
+        if instance is None or instance.image.name != source_name:
+            # La imagen cambió (o el objeto se borró) mientras se procesaba
+            if result is not None:
+                remove_derivatives(result['variants'])
+            return
+        _store(instance, result)
+    finally:
+        close_old_connections()
+
+
+def build_many(instances, workers=None):
+    """
+    Build derivatives for many instances with a Pillow process pool.
+
+    Returns the (instance, error) pairs of the images that could not be read.
+    """
+    instances = list(instances)
+    previous = {id(instance): instance.image_variants or {} for instance in instances}
+    failures, done = [], []
+    with_image = [instance for instance in instances if instance.image]
+    if with_image:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(instance, pool.submit(render, *_job(instance))) for instance in with_image]
+            for instance, future in futures:
+                try:
+                    _apply(instance, future.result())
+                    done.append(instance)
+                except (OSError, ValueError) as error:
+                    failures.append((instance, error))
+    for instance in instances:
+        if not instance.image:
+            _apply(instance, None)
+            done.append(instance)
+    _save(done, [
+        previous[id(instance)] for instance in done
+        if previous[id(instance)].get('source') != instance.image_variants.get('source')
+    ])
+    return failures
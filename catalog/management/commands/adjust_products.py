@@ -0,0 +1,55 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.models import Product
+
+
+def _decimal(value):
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise CommandError(f'Invalid number: {value}')
+
+
+class Command(BaseCommand):
+    help = 'Apply a percentage or fixed price change and/or a stock delta to a filtered set of products in one UPDATE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collection', type=int, help='Only products of this collection id')
+        parser.add_argument('--category', type=int, help='Only products of this category id')
+        parser.add_argument('--ids', help='Only these product ids (comma separated)')
+        parser.add_argument('--include-inactive', action='store_true', help='Also change inactive products')
+        parser.add_argument('--price-percent', type=_decimal, help='Scale prices, e.g. -15 for a 15%% discount')
+        parser.add_argument('--price-amount', type=_decimal, help='Add a fixed amount to prices, e.g. -5000')
+        parser.add_argument('--stock-delta', type=int, help='Add units to stock, e.g. 20 (never goes below 0)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many products would change')
+
+    def handle(self, *args, **options):
+        changes = {field: options[field] for field in ('price_percent', 'price_amount', 'stock_delta') if options[field]}
+        if not changes:
+            raise CommandError('Nothing to change: use --price-percent, --price-amount or --stock-delta')
+
+        products = Product.objects.all()
+        if not options['include_inactive']:
+            products = products.filter(is_active=True)
+        if options['collection'] is not None:
+            products = products.filter(collection_id=options['collection'])
+        if options['category'] is not None:
+            products = products.filter(category_id=options['category'])
+        if options['ids']:
+            try:
+                ids = [int(pk) for pk in options['ids'].split(',') if pk.strip()]
+            except ValueError:
+                raise CommandError(f"Invalid --ids: {options['ids']}")
+            products = products.filter(pk__in=ids)
+
+        if options['dry_run']:
+            self.stdout.write(f'{products.count()} products would be updated')
+            return
+        try:
+            rows = products.adjust(**changes)
+        except ValidationError as error:
+            raise CommandError('; '.join(error.messages))
+        self.stdout.write(self.style.SUCCESS(f'Successfully updated {rows} products'))
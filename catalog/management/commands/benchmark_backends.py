@@ -0,0 +1,98 @@
+import itertools
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from catalog.filters import ShopFilters
+from catalog.pagination import DEFAULT_PAGE_SIZE, SORT_ORDERS
+
+from .benchmark_shop import Command as ShopBenchmarkCommand
+
+BACKENDS = (
+    'catalog.backends.ORMBackend',
+    'catalog.backends.SnapshotBackend',
+    'catalog.backends.NumpyBackend',
+)
+
+
+class Command(ShopBenchmarkCommand):
+    help = (
+        'Seed a large catalog inside a rolled-back transaction and compare the latency '
+        'of every listing backend for each shop_view filter combination'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20000, help='Number of products to seed')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per combination (median is reported)')
+        parser.add_argument(
+            '--backend', action='append', dest='backends',
+            help='Dotted path of a backend to compare (repeatable, defaults to all of them)',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['backends'] or BACKENDS
+        try:
+            backends = [(path.rsplit('.', 1)[-1], import_string(path)()) for path in paths]
+        except ImportError as exc:
+            raise CommandError(str(exc))
+
+        with transaction.atomic():
+            categories, collections = self._seed(options['products'])
+            self._warm_up(backends)
+            results = self._compare(backends, categories, collections, options['repeat'])
+            # Nada de lo sembrado debe quedar en la base de datos
+            transaction.set_rollback(True)
+
+        self.stdout.write('')
+        for name, _ in backends:
+            timings = [timing[name] for timing in results]
+            self.stdout.write(
+                f'{name:<20} median {statistics.median(timings):8.3f} ms   worst {max(timings):8.3f} ms'
+            )
+
+    def _warm_up(self, backends):
+        # La primera consulta construye la instantánea y las columnas
+        for name, backend in backends:
+            start = time.perf_counter()
+            backend.page(ShopFilters())
+            backend.facets(ShopFilters())
+            self.stdout.write(f'{name:<20} first page {(time.perf_counter() - start) * 1000:10.2f} ms')
+        self.stdout.write('')
+
+    def _compare(self, backends, categories, collections, repeat):
+        results = []
+        combinations = itertools.product(
+            [None, categories[0].id],
+            [None, collections[0].id],
+            [None, (Decimal('50000'), Decimal('150000'))],
+            ['', 'in_stock', 'out_of_stock'],
+            [sort for sort in SORT_ORDERS if sort != 'relevance'],
+        )
+        self.stdout.write(f'{"":<60}' + ''.join(f'{name:>20}' for name, _ in backends))
+        for category, collection, price_range, stock, sort in combinations:
+            filters = ShopFilters(
+                category=category,
+                collection=collection,
+                min_price=price_range[0] if price_range else None,
+                max_price=price_range[1] if price_range else None,
+                stock=stock,
+                sort=sort,
+            )
+
+            medians = {}
+            for name, backend in backends:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    list(backend.page(filters, limit=DEFAULT_PAGE_SIZE))
+                    timings.append((time.perf_counter() - start) * 1000)
+                medians[name] = statistics.median(timings)
+            results.append(medians)
+
+            label = self._label(filters, price_range)
+            self.stdout.write(f'{label:<60}' + ''.join(f'{medians[name]:17.3f} ms' for name, _ in backends))
+        return results
@@ -0,0 +1,131 @@
+import itertools
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from catalog.filters import ShopFilters
+from catalog.models import Category, Collection, Product
+from catalog.pagination import DEFAULT_PAGE_SIZE, SORT_ORDERS, keyset_queryset
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a large catalog inside a rolled-back transaction and report the query plan '
+        'and latency of every shop_view filter combination'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20000, help='Number of products to seed')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per combination (median is reported)')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Exit with an error if any query does a full table scan')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            categories, collections = self._seed(options['products'])
+            results = self._run(categories, collections, options['repeat'])
+            # Nada de lo sembrado debe quedar en la base de datos
+            transaction.set_rollback(True)
+
+        scans = [label for label, _, _, full_scan in results if full_scan]
+        sorts = [label for label, _, plan, _ in results if 'TEMP B-TREE' in plan]
+        self.stdout.write('')
+        self.stdout.write(
+            f'{len(results)} combinations, {len(scans)} with full table scans, '
+            f'{len(sorts)} sorted in a temporary b-tree'
+        )
+        if scans and options['fail_on_scan']:
+            raise CommandError('Full table scans in: ' + ', '.join(scans))
+
+    def _seed(self, total):
+        rng = random.Random(42)
+        categories = [Category.objects.create(name=f'Bench category {i}') for i in range(12)]
+        collections = [
+            Collection.objects.create(name=f'Bench collection {i}', season='SS25', description='Benchmark')
+            for i in range(8)
+        ]
+        batch = []
+        for index in range(total):
+            batch.append(Product(
+                name=f'Bench product {rng.randrange(10 ** 6):06d}',
+                price=Decimal(rng.randrange(10000, 500000)),
+                stock=rng.choice([0, 0, 1, 5, 20]),
+                is_active=rng.random() > 0.1,
+                category=rng.choice(categories),
+                collection=rng.choice(collections + [None]),
+            ))
+            if len(batch) == 1000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Product.objects.bulk_create(batch)
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(self.style.SUCCESS(f'Seeded {total} products'))
+        return categories, collections
+
+    def _run(self, categories, collections, repeat):
+        results = []
+        combinations = itertools.product(
+            [None, categories[0].id],
+            [None, collections[0].id],
+            [None, (Decimal('50000'), Decimal('150000'))],
+            ['', 'in_stock', 'out_of_stock'],
+            [sort for sort in SORT_ORDERS if sort != 'relevance'],
+        )
+        for category, collection, price_range, stock, sort in combinations:
+            filters = ShopFilters(
+                category=category,
+                collection=collection,
+                min_price=price_range[0] if price_range else None,
+                max_price=price_range[1] if price_range else None,
+                stock=stock,
+                sort=sort,
+            )
+            products = filters.apply(Product.objects.filter(is_active=True))
+            page = keyset_queryset(products, filters.sort)[:DEFAULT_PAGE_SIZE + 1]
+
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(page)
+                products.count()
+                timings.append((time.perf_counter() - start) * 1000)
+
+            plan = page.explain()
+            full_scan = self._is_full_scan(plan)
+            label = self._label(filters, price_range)
+            results.append((label, statistics.median(timings), plan, full_scan))
+
+            style = self.style.ERROR if full_scan else self.style.SUCCESS
+            self.stdout.write(style(f'{label:<60} {statistics.median(timings):8.2f} ms'))
+            for line in plan.splitlines():
+                self.stdout.write(f'    {line}')
+        return results
+
+    def _is_full_scan(self, plan):
+        table = Product._meta.db_table
+        for line in plan.splitlines():
+            # SQLite: "SCAN catalog_product" sin índice; PostgreSQL: "Seq Scan on catalog_product"
+            if f'SCAN {table}' in line and 'USING' not in line:
+                return True
+            if f'Seq Scan on {table}' in line:
+                return True
+        return False
+
+    def _label(self, filters, price_range):
+        parts = [f'sort={filters.sort}']
+        if filters.category is not None:
+            parts.append('category')
+        if filters.collection is not None:
+            parts.append('collection')
+        if price_range:
+            parts.append('price')
+        if filters.stock:
+            parts.append(filters.stock)
+        return ' '.join(parts)
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog import images
+from catalog.models import Category, Collection, Product
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized WebP/JPEG copies and placeholders of catalog images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (defaults to the CPU count)')
+        parser.add_argument('--batch-size', type=int, default=200, help='Images handed to the pool at a time')
+        parser.add_argument('--force', action='store_true', help='Rebuild images that already have derivatives')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        built = failed = 0
+        for model in (Collection, Category, Product):
+            # Se leen los ids primero: cada lote escribe en la misma tabla
+            ids = list(model.objects.exclude(image='').exclude(image__isnull=True).values_list('pk', flat=True))
+            for offset in range(0, len(ids), options['batch_size']):
+                chunk = model.objects.in_bulk(ids[offset:offset + options['batch_size']]).values()
+                batch = [instance for instance in chunk if options['force'] or images.needs_derivatives(instance)]
+                if not batch:
+                    continue
+                failures = images.build_many(batch, workers=options['workers'])
+                for instance, error in failures:
+                    self.stderr.write(f'{model.__name__} {instance.pk} ({instance.image.name}): {error}')
+                built += len(batch) - len(failures)
+                failed += len(failures)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(f'Built derivatives for {built} images in {elapsed:.2f}s ({failed} failed)')
+        )
@@ -0,0 +1,288 @@
+import csv
+import itertools
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from catalog.models import Category, Collection, Product, ProductTombstone
+
+# Column names accepted in the input, including the Spanish export shape
+# ({"nombre", "descripcion", "imagen_url", "detail_url"})
+FIELD_ALIASES = {
+    'nombre': 'name',
+    'descripcion': 'description',
+    'precio': 'price',
+    'existencias': 'stock',
+    'categoria': 'category',
+    'coleccion': 'collection',
+    'temporada': 'collection_season',
+    'imagen': 'image',
+    'imagen_url': 'image',
+    'image_url': 'image',
+    'activo': 'is_active',
+}
+PRODUCT_FIELDS = ('name', 'description', 'price', 'stock', 'image', 'is_active', 'category', 'collection')
+KNOWN_COLUMNS = {'id', 'collection_season', *PRODUCT_FIELDS}
+
+TRUE_VALUES = {'1', 'true', 'yes', 'si', 'sí', 'y', 's'}
+FALSE_VALUES = {'0', 'false', 'no', 'n'}
+
+MAX_REPORTED_ERRORS = 20
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; it is skipped and reported"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream products from a CSV or JSON Lines file and upsert them with their '
+        'collections and categories in batched transactions'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON Lines file to import')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (guessed from the extension by default)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows written per transaction')
+        parser.add_argument('--default-price', help='Price for new products whose row has none')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'File not found: {path}')
+        file_format = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+        self.default_price = None
+        if options['default_price'] is not None:
+            self.default_price = self._price(options['default_price'])
+        self.stats = {'created': 0, 'updated': 0, 'skipped': 0}
+        self.errors = []
+
+        # Mapas en memoria para resolver FKs y upserts sin consultas por fila
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.collections = dict(Collection.objects.values_list('name', 'id'))
+        self.products_by_name = dict(Product.objects.order_by('-id').values_list('name', 'id'))
+
+        start = time.perf_counter()
+        total = 0
+        rows = self._read(path, file_format)
+        while True:
+            chunk = list(itertools.islice(rows, options['batch_size']))
+            if not chunk:
+                break
+            with transaction.atomic():
+                self._import_chunk(chunk)
+            total += len(chunk)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'{total} rows ({total / elapsed:,.0f} rows/sec)')
+
+        elapsed = time.perf_counter() - start
+        for error in self.errors[:MAX_REPORTED_ERRORS]:
+            self.stderr.write(error)
+        if len(self.errors) > MAX_REPORTED_ERRORS:
+            self.stderr.write(f'... and {len(self.errors) - MAX_REPORTED_ERRORS} more errors')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {total} rows in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f} rows/sec): '
+                f'{self.stats["created"]} created, {self.stats["updated"]} updated, {self.stats["skipped"]} skipped'
+            )
+        )
+
+    # Lectura
+
+    def _read(self, path, file_format):
+        """Yield (line number, normalized row) pairs without loading the file"""
+        with path.open(encoding='utf-8-sig', newline='') as handle:
+            if file_format == 'csv':
+                for line, row in enumerate(csv.DictReader(handle), start=2):
+                    yield line, self._normalize(row)
+                return
+            for line, text in enumerate(handle, start=1):
+                # Acepta también un arreglo JSON con un objeto por línea
+                text = text.strip().rstrip(',')
+                if text in ('', '[', ']'):
+                    continue
+                try:
+                    row = json.loads(text)
+                except ValueError:
+                    yield line, None
+                    continue
+                yield line, self._normalize(row) if isinstance(row, dict) else None
+
+    def _normalize(self, row):
+        normalized = {}
+        for key, value in row.items():
+            if key is None:
+                continue
+            key = key.strip().lower()
+            key = FIELD_ALIASES.get(key, key)
+            if key in KNOWN_COLUMNS:
+                normalized[key] = value.strip() if isinstance(value, str) else value
+        return normalized
+
+    # Conversión de valores
+
+    def _price(self, value):
+        try:
+            price = Decimal(str(value).replace(',', '')).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise RowError(f'invalid price {value!r}')
+        if price < Decimal('0.01'):
+            raise RowError(f'price must be greater than zero, got {value!r}')
+        return price
+
+    def _stock(self, value):
+        try:
+            stock = int(value)
+        except (TypeError, ValueError):
+            raise RowError(f'invalid stock {value!r}')
+        if stock < 0:
+            raise RowError(f'stock cannot be negative, got {value!r}')
+        return stock
+
+    def _id(self, value):
+        try:
+            product_id = int(value)
+        except (TypeError, ValueError):
+            raise RowError(f'invalid id {value!r}')
+        if product_id < 1:
+            raise RowError(f'invalid id {value!r}')
+        return product_id
+
+    def _bool(self, value):
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+        raise RowError(f'invalid boolean {value!r}')
+
+    def _image(self, value):
+        """Map an image URL inside MEDIA_URL to the stored file name"""
+        parsed = urlparse(value)
+        if not parsed.scheme and not value.startswith('/'):
+            return value
+        if parsed.path.startswith(settings.MEDIA_URL):
+            return parsed.path[len(settings.MEDIA_URL):]
+        raise RowError(f'image {value!r} is not under {settings.MEDIA_URL}')
+
+    def _values(self, row):
+        """Model values of the columns present in ``row``"""
+        values = {}
+        for field in PRODUCT_FIELDS:
+            if field not in row:
+                continue
+            value = row[field]
+            if value in (None, '') and field not in ('description', 'image'):
+                continue
+            if field == 'price':
+                value = self._price(value)
+            elif field == 'stock':
+                value = self._stock(value)
+            elif field == 'is_active':
+                value = self._bool(value)
+            elif field == 'image':
+                value = self._image(value) if value else None
+            elif field == 'category':
+                field, value = 'category_id', self.categories[value]
+            elif field == 'collection':
+                field, value = 'collection_id', self.collections[value]
+            values[field] = value
+        return values
+
+    # Escritura
+
+    def _create_parents(self, chunk):
+        categories = {row['category'] for _, row in chunk if row and row.get('category')} - self.categories.keys()
+        if categories:
+            Category.objects.bulk_create([Category(name=name) for name in categories])
+            self.categories.update(Category.objects.filter(name__in=categories).values_list('name', 'id'))
+
+        seasons = {}
+        for _, row in chunk:
+            if row and row.get('collection') and row['collection'] not in self.collections:
+                seasons.setdefault(row['collection'], row.get('collection_season') or '')
+        if seasons:
+            Collection.objects.bulk_create([
+                Collection(name=name, season=season[:10], description='') for name, season in seasons.items()
+            ])
+            self.collections.update(Collection.objects.filter(name__in=seasons).values_list('name', 'id'))
+
+    def _import_chunk(self, chunk):
+        self._create_parents(chunk)
+
+        # Filas pendientes por producto destino; una fila repetida se fusiona
+        updates, creates = {}, {}
+        for line, row in chunk:
+            try:
+                if not row:
+                    raise RowError('not a JSON object')
+                values = self._values(row)
+                if row.get('id') not in (None, ''):
+                    key = self._id(row['id'])
+                elif values.get('name'):
+                    key = self.products_by_name.get(values['name'], values['name'])
+                else:
+                    raise RowError('missing name')
+            except RowError as error:
+                self.stats['skipped'] += 1
+                self.errors.append(f'Line {line}: {error}')
+                continue
+            target = updates if isinstance(key, int) else creates
+            target.setdefault(key, (line, {}))[1].update(values)
+
+        existing = Product.objects.in_bulk(list(updates))
+        to_update, fields, deactivated = [], {'updated_at'}, []
+        for product_id, (line, values) in updates.items():
+            product = existing.get(product_id)
+            if product is None:
+                # Un id nuevo se crea con ese id
+                creates[product_id] = (line, {'id': product_id, **values})
+                continue
+            if product.is_active and values.get('is_active') is False:
+                deactivated.append(product_id)
+            for field, value in values.items():
+                setattr(product, field, value)
+            fields.update(values)
+            to_update.append(product)
+
+        to_create = []
+        for line, values in creates.values():
+            values.setdefault('price', self.default_price)
+            if not values.get('name') or values['price'] is None:
+                self.stats['skipped'] += 1
+                self.errors.append(f'Line {line}: new products need a name and a price')
+                continue
+            to_create.append(Product(**values))
+
+        if to_update:
+            # Upsert por id (INSERT ... ON CONFLICT DO UPDATE): mucho más rápido que
+            # el CASE WHEN por campo de bulk_update con lotes grandes
+            Product.objects.bulk_create(
+                to_update,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=sorted(fields),
+            )
+            ProductTombstone.record(deactivated, ProductTombstone.DEACTIVATED)
+        if to_create:
+            to_create = Product.objects.bulk_create(to_create, batch_size=500)
+            if any(product.pk is None for product in to_create):
+                # Bases de datos sin RETURNING: se recuperan los ids por nombre
+                names = [product.name for product in to_create]
+                self.products_by_name.update(
+                    Product.objects.filter(name__in=names).order_by('-id').values_list('name', 'id')
+                )
+            else:
+                self.products_by_name.update((product.name, product.pk) for product in to_create)
+
+        self.stats['created'] += len(to_create)
+        self.stats['updated'] += len(to_update)
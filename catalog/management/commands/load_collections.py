@@ -10,7 +10,6 @@ class Command(BaseCommand):
                 "name": "WINTER SHADOWS",
                 "season": "FW24",
                 "description": "Dark aesthetics meet winter functionality",
-                "pieces": 24,
                 "status": "AVAILABLE",
                 "is_current": True,
             },
@@ -18,7 +17,6 @@ class Command(BaseCommand):
                 "name": "NEON NIGHTS",
                 "season": "SS24",
                 "description": "Vibrant colors for the urban nightlife",
-                "pieces": 18,
                 "status": "LIMITED",
                 "is_current": False,
             },
@@ -26,7 +24,6 @@ class Command(BaseCommand):
                 "name": "CONCRETE DREAMS",
                 "season": "FW23",
                 "description": "Industrial-inspired urban essentials",
-                "pieces": 32,
                 "status": "SOLD OUT",
                 "is_current": False,
             },
@@ -34,7 +31,6 @@ class Command(BaseCommand):
                 "name": "METRO PULSE",
                 "season": "SS23",
                 "description": "Technical wear for city commuters",
-                "pieces": 21,
                 "status": "AVAILABLE",
                 "is_current": False,
             },
@@ -42,7 +38,6 @@ class Command(BaseCommand):
                 "name": "UNDERGROUND",
                 "season": "FW22",
                 "description": "Raw street culture essentials",
-                "pieces": 15,
                 "status": "ARCHIVE",
                 "is_current": False,
             },
@@ -50,7 +45,6 @@ class Command(BaseCommand):
                 "name": "SKYLINE",
                 "season": "SS22",
                 "description": "Elevated streetwear for urban heights",
-                "pieces": 28,
                 "status": "ARCHIVE",
                 "is_current": False,
             },
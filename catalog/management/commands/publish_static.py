@@ -0,0 +1,23 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog import publish
+
+
+class Command(BaseCommand):
+    help = 'Render the collections, collection and product pages in every language to static files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Output directory (defaults to CATALOG_STATIC_ROOT)')
+
+    def handle(self, *args, **options):
+        root = options['output'] or settings.CATALOG_STATIC_ROOT
+        if not root:
+            raise CommandError('Set CATALOG_STATIC_ROOT or pass --output')
+
+        start = time.perf_counter()
+        pages = publish.publish_all(root)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Published {pages} pages to {root} in {elapsed:.2f}s'))
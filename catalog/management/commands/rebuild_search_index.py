@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from catalog import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of the product catalog'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stdout.write(
+                self.style.WARNING('Search index table not found; searches use the icontains fallback')
+            )
+            return
+
+        indexed = search.rebuild_index()
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully indexed {indexed} products')
+        )
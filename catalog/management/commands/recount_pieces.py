@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from catalog.models import Category, Collection, recount_pieces
+
+
+class Command(BaseCommand):
+    help = 'Recompute the pieces counters of collections and categories'
+
+    def handle(self, *args, **options):
+        recount_pieces()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Successfully recounted pieces for {Collection.objects.count()} collections '
+                f'and {Category.objects.count()} categories'
+            )
+        )
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 es específico de SQLite; otros motores usan el fallback con icontains
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_product_search USING fts5("
+        "name, description, collection_name, category_name, "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO catalog_product_search (rowid, name, description, collection_name, category_name) "
+        "SELECT p.id, p.name, p.description, COALESCE(c.name, ''), COALESCE(g.name, '') "
+        "FROM catalog_product p "
+        "LEFT JOIN catalog_collection c ON c.id = p.collection_id "
+        "LEFT JOIN catalog_category g ON g.id = p.category_id"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS catalog_product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_alter_product_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
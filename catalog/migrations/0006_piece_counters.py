@@ -0,0 +1,40 @@
+# Generated by Django 4.2.23 on 2026-10-17 01:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_pieces(apps, schema_editor):
+    Product = apps.get_model('catalog', 'Product')
+    for model_name, field in (('Collection', 'collection'), ('Category', 'category')):
+        model = apps.get_model('catalog', model_name)
+        counts = (
+            Product.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        model.objects.update(pieces=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='pieces',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of products, kept up to date on product writes'),
+        ),
+        migrations.AddField(
+            model_name='collection',
+            name='pieces',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of products, kept up to date on product writes'),
+        ),
+        migrations.RunPython(count_pieces, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.23 on 2026-10-17 01:26
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created_at(apps, schema_editor):
+    # Sin historial previo, la última modificación conocida es la creación
+    Product = apps.get_model('catalog', 'Product')
+    Product.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_shop_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.PositiveIntegerField()),
+                ('reason', models.CharField(choices=[('deleted', 'Deleted'), ('deactivated', 'Deactivated')], max_length=20)),
+                ('removed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['removed_at', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.23 on 2026-10-17 02:36
+
+import catalog.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchEntry',
+            fields=[
+                ('product', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='catalog.product')),
+                ('document', catalog.models.SearchDocumentField(db_column='catalog_product_search')),
+            ],
+            options={
+                'db_table': 'catalog_product_search',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,6 +1,15 @@
-from django.db import models
+from decimal import Decimal
+
+from django.conf import settings
+
+from django.db import models, transaction
+from django.db.models import DEFERRED, Case, Count, F, Max, Min, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Round
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from django.dispatch import Signal
+from django.utils import timezone
+from .versioning import bump_catalog_version
 
 # Create your models here.
 class Collection(models.Model):
@@ -15,8 +24,12 @@ class Collection(models.Model):
     season = models.CharField(max_length=10, help_text="e.g., FW24, SS24")
     description = models.TextField()
     image = models.ImageField(upload_to="collections/", blank=True, null=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies of the image, see catalog.images")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='AVAILABLE')
     is_current = models.BooleanField(default=False, help_text="Mark as current featured collection")
+    pieces = models.PositiveIntegerField(default=0, editable=False, help_text="Number of products, kept up to date on product writes")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -35,11 +48,6 @@ class Collection(models.Model):
         }
         return status_colors.get(self.status, 'bg-gray-500')
 
-    @property
-    def pieces(self):
-        """Compute pieces automatically from related products (count of products)."""
-        return self.products.count()
-
 
 class Category(models.Model):
     STATUS_CHOICES = [
@@ -51,16 +59,208 @@ class Category(models.Model):
 
     name = models.CharField(max_length=100, unique=True)
     image = models.ImageField(upload_to="categories/", blank=True, null=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies of the image, see catalog.images")
     description = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='available')
+    pieces = models.PositiveIntegerField(default=0, editable=False, help_text="Number of products, kept up to date on product writes")
 
     def __str__(self):
         return self.name
 
-    @property
-    def pieces(self):
-        """Compute pieces automatically from related products (count of products)."""
-        return self.products.count()
+
+# Campos de Product que alteran los contadores de piezas
+PARENT_FIELDS = {'collection', 'collection_id', 'category', 'category_id'}
+
+# Campos de Product cuyo texto está en el índice de búsqueda (catalog.search)
+SEARCH_FIELDS = {'name', 'description'} | PARENT_FIELDS
+
+
+# Se envía con ``product_ids`` cuando cambia el precio de esos productos,
+# también en escrituras en bloque; orders recalcula los totales de los carritos
+prices_changed = Signal()
+
+
+# Límites de Product.price: el validador del campo y max_digits=10, decimal_places=2
+MIN_PRICE = Decimal('0.01')
+MAX_PRICE = Decimal('99999999.99')
+
+
+class ProductQuerySet(models.QuerySet):
+    """
+    QuerySet that keeps the ``pieces`` counters exact, the search index and
+    the published static pages in sync and bumps the catalog version for bulk
+    operations, which bypass the post_save/post_delete signals.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        previous_collection_ids = set()
+        if settings.CATALOG_STATIC_ROOT and PARENT_FIELDS & set(kwargs.get('update_fields') or ()):
+            # Las colecciones de las que salen los productos también se republican
+            previous_collection_ids = set(self.model.objects.filter(
+                pk__in=[obj.pk for obj in objs if obj.pk is not None],
+            ).values_list('collection_id', flat=True))
+        objs = super().bulk_create(objs, *args, **kwargs)
+        bump_catalog_version()
+        if kwargs.get('update_conflicts'):
+            # Un upsert puede mover productos existentes: se recuenta todo
+            recount_pieces()
+            if self._reprices(kwargs.get('update_fields') or ()):
+                self._send_prices_changed([obj.pk for obj in objs])
+            # Las filas insertadas siempre se indexan; las actualizadas si cambió su texto
+            self._index(objs, changed=bool(SEARCH_FIELDS & set(kwargs.get('update_fields') or ())))
+        else:
+            recount_pieces(
+                {obj.collection_id for obj in objs if obj.collection_id},
+                {obj.category_id for obj in objs if obj.category_id},
+            )
+            self._index(objs)
+        self._republish(
+            [obj.pk for obj in objs if obj.pk is not None],
+            previous_collection_ids | {obj.collection_id for obj in objs},
+            collections_index=True,
+        )
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        # bulk_update no ejecuta auto_now: se marca la fecha de cambio a mano
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        fields = [*fields, 'updated_at'] if 'updated_at' not in fields else list(fields)
+        deactivated = [
+            obj.pk for obj in objs
+            if 'is_active' in fields and not obj.is_active and obj._loaded_active is not False
+        ]
+
+        if not PARENT_FIELDS & set(fields):
+            rows = self._plain_bulk_update(objs, fields, *args, **kwargs)
+            bump_catalog_version()
+            ProductTombstone.record(deactivated, ProductTombstone.DEACTIVATED)
+            self._send_prices_changed([obj.pk for obj in objs] if self._reprices(fields) else [])
+            if SEARCH_FIELDS & set(fields):
+                self._index(objs)
+            self._republish([obj.pk for obj in objs], {obj.collection_id for obj in objs})
+            return rows
+        previous = self.model.objects.filter(pk__in=[obj.pk for obj in objs]).values_list('collection_id', 'category_id')
+        collection_ids, category_ids = _parent_ids(previous)
+        rows = self._plain_bulk_update(objs, fields, *args, **kwargs)
+        bump_catalog_version()
+        new_collection_ids, new_category_ids = _parent_ids((obj.collection_id, obj.category_id) for obj in objs)
+        recount_pieces(collection_ids | new_collection_ids, category_ids | new_category_ids)
+        ProductTombstone.record(deactivated, ProductTombstone.DEACTIVATED)
+        self._send_prices_changed([obj.pk for obj in objs] if self._reprices(fields) else [])
+        self._index(objs)
+        self._republish([obj.pk for obj in objs], collection_ids | new_collection_ids, collections_index=True)
+        return rows
+
+    def _plain_bulk_update(self, objs, fields, *args, **kwargs):
+        # QuerySet.bulk_update escribe cada lote con .update(); con un QuerySet
+        # base se evita repetir por lote el recuento que ya se hace aquí
+        return models.QuerySet(self.model, using=self.db).bulk_update(objs, fields, *args, **kwargs)
+
+    def adjust(self, price_percent=None, price_amount=None, stock_delta=None):
+        """
+        Change the price and/or stock of every product in the set with one UPDATE.
+
+        ``price_percent`` scales prices (-10 is a 10% discount), then
+        ``price_amount`` is added and the result rounded to cents.
+        ``stock_delta`` adds units, stopping at zero. If any resulting price
+        would be out of range a ValidationError is raised and nothing changes.
+        """
+        changes = {}
+        if price_percent or price_amount:
+            price = F('price')
+            if price_percent:
+                price = Round(price * Value(1 + Decimal(price_percent) / 100), 2)
+            if price_amount:
+                price = price + Value(Decimal(price_amount))
+            changes['price'] = price
+        if stock_delta:
+            stock_delta = int(stock_delta)
+            changes['stock'] = F('stock') + Value(stock_delta) if stock_delta > 0 else Case(
+                When(stock__lt=-stock_delta, then=Value(0)),
+                default=F('stock') + Value(stock_delta),
+            )
+        if not changes:
+            return 0
+
+        with transaction.atomic():
+            if 'price' in changes:
+                prices = self.order_by().aggregate(lowest=Min(changes['price']), highest=Max(changes['price']))
+                if prices['lowest'] is not None and prices['lowest'] < MIN_PRICE:
+                    raise ValidationError({'price': 'El precio debe ser mayor que cero'})
+                if prices['highest'] is not None and prices['highest'] > MAX_PRICE:
+                    raise ValidationError({'price': 'El precio supera el máximo permitido'})
+            return self.update(**changes)
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        deactivated = []
+        if kwargs.get('is_active') is False:
+            deactivated = list(self.filter(is_active=True).values_list('pk', flat=True))
+        # El filtro puede dejar de cumplirse tras el UPDATE: los ids se leen antes
+        from . import search
+        reindexed = bool(SEARCH_FIELDS & kwargs.keys()) and search.is_available()
+        # Tocar solo updated_at (p. ej. al guardar la colección) no cambia las páginas
+        published = bool(settings.CATALOG_STATIC_ROOT) and bool(kwargs.keys() - {'updated_at'})
+        rows_before = list(self.values_list('pk', 'collection_id')) if published else []
+        if published:
+            product_ids = [pk for pk, _ in rows_before]
+        elif reindexed or self._reprices(kwargs):
+            product_ids = list(self.values_list('pk', flat=True))
+        else:
+            product_ids = []
+        repriced = product_ids if self._reprices(kwargs) else []
+
+        if not PARENT_FIELDS & kwargs.keys():
+            rows = super().update(**kwargs)
+            bump_catalog_version()
+            ProductTombstone.record(deactivated, ProductTombstone.DEACTIVATED)
+            self._send_prices_changed(repriced)
+            if reindexed:
+                search.index_products(product_ids)
+            if published:
+                self._republish(product_ids, {collection_id for _, collection_id in rows_before})
+            return rows
+        collection_ids, category_ids = _parent_ids(self.values_list('collection_id', 'category_id').distinct())
+        rows = super().update(**kwargs)
+        bump_catalog_version()
+        for name, ids in (('collection', collection_ids), ('category', category_ids)):
+            value = kwargs.get(name, kwargs.get(f'{name}_id'))
+            if value is not None:
+                ids.add(getattr(value, 'pk', value))
+        recount_pieces(collection_ids, category_ids)
+        ProductTombstone.record(deactivated, ProductTombstone.DEACTIVATED)
+        self._send_prices_changed(repriced)
+        search.index_products(product_ids)
+        if published:
+            self._republish(product_ids, collection_ids, collections_index=True)
+        return rows
+
+    def _index(self, objs, changed=True):
+        """Refresh the search index rows of ``objs``; rows without a returned id are found by what the index lacks"""
+        from . import search
+        if changed:
+            search.index_products(obj.pk for obj in objs if obj.pk is not None)
+        if not changed or any(obj.pk is None for obj in objs):
+            search.index_missing()
+
+    def _republish(self, product_ids, collection_ids, collections_index=False):
+        # Import diferido: publish importa las vistas, que importan este módulo
+        from .publish import republish_on_commit
+        republish_on_commit(product_ids, collection_ids, collections_index)
+
+    def _reprices(self, fields):
+        # Los ids solo se buscan si el precio cambia y alguien escucha prices_changed
+        return 'price' in fields and prices_changed.has_listeners(self.model)
+
+    def _send_prices_changed(self, product_ids):
+        if product_ids:
+            prices_changed.send(sender=self.model, product_ids=product_ids)
 
 
 class Product(models.Model):
@@ -75,8 +275,43 @@ class Product(models.Model):
     )
     stock = models.PositiveIntegerField(default=0)
     image = models.ImageField(upload_to="products/", blank=True, null=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text="Resized copies of the image, see catalog.images")
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        # Índices parciales para la matriz de filtros/orden de la tienda,
+        # todos terminan en id para el desempate de la paginación por cursor
+        indexes = [
+            models.Index(fields=['name', 'id'], condition=Q(is_active=True), name='product_active_name_idx'),
+            models.Index(fields=['price', 'id'], condition=Q(is_active=True), name='product_active_price_idx'),
+            models.Index(fields=['created_at', 'id'], condition=Q(is_active=True), name='product_active_created_idx'),
+            models.Index(fields=['price', 'id'], condition=Q(is_active=True, stock__gt=0), name='product_instock_price_idx'),
+            models.Index(fields=['name', 'id'], condition=Q(is_active=True, stock__gt=0), name='product_instock_name_idx'),
+            models.Index(fields=['category', 'price', 'id'], condition=Q(is_active=True), name='product_cat_price_idx'),
+            models.Index(fields=['category', 'name', 'id'], condition=Q(is_active=True), name='product_cat_name_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], condition=Q(is_active=True), name='product_cat_created_idx'),
+            models.Index(fields=['collection', 'price', 'id'], condition=Q(is_active=True), name='product_col_price_idx'),
+            models.Index(fields=['collection', 'name', 'id'], condition=Q(is_active=True), name='product_col_name_idx'),
+            models.Index(fields=['collection', 'created_at', 'id'], condition=Q(is_active=True), name='product_col_created_idx'),
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # FKs con los que se cargó la instancia; catalog.signals los compara al guardar
+        self._loaded_parents = (
+            self.__dict__.get('collection_id', DEFERRED),
+            self.__dict__.get('category_id', DEFERRED),
+        )
+        # Estado con el que se cargó; pasar a inactivo deja una lápida para la sincronización
+        self._loaded_active = self.__dict__.get('is_active', DEFERRED)
+        # Precio con el que se cargó; si cambia se envía prices_changed
+        self._loaded_price = self.__dict__.get('price', DEFERRED)
 
     def clean(self):
         """Validación personalizada del modelo"""
@@ -95,4 +330,93 @@ class Product(models.Model):
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+
+class ProductTombstone(models.Model):
+    """A product that left the active catalog, reported to delta sync clients"""
+    DELETED = 'deleted'
+    DEACTIVATED = 'deactivated'
+    REASON_CHOICES = [
+        (DELETED, 'Deleted'),
+        (DEACTIVATED, 'Deactivated'),
+    ]
+
+    # Sin FK: el producto puede no existir ya
+    product_id = models.PositiveIntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    removed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['removed_at', 'id']
+
+    def __str__(self):
+        return f"{self.product_id} ({self.reason})"
+
+    @classmethod
+    def record(cls, product_ids, reason):
+        if product_ids:
+            cls.objects.bulk_create([cls(product_id=product_id, reason=reason) for product_id in product_ids])
+
+
+class SearchDocumentField(models.TextField):
+    """The hidden FTS5 column named after its table; only used with ``__match``"""
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class ProductSearchEntry(models.Model):
+    """
+    Row of the SQLite FTS5 search index of a product, joined by catalog.search.
+    The virtual table is created by migration 0005 and written with raw SQL.
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='search_entry'
+    )
+    document = SearchDocumentField(db_column='catalog_product_search')
+
+    class Meta:
+        managed = False
+        db_table = 'catalog_product_search'
+
+
+def _parent_ids(rows):
+    """Split (collection_id, category_id) pairs into two sets of ids"""
+    collection_ids, category_ids = set(), set()
+    for collection_id, category_id in rows:
+        if collection_id:
+            collection_ids.add(collection_id)
+        if category_id:
+            category_ids.add(category_id)
+    return collection_ids, category_ids
+
+
+def recount_pieces(collection_ids=None, category_ids=None):
+    """
+    Recompute the ``pieces`` counters from the product table with one UPDATE
+    per model. ``None`` recounts every row; an empty set recounts none.
+    """
+    for model, field, ids in ((Collection, 'collection', collection_ids), (Category, 'category', category_ids)):
+        if ids is None:
+            queryset = model.objects.all()
+        elif ids:
+            queryset = model.objects.filter(pk__in=ids)
+        else:
+            continue
+        counts = (
+            Product.objects.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        queryset.update(pieces=Coalesce(Subquery(counts), 0))
@@ -0,0 +1,122 @@
+"""
+In-memory indexes over product, collection and category names.
+
+``NameIndex`` holds the names of the active products, collections and
+categories, and follows the catalog version like the snapshot does. Instead
+of reloading everything after each write, it applies the product delta since
+its last refresh (``catalog.sync.changes_since``) to a copy of itself and
+swaps the copy in. Collections and categories are few, so they are simply
+reloaded. Subclasses keep their lookup structures in step through ``add``
+and ``remove``.
+"""
+import threading
+import time
+import unicodedata
+
+from .models import Category, Collection, Product
+from .sync import changes_since
+from .versioning import get_catalog_version
+
+# A delta touching more than this share of the products triggers a full rebuild
+REBUILD_RATIO = 0.25
+
+# Seconds between full rebuilds. Rows a rolled-back transaction showed to a
+# refresh never leave a tombstone, so they are dropped at the next rebuild.
+FULL_REBUILD_SECONDS = 15 * 60
+
+_lock = threading.Lock()
+_indexes = {}
+
+
+def fold(text):
+    """Lowercase ``text`` and strip its accents"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold().strip()
+
+
+class NameIndex:
+    """Names by (kind, id), kept current through add/remove"""
+
+    def __init__(self, version=None, synced_at=None, built_at=None):
+        self.version = version
+        self.synced_at = synced_at
+        self.built_at = time.monotonic() if built_at is None else built_at
+        self.names = {}
+
+    @classmethod
+    def build(cls):
+        version = get_catalog_version()
+        changes = changes_since(Product.objects.filter(is_active=True), None)
+        index = cls(version, changes.next_moment)
+        index.load([
+            ('collection', Collection.objects.values_list('id', 'name')),
+            ('category', Category.objects.values_list('id', 'name')),
+            ('product', changes.products.values_list('id', 'name')),
+        ])
+        return index
+
+    def load(self, sources):
+        """Fill an empty index from (kind, rows) pairs; subclasses may bulk-load"""
+        for kind, rows in sources:
+            for pk, name in rows:
+                self.add(kind, pk, name)
+
+    def copy(self, version, synced_at):
+        """Return a copy that can be changed without affecting this index"""
+        index = type(self)(version, synced_at, self.built_at)
+        index.names = dict(self.names)
+        return index
+
+    def refreshed(self):
+        """Return a copy brought up to the current catalog version"""
+        if time.monotonic() - self.built_at > FULL_REBUILD_SECONDS:
+            return type(self).build()
+        version = get_catalog_version()
+        changes = changes_since(Product.objects.filter(is_active=True), self.synced_at)
+        changed = list(changes.products.values_list('id', 'name'))
+        products = sum(1 for kind, _ in self.names if kind == 'product')
+        if len(changed) + len(changes.removed) > max(50, products * REBUILD_RATIO):
+            return type(self).build()
+
+        index = self.copy(version, changes.next_moment)
+        for kind, model in (('collection', Collection), ('category', Category)):
+            current = dict(model.objects.values_list('id', 'name'))
+            for _, pk in [ref for ref in index.names if ref[0] == kind]:
+                if current.get(pk) != index.names[(kind, pk)]:
+                    index.remove(kind, pk)
+            for pk, name in current.items():
+                if (kind, pk) not in index.names:
+                    index.add(kind, pk, name)
+        for pk in changes.removed:
+            index.remove('product', pk)
+        for pk, name in changed:
+            index.remove('product', pk)
+            index.add('product', pk, name)
+        return index
+
+    def add(self, kind, pk, name):
+        self.names[(kind, pk)] = name
+
+    def remove(self, kind, pk):
+        return self.names.pop((kind, pk), None)
+
+
+def get_index(cls):
+    """Return the ``cls`` index of the current catalog version, refreshing it if needed"""
+    index = _indexes.get(cls)
+    if index is not None and index.version == get_catalog_version():
+        return index
+    with _lock:
+        index = _indexes.get(cls)
+        if index is None:
+            index = cls.build()
+        elif index.version != get_catalog_version():
+            index = index.refreshed()
+        _indexes[cls] = index
+    return index
+
+
+def clear_indexes():
+    """Drop every cached index; the next lookup rebuilds from the database"""
+    with _lock:
+        _indexes.clear()
@@ -0,0 +1,151 @@
+"""
+Keyset (cursor) pagination for product listings.
+
+Instead of OFFSET, each page remembers the sort key of its last product and
+the next page asks for rows strictly after it, so deep pages cost the same as
+the first one. Every ordering ends with ``id`` to break ties.
+"""
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+SORT_ORDERS = {
+    'name': ('name', 'id'),
+    'price_low': ('price', 'id'),
+    'price_high': ('-price', '-id'),
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+    # Only valid on querysets annotated by catalog.search.search_products
+    'relevance': ('search_rank', 'id'),
+}
+
+
+# Mayor id que cabe en un entero de 64 bits de la base de datos
+MAX_ID = 2 ** 63 - 1
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded or belongs to another sort"""
+
+
+def _to_json(value):
+    # isoformat() completo: DjangoJSONEncoder recorta los microsegundos
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(sort, values):
+    payload = json.dumps([sort, *[_to_json(value) for value in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Return the key values stored in ``cursor`` for the given sort"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Cursor inválido')
+    if not isinstance(payload, list) or len(payload) != len(SORT_ORDERS[sort]) + 1 or payload[0] != sort:
+        raise InvalidCursor('El cursor no corresponde al orden solicitado')
+    try:
+        return [_from_json(field.lstrip('-'), value) for field, value in zip(SORT_ORDERS[sort], payload[1:])]
+    except (ValidationError, TypeError, ValueError):
+        raise InvalidCursor('Cursor inválido')
+
+
+def _from_json(name, value):
+    """Convert a cursor value back to the type of its field, rejecting anything else"""
+    from .models import Product
+
+    if value is None or isinstance(value, (list, dict)):
+        raise ValueError(name)
+    if name == 'search_rank':
+        return float(value)
+    if name == 'id':
+        if isinstance(value, bool) or not isinstance(value, int) or not 0 < value <= MAX_ID:
+            raise ValueError(name)
+        return value
+    value = Product._meta.get_field(name).to_python(value)
+    if isinstance(value, Decimal) and not value.is_finite():
+        raise ValueError(name)
+    return value
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a ``?limit=`` value, clamped to 1..MAX_PAGE_SIZE"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _after(ordering, values):
+    """Build the row comparison (a, b) > (x, y) as a > x OR (a = x AND b > y)"""
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+class CursorPage:
+    """A page of products plus the cursor of the page that follows it"""
+
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_queryset(queryset, sort, cursor=None):
+    """Order ``queryset`` by ``sort`` and skip the rows up to ``cursor``"""
+    ordering = SORT_ORDERS[sort]
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(_after(ordering, decode_cursor(cursor, sort)))
+    return queryset
+
+
+def paginate(queryset, sort='name', cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return one CursorPage of ``queryset`` ordered by ``sort``.
+
+    Raises InvalidCursor when ``cursor`` was not produced for this sort.
+    """
+    if sort not in SORT_ORDERS:
+        sort = 'name'
+    ordering = SORT_ORDERS[sort]
+    queryset = keyset_queryset(queryset, sort, cursor)
+
+    # Se pide una fila extra para saber si existe una página siguiente
+    items = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(sort, [getattr(last, field.lstrip('-')) for field in ordering])
+    return CursorPage(items, next_cursor)
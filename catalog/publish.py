@@ -0,0 +1,160 @@
+"""
+Static pre-rendering of the catalog pages.
+
+The collections index, every collection page and every active product page
+are rendered for anonymous visitors in each language of
+``PUBLISH_LANGUAGES`` and written as ``<root>/<lang><url>index.html``, plus
+gzip (and Brotli, if the ``brotli`` package is installed) copies next to it.
+A front web server can then answer those URLs without calling Django, e.g.
+nginx with ``gzip_static on`` and
+``try_files /$lang$uri/index.html @django`` for requests without a session
+cookie or query string.
+
+``manage.py publish_static`` renders everything. When
+``settings.CATALOG_STATIC_ROOT`` is set, ``republish_on_commit`` re-renders
+only the pages a write affects, once the transaction commits: the handlers
+in ``catalog.signals`` call it for saves and deletes, and ``ProductQuerySet``
+for bulk writes (checkout stock updates, bulk adjustments, imports).
+
+Static pages cannot carry a per-visitor CSRF token: tokens are left empty and
+``static/js/static-csrf.js`` fills them from the cookie on submit, asking
+``core:csrf_cookie`` for one first when the visitor has none yet.
+"""
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.http import Http404
+from django.templatetags.static import static
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import translation
+
+from core.response_cache import compress
+
+from .models import Collection, Product
+
+PUBLISH_LANGUAGES = ('es', 'en')
+
+CSRF_INPUT_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+
+
+def collections_path():
+    return reverse('catalog:collections')
+
+
+def collection_path(collection_id):
+    return reverse('catalog:collection_detail', args=[collection_id])
+
+
+def product_path(product_id):
+    return reverse('catalog:product_detail', args=[product_id])
+
+
+def render_page(path, language):
+    """HTML of ``path`` as an anonymous visitor sees it in ``language``, or None if it is a 404"""
+    request = RequestFactory().get(path)
+    request.user = AnonymousUser()
+    request.LANGUAGE_CODE = language
+    match = resolve(path)
+    with translation.override(language):
+        try:
+            response = match.func(request, *match.args, **match.kwargs)
+        except Http404:
+            return None
+    if response.status_code != 200:
+        return None
+
+    content = CSRF_INPUT_RE.sub(rb'\1\2', response.content)
+    if b'csrfmiddlewaretoken' in content:
+        script = (
+            f'<script src="{static("js/static-csrf.js")}" data-csrf-url="{reverse("core:csrf_cookie")}" defer></script>'
+        ).encode()
+        content = content.replace(b'</body>', script + b'</body>', 1)
+    return content
+
+
+def _page_dir(root, language, path):
+    return Path(root, language, path.strip('/'))
+
+
+def _write(target, content):
+    """Replace ``target`` atomically, leaving it untouched if nothing changed"""
+    if target.exists() and target.read_bytes() == content:
+        return
+    descriptor, temporary = tempfile.mkstemp(dir=target.parent, prefix='.publish-')
+    with os.fdopen(descriptor, 'wb') as handle:
+        handle.write(content)
+    os.chmod(temporary, 0o644)
+    os.replace(temporary, target)
+
+
+def write_page(root, language, path, content):
+    directory = _page_dir(root, language, path)
+    directory.mkdir(parents=True, exist_ok=True)
+    _write(directory / 'index.html', content)
+    for coding, compressed in compress(content, level=9).items():
+        _write(directory / f'index.html.{"gz" if coding == "gzip" else coding}', compressed)
+
+
+def remove_page(root, language, path):
+    shutil.rmtree(_page_dir(root, language, path), ignore_errors=True)
+
+
+def publish_page(root, path):
+    """Render ``path`` in every language; a page that is now a 404 is removed"""
+    for language in PUBLISH_LANGUAGES:
+        content = render_page(path, language)
+        if content is None:
+            remove_page(root, language, path)
+        else:
+            write_page(root, language, path, content)
+
+
+def publish_pages(root, product_ids=(), collection_ids=(), collections_index=False):
+    """Re-render the given pages; inactive or deleted products lose theirs"""
+    active = set(Product.objects.filter(pk__in=product_ids, is_active=True).values_list('pk', flat=True))
+    for product_id in product_ids:
+        if product_id in active:
+            publish_page(root, product_path(product_id))
+        else:
+            for language in PUBLISH_LANGUAGES:
+                remove_page(root, language, product_path(product_id))
+    for collection_id in collection_ids:
+        publish_page(root, collection_path(collection_id))
+    if collections_index:
+        publish_page(root, collections_path())
+
+
+def republish_on_commit(product_ids=(), collection_ids=(), collections_index=False):
+    """Re-render the affected pages once the write is committed, if publishing is enabled"""
+    root = settings.CATALOG_STATIC_ROOT
+    if root:
+        product_ids, collection_ids = list(product_ids), [pk for pk in set(collection_ids) if pk]
+        transaction.on_commit(
+            lambda: publish_pages(root, product_ids, collection_ids, collections_index)
+        )
+
+
+def publish_all(root):
+    """Render every catalog page and drop pages of removed objects; return the page count"""
+    product_ids = list(Product.objects.filter(is_active=True).values_list('pk', flat=True))
+    collection_ids = list(Collection.objects.values_list('pk', flat=True))
+    publish_pages(root, product_ids, collection_ids, collections_index=True)
+
+    expected = {product_path(pk) for pk in product_ids} | {collection_path(pk) for pk in collection_ids}
+    for language in PUBLISH_LANGUAGES:
+        for sample in (product_path(0), collection_path(0)):
+            parent = _page_dir(root, language, sample).parent
+            if not parent.is_dir():
+                continue
+            for directory in parent.iterdir():
+                path = '/' + str(directory.relative_to(Path(root, language))).replace(os.sep, '/') + '/'
+                if directory.is_dir() and path not in expected:
+                    shutil.rmtree(directory, ignore_errors=True)
+    return (len(product_ids) + len(collection_ids) + 1) * len(PUBLISH_LANGUAGES)
@@ -0,0 +1,164 @@
+"""
+Full-text search over the product catalog.
+
+Products are indexed in an SQLite FTS5 table together with the names of
+their collection and category. The index is kept in sync by the handlers in
+``catalog.signals`` and by the bulk writes of ``ProductQuerySet``, and can be
+rebuilt with ``manage.py rebuild_search_index``.
+When the table is not available (other database engines, or migrations not
+applied yet) searches fall back to ``icontains`` filters.
+"""
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Func, Q, Value
+
+from .models import Category, Collection, Product
+
+SEARCH_TABLE = 'catalog_product_search'
+
+# bm25 weights for the name, description, collection_name and category_name columns
+COLUMN_WEIGHTS = (10.0, 1.0, 5.0, 5.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_available = None
+
+
+def is_available():
+    """Return True when the FTS5 index table exists in the default database"""
+    global _available
+    if connection.vendor != 'sqlite':
+        return False
+    if _available is None:
+        _available = SEARCH_TABLE in connection.introspection.table_names()
+    return _available
+
+
+def build_match_query(text):
+    """
+    Convierte el texto del usuario en una consulta MATCH segura.
+    Cada palabra se busca como prefijo ("neo" encuentra "NEON NIGHTS").
+    """
+    tokens = TOKEN_RE.findall(text or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _bm25(table=SEARCH_TABLE):
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    return f"bm25({table}, {weights})"
+
+
+def ranked_ids(text, limit=None):
+    """Return product ids matching ``text``, best match first"""
+    match = build_match_query(text)
+    if not match:
+        return []
+    sql = f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY {_bm25()}"
+    params = [match]
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+class SearchRank(Func):
+    """bm25 score of the joined index row, lower is more relevant"""
+    output_field = FloatField()
+
+    def __init__(self):
+        super().__init__(F('search_entry__document'))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # El argumento de bm25 es la columna oculta con el nombre (o alias) de la tabla
+        return super().as_sql(compiler, connection, template=_bm25('%(expressions)s'), **extra_context)
+
+
+def search_products(queryset, text):
+    """
+    Restrict ``queryset`` to products matching ``text``.
+
+    The result is annotated with ``search_rank`` (lower is more relevant)
+    so callers can order by relevance with ``order_by('search_rank')``. The
+    index is joined on the product id and filtered with MATCH in the same
+    query, so the other filters, counts and pages see every matching product.
+    """
+    if not is_available():
+        return queryset.filter(
+            Q(name__icontains=text) |
+            Q(description__icontains=text) |
+            Q(collection__name__icontains=text) |
+            Q(category__name__icontains=text)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    match = build_match_query(text)
+    if not match:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    return queryset.filter(search_entry__document__match=match).annotate(search_rank=SearchRank())
+
+
+def _reindex(where, params):
+    """Re-insert the index rows of the products selected by ``where``"""
+    if not is_available():
+        return
+    product_table = Product._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN "
+            f"(SELECT p.id FROM {product_table} p WHERE {where})",
+            params,
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, name, description, collection_name, category_name) "
+            f"SELECT p.id, p.name, p.description, COALESCE(c.name, ''), COALESCE(g.name, '') "
+            f"FROM {product_table} p "
+            f"LEFT JOIN {Collection._meta.db_table} c ON c.id = p.collection_id "
+            f"LEFT JOIN {Category._meta.db_table} g ON g.id = p.category_id "
+            f"WHERE {where}",
+            params,
+        )
+
+
+def index_products(product_ids):
+    """Refresh the index rows of the given products"""
+    product_ids = list(product_ids)
+    if product_ids:
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        _reindex(f'p.id IN ({placeholders})', product_ids)
+
+
+def index_missing():
+    """Index the products that have no index row yet"""
+    _reindex(f'p.id NOT IN (SELECT rowid FROM {SEARCH_TABLE})', [])
+
+
+def index_collection(collection_id):
+    """Refresh the index rows of every product in a collection"""
+    _reindex('p.collection_id = %s', [collection_id])
+
+
+def index_category(category_id):
+    """Refresh the index rows of every product in a category"""
+    _reindex('p.category_id = %s', [category_id])
+
+
+def remove_products(product_ids):
+    """Drop the index rows of deleted products"""
+    product_ids = list(product_ids)
+    if not product_ids or not is_available():
+        return
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", product_ids)
+
+
+def rebuild_index():
+    """Rebuild the whole index from the product table"""
+    if not is_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+    _reindex('1 = 1', [])
+    return Product.objects.count()
@@ -0,0 +1,198 @@
+from django.db import transaction
+from django.db.models import DEFERRED, F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import images, publish, search
+from .models import Category, Collection, Product, ProductTombstone, prices_changed
+from .versioning import bump_catalog_version
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, raw=False, **kwargs):
+    """Keep the search index row of a product up to date"""
+    if not raw:
+        search.index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Collection)
+def index_collection_products(sender, instance, created, raw=False, **kwargs):
+    """A renamed collection changes the indexed text of all its products"""
+    if not raw and not created:
+        search.index_collection(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def index_category_products(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        search.index_category(instance.pk)
+
+
+@receiver(pre_delete, sender=Collection)
+@receiver(pre_delete, sender=Category)
+def remember_indexed_products(sender, instance, **kwargs):
+    # Los productos quedan con la FK en NULL; guardamos sus ids para reindexarlos
+    instance._indexed_product_ids = list(instance.products.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Collection)
+@receiver(post_delete, sender=Category)
+def reindex_orphaned_products(sender, instance, **kwargs):
+    search.index_products(getattr(instance, '_indexed_product_ids', []))
+
+
+def _move_piece(model, old_id, new_id):
+    if old_id == new_id:
+        return
+    if old_id:
+        model.objects.filter(pk=old_id, pieces__gt=0).update(pieces=F('pieces') - 1)
+    if new_id:
+        model.objects.filter(pk=new_id).update(pieces=F('pieces') + 1)
+
+
+@receiver(pre_save, sender=Product)
+def load_previous_parents(sender, instance, raw=False, **kwargs):
+    """Fetch the stored FKs when the instance was loaded with them deferred"""
+    if not raw and not instance._state.adding and DEFERRED in instance._loaded_parents:
+        previous = sender.objects.filter(pk=instance.pk).values_list('collection_id', 'category_id').first()
+        instance._loaded_parents = previous or (None, None)
+
+
+@receiver(post_save, sender=Product)
+def update_piece_counters(sender, instance, created, raw=False, **kwargs):
+    """Move the product between the ``pieces`` counters of its collection/category"""
+    if raw:
+        return
+    old_collection_id, old_category_id = (None, None) if created else instance._loaded_parents
+    _move_piece(Collection, old_collection_id, instance.collection_id)
+    _move_piece(Category, old_category_id, instance.category_id)
+
+    # Mantener coherentes las instancias relacionadas que ya están en memoria
+    for field, old_id in (('collection', old_collection_id), ('category', old_category_id)):
+        descriptor = getattr(sender, field)
+        if old_id != getattr(instance, f'{field}_id') and descriptor.is_cached(instance):
+            parent = getattr(instance, field)
+            if parent is not None:
+                parent.pieces += 1
+
+    instance._loaded_parents = (instance.collection_id, instance.category_id)
+
+
+@receiver(post_delete, sender=Product)
+def release_piece_counters(sender, instance, **kwargs):
+    _move_piece(Collection, instance.collection_id, None)
+    _move_piece(Category, instance.category_id, None)
+
+
+@receiver(post_save, sender=Product)
+def record_deactivation(sender, instance, created, raw=False, **kwargs):
+    """Leave a tombstone when an active product is switched off"""
+    if not raw and not created and not instance.is_active and instance._loaded_active is not False:
+        ProductTombstone.record([instance.pk], ProductTombstone.DEACTIVATED)
+    instance._loaded_active = instance.is_active
+
+
+@receiver(post_save, sender=Product)
+def announce_price_change(sender, instance, created, raw=False, **kwargs):
+    """Send prices_changed when a saved product's price differs from the loaded one"""
+    price = instance.__dict__.get('price', DEFERRED)
+    if not raw and not created and price is not DEFERRED and price != instance._loaded_price:
+        prices_changed.send(sender=Product, product_ids=[instance.pk])
+    instance._loaded_price = price
+
+
+@receiver(post_delete, sender=Product)
+def record_deletion(sender, instance, **kwargs):
+    ProductTombstone.record([instance.pk], ProductTombstone.DELETED)
+
+
+@receiver(post_save, sender=Collection)
+@receiver(post_save, sender=Category)
+def touch_related_products(sender, instance, created, raw=False, **kwargs):
+    """Products embed their collection and category, so editing one changes them"""
+    if not raw and not created:
+        field = 'collection' if sender is Collection else 'category'
+        Product.objects.filter(**{field: instance}).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Collection)
+@receiver(post_delete, sender=Category)
+def touch_orphaned_products(sender, instance, **kwargs):
+    product_ids = getattr(instance, '_indexed_product_ids', [])
+    if product_ids:
+        Product.objects.filter(pk__in=product_ids).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=Product)
+def remember_published_collection(sender, instance, raw=False, **kwargs):
+    # Runs after load_previous_parents, so the stored FK is known
+    if not raw:
+        instance._published_collection_id = instance._loaded_parents[0]
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def republish_product(sender, instance, raw=False, **kwargs):
+    """The product page, the collection pages listing it and the index with their counts"""
+    if not raw:
+        collection_ids = {getattr(instance, '_published_collection_id', None), instance.collection_id}
+        publish.republish_on_commit([instance.pk], collection_ids, collections_index=True)
+
+
+@receiver(post_save, sender=Collection)
+@receiver(post_save, sender=Category)
+def republish_parent(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    product_ids = [] if created else instance.products.filter(is_active=True).values_list('pk', flat=True)
+    if sender is Collection:
+        publish.republish_on_commit(product_ids, [instance.pk], collections_index=True)
+    else:
+        publish.republish_on_commit(product_ids)
+
+
+@receiver(post_delete, sender=Collection)
+@receiver(post_delete, sender=Category)
+def republish_orphaned_products(sender, instance, **kwargs):
+    product_ids = getattr(instance, '_indexed_product_ids', [])
+    if sender is Collection:
+        # La página de la colección ya da 404 y se elimina
+        publish.republish_on_commit(product_ids, [instance.pk], collections_index=True)
+    else:
+        publish.republish_on_commit(product_ids)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Collection)
+@receiver(post_save, sender=Category)
+def build_image_derivatives(sender, instance, raw=False, **kwargs):
+    """Resize a newly uploaded image in the worker pool once the upload is committed"""
+    if not raw and images.needs_derivatives(instance):
+        transaction.on_commit(lambda: images.submit_derivatives(instance))
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Collection)
+@receiver(post_delete, sender=Category)
+def remove_image_derivatives(sender, instance, **kwargs):
+    variants = instance.image_variants
+    if variants:
+        transaction.on_commit(lambda: images.remove_derivatives(variants))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Collection)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Collection)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_caches(sender, raw=False, **kwargs):
+    """Any catalog write invalidates the data cached under the catalog version"""
+    if not raw:
+        bump_catalog_version()
@@ -0,0 +1,118 @@
+"""
+Process-local snapshot of the active catalog.
+
+The snapshot holds every active product with its category and collection
+already resolved, plus the category and collection lists, and pre-sorted
+product orders for each shop sort. It is built once per catalog version
+(see ``catalog.versioning``) and swapped atomically: readers keep using the
+object they got, so a rebuild never exposes a half-built catalog.
+
+Snapshot contents are shared between requests and threads and must be
+treated as read-only.
+"""
+import threading
+from types import MappingProxyType
+
+from .models import Category, Collection, Product
+from .pagination import SORT_ORDERS, CursorPage, decode_cursor, encode_cursor
+from .versioning import get_catalog_version
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def _sort_key(fields):
+    names = [field.lstrip('-') for field in fields]
+    return lambda product: tuple(getattr(product, name) for name in names)
+
+
+class CatalogSnapshot:
+    """Immutable view of the active catalog at one catalog version"""
+
+    def __init__(self, version, products, categories, collections):
+        self.version = version
+        self.products = tuple(products)
+        self.by_id = MappingProxyType({product.id: product for product in self.products})
+        self.categories = tuple(categories)
+        self.collections = tuple(collections)
+        self.collections_by_id = MappingProxyType({collection.id: collection for collection in self.collections})
+
+        # Un orden precalculado por cada criterio de la tienda
+        orders = {}
+        for sort, fields in SORT_ORDERS.items():
+            if sort == 'relevance':
+                continue
+            orders[sort] = tuple(sorted(
+                self.products,
+                key=_sort_key(fields),
+                reverse=fields[0].startswith('-'),
+            ))
+        self.orders = MappingProxyType(orders)
+
+    @classmethod
+    def build(cls):
+        version = get_catalog_version()
+        products = Product.objects.filter(is_active=True).select_related('category', 'collection')
+        return cls(
+            version,
+            list(products),
+            list(Category.objects.all()),
+            list(Collection.objects.all()),
+        )
+
+    def matches(self, product, filters):
+        """Python version of ShopFilters.apply (search is not supported)"""
+        if filters.category is not None and product.category_id != filters.category:
+            return False
+        if filters.collection is not None and product.collection_id != filters.collection:
+            return False
+        if filters.min_price is not None and product.price < filters.min_price:
+            return False
+        if filters.max_price is not None and product.price > filters.max_price:
+            return False
+        if filters.stock == 'in_stock' and product.stock <= 0:
+            return False
+        if filters.stock == 'out_of_stock' and product.stock != 0:
+            return False
+        return True
+
+    def listing(self, filters):
+        """Return the active products matching ``filters`` in ``filters.sort`` order"""
+        return [product for product in self.orders[filters.sort] if self.matches(product, filters)]
+
+    def page(self, filters, cursor=None, limit=None):
+        """Keyset page over ``listing(filters)``, with the same cursors as the ORM"""
+        fields = SORT_ORDERS[filters.sort]
+        key = _sort_key(fields)
+        products = self.listing(filters)
+        if cursor:
+            values = decode_cursor(cursor, filters.sort)
+            last = tuple(
+                Product._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(fields, values)
+            )
+            if fields[0].startswith('-'):
+                products = [product for product in products if key(product) < last]
+            else:
+                products = [product for product in products if key(product) > last]
+
+        next_cursor = None
+        if limit is not None and len(products) > limit:
+            products = products[:limit]
+            next_cursor = encode_cursor(filters.sort, key(products[-1]))
+        return CursorPage(products, next_cursor)
+
+
+def get_snapshot():
+    """Return the snapshot of the current catalog version, rebuilding it if needed"""
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == get_catalog_version():
+        return snapshot
+    with _lock:
+        # Otro hilo pudo reconstruirla mientras esperábamos el candado
+        snapshot = _snapshot
+        if snapshot is None or snapshot.version != get_catalog_version():
+            snapshot = CatalogSnapshot.build()
+            _snapshot = snapshot
+    return snapshot
@@ -0,0 +1,86 @@
+"""
+Typeahead suggestions over product, collection and category names.
+
+Names are folded to lowercase without accents ("Camión" -> "camion") and
+stored in a sorted array once per word start, so "neo" finds both
+"NEON NIGHTS" and "Camiseta Neón". A query is a ``bisect`` into that array
+followed by a short scan of the keys that share its prefix; no database
+access is needed. The index is refreshed incrementally with the catalog
+(see ``catalog.names``).
+"""
+from bisect import bisect_left, insort
+
+from .names import NameIndex, fold, get_index
+
+# Orden de los tipos cuando dos sugerencias empatan
+KINDS = ('collection', 'category', 'product')
+
+# Keys read per query at most; keeps popular one-letter prefixes fast
+MAX_SCAN = 200
+
+
+def _items(kind, pk, name):
+    """One (key, kind, id, word) item per word start: 'Buzo Neón' -> 'buzo neon', 'neon'"""
+    words = fold(name).split()
+    kind = KINDS.index(kind)
+    return [(' '.join(words[start:]), kind, pk, start) for start in range(len(words))]
+
+
+class SuggestionIndex(NameIndex):
+    """Sorted (key, kind, id, word) array plus the names it points to"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.items = []
+
+    def load(self, sources):
+        # Ordenar una vez es mucho más rápido que insertar en orden uno a uno
+        items = []
+        for kind, rows in sources:
+            for pk, name in rows:
+                self.names[(kind, pk)] = name
+                items.extend(_items(kind, pk, name))
+        items.sort()
+        self.items = items
+
+    def copy(self, version, synced_at):
+        index = super().copy(version, synced_at)
+        index.items = list(self.items)
+        return index
+
+    def add(self, kind, pk, name):
+        super().add(kind, pk, name)
+        for item in _items(kind, pk, name):
+            insort(self.items, item)
+
+    def remove(self, kind, pk):
+        name = super().remove(kind, pk)
+        if name is None:
+            return
+        for item in _items(kind, pk, name):
+            position = bisect_left(self.items, item)
+            if position < len(self.items) and self.items[position] == item:
+                del self.items[position]
+
+    def search(self, query, limit=8):
+        """Return up to ``limit`` (kind, id, name) matches for ``query``"""
+        prefix = fold(query)
+        if not prefix:
+            return []
+        matches = {}
+        position = bisect_left(self.items, (prefix,))
+        for key, kind, pk, word in self.items[position:position + MAX_SCAN]:
+            if not key.startswith(prefix):
+                break
+            name = self.names[(KINDS[kind], pk)]
+            # Coincidir desde el inicio del nombre pesa más que desde otra palabra
+            rank = (word > 0, kind, len(name), name)
+            if (kind, pk) not in matches or rank < matches[(kind, pk)]:
+                matches[(kind, pk)] = rank
+        ordered = sorted(matches, key=matches.get)[:limit]
+        return [(KINDS[kind], pk, self.names[(KINDS[kind], pk)]) for kind, pk in ordered]
+
+
+def get_suggestion_index():
+    """Return the suggestion index of the current catalog version"""
+    return get_index(SuggestionIndex)
@@ -0,0 +1,80 @@
+"""
+Delta sync for catalog consumers.
+
+A sync token marks a point in time. ``changes_since`` returns the active
+products whose ``updated_at`` is later than the token, the ids of products
+that left the active catalog since then (from ``ProductTombstone``) and a new
+token to send next time. An empty token starts a full sync.
+
+The new token lags ``settings.CATALOG_SYNC_WINDOW`` seconds behind the clock:
+a write whose transaction commits after the response was built but carries an
+earlier ``updated_at`` is then still picked up by the next sync. Rows inside
+the window may be sent twice; clients apply changes as upserts, so that is
+harmless.
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Product, ProductTombstone
+
+
+class InvalidSyncToken(ValueError):
+    """Raised when a ?since= token cannot be decoded"""
+
+
+def encode_sync_token(moment):
+    payload = json.dumps(['sync', moment.isoformat()], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_sync_token(token):
+    """Return the moment stored in ``token``, or None for an initial sync"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        kind, moment = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        moment = datetime.fromisoformat(moment)
+    except (ValueError, TypeError):
+        raise InvalidSyncToken('Token de sincronización inválido')
+    if kind != 'sync' or timezone.is_naive(moment):
+        raise InvalidSyncToken('Token de sincronización inválido')
+    return moment
+
+
+class Changes:
+    """Products changed and removed since a sync token, plus where to resume"""
+
+    def __init__(self, products, removed, next_moment):
+        self.products = products
+        self.removed = removed
+        self.next_moment = next_moment
+
+    @property
+    def next_token(self):
+        return encode_sync_token(self.next_moment)
+
+
+def changes_since(products, since):
+    """
+    Delta of ``products`` (an active-products queryset) since ``since``.
+
+    ``since`` is a moment from decode_sync_token; None returns every product.
+    """
+    now = timezone.now()
+    next_moment = now - timedelta(seconds=settings.CATALOG_SYNC_WINDOW)
+    if since is None:
+        return Changes(products.order_by('updated_at', 'id'), [], next_moment)
+
+    changed = products.filter(updated_at__gt=since).order_by('updated_at', 'id')
+    removed_ids = set(
+        ProductTombstone.objects.filter(removed_at__gt=since).values_list('product_id', flat=True)
+    )
+    # Un producto reactivado desde entonces viaja en "products", no en "removed"
+    if removed_ids:
+        removed_ids -= set(Product.objects.filter(pk__in=removed_ids, is_active=True).values_list('pk', flat=True))
+    return Changes(changed, sorted(removed_ids), max(since, next_moment))
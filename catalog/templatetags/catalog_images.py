@@ -0,0 +1,58 @@
+# Template tags for catalog images
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from catalog.images import FORMATS, derivative_name
+
+register = template.Library()
+
+
+def _srcset(name, widths, image_format):
+    return ', '.join(f'{default_storage.url(derivative_name(name, width, image_format))} {width}w' for width in widths)
+
+
+@register.simple_tag
+def responsive_image(obj, sizes='100vw', css_class='', alt=None, loading='lazy'):
+    """
+    Render the image of a product, collection or category with its resized
+    copies as ``srcset`` and a blurred placeholder until it loads.
+
+    Ejemplo: {% responsive_image product sizes="(min-width: 1280px) 33vw, 100vw" css_class="w-full h-80" %}
+    """
+    image = obj.image
+    if not image:
+        return ''
+    alt = obj.name if alt is None else alt
+    variants = obj.image_variants or {}
+
+    # Sin copias generadas para esta imagen se sirve el original
+    if variants.get('source') != image.name or not variants.get('widths'):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            image.url, alt, css_class, loading,
+        )
+
+    widths = variants['widths']
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((image_format, _srcset(image.name, widths, image_format), sizes)
+         for image_format in FORMATS if image_format != 'jpeg'),
+    )
+    return format_html(
+        '<picture style="display:contents">{}'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" '
+        'loading="{}" decoding="async" '
+        'style="background-image:url(\'{}\');background-size:cover;background-position:center">'
+        '</picture>',
+        sources,
+        default_storage.url(derivative_name(image.name, widths[-1], 'jpeg')),
+        _srcset(image.name, widths, 'jpeg'),
+        sizes,
+        obj.image_width,
+        obj.image_height,
+        alt,
+        css_class,
+        loading,
+        variants.get('placeholder', ''),
+    )
@@ -1,9 +1,33 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory, override_settings
 from django.urls import reverse
+from django.http import QueryDict
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from decimal import Decimal
-from .models import Product, Category, Collection
+import gzip
+import json
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+from pathlib import Path
+from io import BytesIO, StringIO
+from PIL import Image
+from .models import Product, Category, Collection, ProductTombstone
+from . import fuzzy, images, names, publish, search, suggest
+from .backends import NumpyBackend, ORMBackend, SnapshotBackend
+from .facets import get_facets
+from .filters import ShopFilters
+from .pagination import SORT_ORDERS, InvalidCursor, encode_cursor, paginate
+from .snapshot import get_snapshot
+from .versioning import get_catalog_version
+from .views import stream_products
 
 User = get_user_model()
 
@@ -377,3 +401,1286 @@ class CategoryTestCase(TestCase):
         )
         
         self.assertEqual(category.pieces, 2)
+
+
+class ProductSearchTestCase(TestCase):
+    """Pruebas para el índice de búsqueda de texto completo"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Hoodies")
+        self.collection = Collection.objects.create(
+            name="NEON NIGHTS",
+            season="SS24",
+            description="Vibrant colors"
+        )
+        self.by_name = Product.objects.create(
+            name="Neon Hoodie",
+            price=Decimal('90000.00'),
+            stock=5,
+            category=self.category
+        )
+        self.by_description = Product.objects.create(
+            name="Basic Tee",
+            description="Estampado neon en la espalda",
+            price=Decimal('50000.00'),
+            stock=5,
+            category=self.category
+        )
+
+    def test_search_ranks_name_matches_first(self):
+        """Test 23: Las coincidencias en el nombre aparecen primero"""
+        response = self.client.get(reverse('catalog:shop'), {'search': 'neon'})
+
+        self.assertEqual(list(response.context['products']), [self.by_name, self.by_description])
+        self.assertEqual(response.context['sort_by'], 'relevance')
+
+    def test_search_is_accent_insensitive_and_prefix_based(self):
+        """Test 24: La búsqueda ignora tildes y acepta prefijos"""
+        Product.objects.create(name="Camisón Térmico", price=Decimal('70000.00'), stock=1)
+
+        names = [p.name for p in search.search_products(Product.objects.all(), 'termi')]
+
+        self.assertEqual(names, ["Camisón Térmico"])
+
+    def test_index_follows_collection_rename(self):
+        """Test 25: Renombrar una colección actualiza el índice de sus productos"""
+        self.by_description.collection = self.collection
+        self.by_description.save()
+        self.collection.name = "CONCRETE DREAMS"
+        self.collection.save()
+
+        results = search.search_products(Product.objects.all(), 'concrete')
+
+        self.assertEqual(list(results), [self.by_description])
+
+    def test_deleted_product_leaves_index(self):
+        """Test 26: Un producto eliminado deja de aparecer en la búsqueda"""
+        self.by_name.delete()
+
+        self.assertEqual(search.ranked_ids('neon'), [self.by_description.id])
+
+    def test_products_api_search(self):
+        """Test 27: La API de productos acepta el parámetro search"""
+        response = self.client.get(reverse('catalog:products_api'), {'search': 'tee'})
+
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['products'][0]['name'], "Basic Tee")
+
+    def test_search_has_no_result_cap(self):
+        """Test 86: La búsqueda cuenta, filtra y pagina todas las coincidencias, no solo las primeras"""
+        polos = Category.objects.create(name="Polos")
+        Product.objects.bulk_create(
+            [Product(name=f"Camisa {index}", price=Decimal('40000.00'), stock=1) for index in range(1200)]
+            + [Product(name=f"Camisa polo {index}", price=Decimal('45000.00'), stock=1, category=polos) for index in range(3)]
+        )
+
+        response = self.client.get(reverse('catalog:shop'), {'search': 'camisa'})
+        self.assertEqual(response.context['total_count'], 1203)
+        response = self.client.get(reverse('catalog:shop'), {'search': 'camisa', 'category': polos.id})
+        self.assertEqual(response.context['total_count'], 3)
+        self.assertEqual(self.client.get(reverse('catalog:products_api'), {'search': 'camisa'}).json()['count'], 1203)
+
+        # Los nombres cortos puntúan mejor; el cursor sigue el mismo orden hasta el final
+        seen, cursor = [], None
+        while True:
+            page = paginate(search.search_products(Product.objects.all(), 'camisa'), 'relevance', cursor, limit=100)
+            seen.extend(product.id for product in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        ranked = search.search_products(Product.objects.all(), 'camisa').order_by('search_rank', 'id')
+        self.assertEqual(seen, list(ranked.values_list('id', flat=True)))
+        self.assertEqual(len(set(seen)), 1203)
+
+    def test_bulk_writes_update_index(self):
+        """Test 87: Las escrituras en bloque mantienen el índice de búsqueda al día"""
+        created, = Product.objects.bulk_create([Product(name="Chaqueta Reflectiva", price=Decimal('90000.00'), stock=2)])
+        self.assertEqual(search.ranked_ids('reflectiva'), [created.id])
+
+        Product.objects.filter(pk=created.pk).update(name="Chaqueta Holográfica")
+        self.assertEqual(search.ranked_ids('reflectiva'), [])
+        self.assertEqual(search.ranked_ids('holografica'), [created.id])
+
+        created.description = "Impermeable"
+        Product.objects.bulk_update([created], ['description'])
+        self.assertEqual(search.ranked_ids('impermeable'), [created.id])
+
+        Product.objects.filter(pk=created.pk).update(collection=self.collection)
+        self.assertIn(created.id, search.ranked_ids(self.collection.name))
+
+        upserted = [
+            Product(id=created.id, name="Parka", price=Decimal('90000.00')),
+            Product(id=created.id + 100, name="Parka Nueva", price=Decimal('90000.00')),
+        ]
+        Product.objects.bulk_create(upserted, update_conflicts=True, unique_fields=['id'], update_fields=['name'])
+        self.assertEqual(sorted(search.ranked_ids('parka')), [created.id, created.id + 100])
+        # Sin cambios de texto, un upsert solo indexa las filas nuevas
+        Product.objects.bulk_create(
+            [Product(id=created.id + 101, name="Parka Corta", price=Decimal('90000.00'))],
+            update_conflicts=True, unique_fields=['id'], update_fields=['price'],
+        )
+        self.assertEqual(len(search.ranked_ids('parka')), 3)
+
+
+class KeysetPaginationTestCase(TestCase):
+    """Pruebas para la paginación por cursor"""
+
+    def setUp(self):
+        self.collection = Collection.objects.create(
+            name="METRO PULSE",
+            season="SS23",
+            description="Technical wear"
+        )
+        # Precios repetidos para comprobar el desempate por id
+        for index in range(7):
+            Product.objects.create(
+                name=f"Producto {index}",
+                price=Decimal('50000.00') if index % 2 else Decimal('80000.00'),
+                stock=index,
+                collection=self.collection
+            )
+
+    def _walk(self, sort):
+        seen = []
+        cursor = None
+        while True:
+            page = paginate(Product.objects.all(), sort, cursor, limit=3)
+            seen.extend(product.id for product in page)
+            if not page.has_next:
+                return seen
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_sort_without_gaps(self):
+        """Test 28: Recorrer las páginas devuelve el mismo orden que la consulta completa"""
+        for sort, ordering in SORT_ORDERS.items():
+            if sort == 'relevance':
+                continue
+            with self.subTest(sort=sort):
+                expected = list(Product.objects.order_by(*ordering).values_list('id', flat=True))
+                self.assertEqual(self._walk(sort), expected)
+
+    def test_cursor_from_other_sort_is_rejected(self):
+        """Test 29: Un cursor no sirve para otro orden"""
+        page = paginate(Product.objects.all(), 'name', limit=3)
+
+        with self.assertRaises(InvalidCursor):
+            paginate(Product.objects.all(), 'price_low', page.next_cursor, limit=3)
+
+    def test_products_api_returns_next_cursor(self):
+        """Test 30: La API pagina con ?limit= y ?cursor="""
+        url = reverse('catalog:products_api')
+        first = self.client.get(url, {'limit': 5, 'sort': 'price_low'}).json()
+        second = self.client.get(url, {'limit': 5, 'sort': 'price_low', 'cursor': first['next_cursor']}).json()
+
+        self.assertEqual(first['count'], 5)
+        self.assertEqual(second['count'], 2)
+        self.assertIsNone(second['next_cursor'])
+        self.assertEqual(self.client.get(url, {'cursor': 'basura'}).status_code, 400)
+
+    def test_collection_detail_serves_next_page_as_json(self):
+        """Test 31: El detalle de colección entrega la siguiente página para el scroll infinito"""
+        url = reverse('catalog:collection_detail', args=[self.collection.id])
+        first = self.client.get(url, {'limit': 4})
+        second = self.client.get(
+            url,
+            {'limit': 4, 'cursor': first.context['next_cursor']},
+            HTTP_ACCEPT='application/json'
+        ).json()
+
+        self.assertEqual(len(first.context['products']), 4)
+        self.assertIn("Producto 6", second['html'])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_shop_load_more_serves_next_cards_as_json(self):
+        """Test 91: "Load more" de la tienda entrega solo las tarjetas siguientes para agregarlas a la grilla"""
+        url = reverse('catalog:shop')
+        first = self.client.get(url, {'limit': 4, 'sort': 'name'})
+        self.assertContains(first, 'data-load-more="shop-products"')
+        self.assertContains(first, 'id="shop-products"')
+        self.assertContains(first, 'js/infinite-scroll.js')
+
+        params = QueryDict(first.context['next_page_query'])
+        second = self.client.get(url, params, HTTP_ACCEPT='application/json').json()
+
+        self.assertIsNone(second['next_cursor'])
+        self.assertIn("Producto 6", second['html'])
+        self.assertNotIn("Producto 0", second['html'])
+        self.assertNotIn('<html', second['html'])
+
+    def test_cursor_values_of_wrong_type_are_rejected(self):
+        """Test 88: Un cursor bien formado con valores de otro tipo se trata como cursor inválido"""
+        cursors = {
+            'newest': encode_cursor('newest', ['notadate', 1]),
+            'price_low': encode_cursor('price_low', ['abc', 1]),
+            'name': encode_cursor('name', ['Producto 1', 2 ** 70]),
+        }
+        for sort, cursor in cursors.items():
+            with self.subTest(sort=sort):
+                with self.assertRaises(InvalidCursor):
+                    paginate(Product.objects.all(), sort, cursor, limit=3)
+
+                response = self.client.get(reverse('catalog:shop'), {'sort': sort, 'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['products']), 7)
+                response = self.client.get(
+                    reverse('catalog:collection_detail', args=[self.collection.id]), {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+                response = self.client.get(reverse('catalog:products_api'), {'sort': sort, 'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], 'Cursor inválido')
+
+
+class ProductsApiStreamingTestCase(TestCase):
+    """Pruebas para el modo streaming de la API de productos"""
+
+    def setUp(self):
+        category = Category.objects.create(name="Camisetas")
+        for index in range(5):
+            Product.objects.create(
+                name=f"Camiseta {index}",
+                price=Decimal('50000.00'),
+                stock=index,
+                category=category
+            )
+
+    def test_stream_matches_regular_response(self):
+        """Test 32: El modo streaming devuelve el mismo contenido que la respuesta normal"""
+        url = reverse('catalog:products_api')
+        regular = self.client.get(url).json()
+        response = self.client.get(url, {'stream': '1'})
+
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed, regular)
+
+    def test_stream_chunks_rows(self):
+        """Test 33: Las filas se emiten en bloques del tamaño indicado"""
+        request = RequestFactory().get('/')
+        chunks = list(stream_products(Product.objects.select_related('category', 'collection'), request, chunk_size=2))
+
+        # apertura + 3 bloques (2, 2, 1) + cierre
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(json.loads(''.join(chunks))['count'], 5)
+
+
+class PieceCountersTestCase(TestCase):
+    """Pruebas para los contadores de piezas de colecciones y categorías"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Chaquetas")
+        self.other_category = Category.objects.create(name="Gorras")
+        self.collection = Collection.objects.create(
+            name="UNDERGROUND",
+            season="FW22",
+            description="Raw street culture"
+        )
+
+    def _create(self, **kwargs):
+        return Product.objects.create(
+            name="Producto",
+            price=Decimal('50000.00'),
+            stock=1,
+            **kwargs
+        )
+
+    def _pieces(self, obj):
+        obj.refresh_from_db(fields=['pieces'])
+        return obj.pieces
+
+    def test_reassigning_product_moves_counter(self):
+        """Test 34: Cambiar la categoría mueve el contador"""
+        product = self._create(category=self.category, collection=self.collection)
+
+        product = Product.objects.get(pk=product.pk)
+        product.category = self.other_category
+        product.save()
+
+        self.assertEqual(self._pieces(self.category), 0)
+        self.assertEqual(self._pieces(self.other_category), 1)
+        self.assertEqual(self._pieces(self.collection), 1)
+
+    def test_delete_decrements_counter(self):
+        """Test 35: Eliminar productos (también en bloque) descuenta piezas"""
+        self._create(category=self.category)
+        self._create(category=self.category)
+        self._create(category=self.category, collection=self.collection)
+
+        Product.objects.filter(collection=self.collection).delete()
+        self.assertEqual(self._pieces(self.category), 2)
+        self.assertEqual(self._pieces(self.collection), 0)
+
+    def test_bulk_operations_keep_counters_exact(self):
+        """Test 36: bulk_create y update() recalculan los contadores"""
+        Product.objects.bulk_create([
+            Product(name=f"Bulk {index}", price=Decimal('1000.00'), category=self.category)
+            for index in range(4)
+        ])
+        self.assertEqual(self._pieces(self.category), 4)
+
+        Product.objects.filter(name__in=["Bulk 0", "Bulk 1"]).update(
+            category=self.other_category, collection=self.collection
+        )
+        self.assertEqual(self._pieces(self.category), 2)
+        self.assertEqual(self._pieces(self.other_category), 2)
+        self.assertEqual(self._pieces(self.collection), 2)
+
+    def test_recount_command_repairs_drift(self):
+        """Test 37: recount_pieces corrige contadores desincronizados"""
+        self._create(collection=self.collection)
+        Collection.objects.update(pieces=99)
+
+        call_command('recount_pieces', stdout=StringIO())
+
+        self.assertEqual(self._pieces(self.collection), 1)
+
+    def test_collections_page_uses_constant_queries(self):
+        """Test 38: La página de colecciones no hace un COUNT por fila"""
+        for index in range(5):
+            collection = Collection.objects.create(name=f"Col {index}", season="SS25", description="-")
+            self._create(collection=collection)
+
+        with self.assertNumQueries(3):
+            self.client.get(reverse('catalog:collections'))
+
+
+class ShopFiltersTestCase(TestCase):
+    """Pruebas para los filtros normalizados de la tienda y el benchmark"""
+
+    def test_invalid_parameters_are_ignored(self):
+        """Test 39: Parámetros inválidos no rompen la tienda"""
+        filters = ShopFilters.from_query(QueryDict('category=abc&min_price=xx&stock=raro&sort=relevance'))
+
+        self.assertIsNone(filters.category)
+        self.assertIsNone(filters.min_price)
+        self.assertEqual(filters.stock, '')
+        self.assertEqual(filters.sort, 'name')
+        self.assertFalse(filters.is_filtered)
+        self.assertEqual(self.client.get(reverse('catalog:shop'), {'category': 'abc'}).status_code, 200)
+
+        huge = '99999999999999999999999'
+        filters = ShopFilters.from_query(QueryDict(f'category={huge}&collection=-3'))
+        self.assertIsNone(filters.category)
+        self.assertIsNone(filters.collection)
+        response = self.client.get(reverse('catalog:shop'), {'category': huge, 'collection': huge})
+        self.assertEqual(response.status_code, 200)
+
+    def test_cache_key_is_normalized(self):
+        """Test 40: Filtros equivalentes producen la misma clave"""
+        first = ShopFilters.from_query(QueryDict('category=3&min_price=100&search=Neon'))
+        second = ShopFilters.from_query(QueryDict('search=neon+&min_price=100&category=03'))
+
+        self.assertEqual(first.cache_key(), second.cache_key())
+
+    def test_benchmark_reports_every_combination(self):
+        """Test 41: El benchmark recorre todas las combinaciones y no deja datos"""
+        out = StringIO()
+        call_command('benchmark_shop', products=200, repeat=1, stdout=out)
+
+        self.assertIn('120 combinations', out.getvalue())
+        self.assertEqual(Product.objects.count(), 0)
+
+
+class ShopFacetsTestCase(TestCase):
+    """Pruebas para los conteos por faceta de la barra lateral"""
+
+    def setUp(self):
+        cache.clear()
+        self.shirts = Category.objects.create(name="Camisetas")
+        self.pants = Category.objects.create(name="Pantalones")
+        self.collection = Collection.objects.create(name="SKYLINE", season="SS22", description="-")
+        Product.objects.create(name="A", price=Decimal('30000.00'), stock=3, category=self.shirts, collection=self.collection)
+        Product.objects.create(name="B", price=Decimal('70000.00'), stock=0, category=self.shirts)
+        Product.objects.create(name="C", price=Decimal('250000.00'), stock=1, category=self.pants)
+        Product.objects.create(name="D", price=Decimal('10000.00'), stock=1, category=self.pants, is_active=False)
+
+    def test_facets_for_current_filters(self):
+        """Test 42: Conteos por categoría, colección, stock y rango de precio"""
+        facets = get_facets(ShopFilters(stock='in_stock'))
+
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['categories'], {self.shirts.id: 1, self.pants.id: 1})
+        self.assertEqual(facets['collections'], {self.collection.id: 1})
+        self.assertEqual(facets['stock'], {'in_stock': 2, 'out_of_stock': 0})
+        self.assertEqual(facets['price_buckets'], [1, 0, 0, 1])
+
+    def test_facets_are_cached_until_catalog_changes(self):
+        """Test 43: Los conteos se cachean y se invalidan al escribir el catálogo"""
+        filters = ShopFilters(category=self.shirts.id)
+        get_facets(filters)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_facets(filters)['total'], 2)
+
+        Product.objects.create(name="E", price=Decimal('90000.00'), stock=2, category=self.shirts)
+        self.assertEqual(get_facets(filters)['total'], 3)
+
+    def test_shop_sidebar_shows_counts(self):
+        """Test 44: La tienda muestra los conteos sin consultas COUNT adicionales"""
+        response = self.client.get(reverse('catalog:shop'))
+
+        self.assertEqual(response.context['total_count'], 3)
+        self.assertContains(response, "Camisetas (2)")
+
+
+@override_settings(CATALOG_LISTING_BACKEND='catalog.backends.SnapshotBackend')
+class CatalogSnapshotTestCase(TestCase):
+    """Pruebas para la instantánea del catálogo en memoria"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Buzos")
+        self.collection = Collection.objects.create(name="WINTER SHADOWS", season="FW24", description="-")
+        for index in range(6):
+            Product.objects.create(
+                name=f"Buzo {index % 3}",
+                price=Decimal('60000.00') + index * 10000,
+                stock=index % 2,
+                category=self.category,
+                collection=self.collection if index % 2 else None
+            )
+
+    def test_snapshot_matches_database_results(self):
+        """Test 45: La instantánea filtra y ordena igual que la base de datos"""
+        orm, snapshot = ORMBackend(), SnapshotBackend()
+        for sort in ('name', 'price_low', 'price_high', 'newest', 'oldest'):
+            for params in ({}, {'stock': 'in_stock'}, {'collection': self.collection.id, 'max_price': 100000}):
+                with self.subTest(sort=sort, params=params):
+                    filters = ShopFilters(sort=sort, **params)
+                    self.assertEqual(list(snapshot.listing(filters)), list(orm.listing(filters)))
+                    self.assertEqual(snapshot.facets(filters), orm.facets(filters))
+
+    def test_snapshot_pages_use_same_cursors(self):
+        """Test 46: Los cursores de la instantánea avanzan igual que los del ORM"""
+        filters = ShopFilters(sort='price_high')
+        first = SnapshotBackend().page(filters, limit=4)
+        second = ORMBackend().page(filters, first.next_cursor, limit=4)
+        third = SnapshotBackend().page(filters, first.next_cursor, limit=4)
+
+        self.assertEqual(list(second), list(third))
+        self.assertEqual(len(third), 2)
+
+    def test_listing_views_skip_database_once_built(self):
+        """Test 47: Con la instantánea construida las vistas no consultan la base de datos"""
+        self.client.get(reverse('catalog:shop'))
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse('catalog:shop'), {'sort': 'price_low', 'stock': 'in_stock'})
+            self.client.get(reverse('catalog:collection_detail', args=[self.collection.id]))
+            self.client.get(reverse('catalog:products_api'))
+
+    def test_writes_swap_the_snapshot(self):
+        """Test 48: Guardar un producto publica una nueva instantánea"""
+        before = get_snapshot()
+        Product.objects.create(name="Buzo nuevo", price=Decimal('1000.00'), stock=1, category=self.category)
+        after = get_snapshot()
+
+        self.assertIsNot(before, after)
+        self.assertEqual(len(after.products), len(before.products) + 1)
+        self.assertEqual(len(before.products), 6)
+
+
+class NumpyBackendTestCase(TestCase):
+    """Pruebas para el motor columnar de filtros y orden con NumPy"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Camisetas")
+        self.collection = Collection.objects.create(name="NEON NIGHTS", season="SS25", description="-")
+        for index in range(8):
+            Product.objects.create(
+                name=f"Camiseta {index % 3}",
+                price=Decimal('45000.50') + index * 25000,
+                stock=index % 3,
+                category=self.category if index % 4 else None,
+                collection=self.collection if index % 2 else None
+            )
+
+    def test_numpy_matches_database_results(self):
+        """Test 49: Las máscaras de NumPy filtran y ordenan igual que la base de datos"""
+        orm, columnar = ORMBackend(), NumpyBackend()
+        filter_sets = (
+            {},
+            {'stock': 'in_stock'},
+            {'stock': 'out_of_stock', 'category': self.category.id},
+            {'collection': self.collection.id, 'min_price': '45000.50', 'max_price': '145000.50'},
+        )
+        for sort in ('name', 'price_low', 'price_high', 'newest', 'oldest'):
+            for params in filter_sets:
+                with self.subTest(sort=sort, params=params):
+                    filters = ShopFilters(sort=sort, **params)
+                    self.assertEqual(list(columnar.listing(filters)), list(orm.listing(filters)))
+                    self.assertEqual(columnar.facets(filters), orm.facets(filters))
+
+    def test_numpy_pages_use_same_cursors(self):
+        """Test 50: Los cursores del motor NumPy avanzan igual que los del ORM"""
+        for sort in ('name', 'price_high', 'newest'):
+            with self.subTest(sort=sort):
+                filters = ShopFilters(sort=sort)
+                first = ORMBackend().page(filters, limit=3)
+                orm_page = ORMBackend().page(filters, first.next_cursor, limit=3)
+                numpy_page = NumpyBackend().page(filters, first.next_cursor, limit=3)
+
+                self.assertEqual(list(numpy_page), list(orm_page))
+                self.assertEqual(numpy_page.next_cursor, orm_page.next_cursor)
+
+        # Un cursor cuyo producto ya no existe sigue siendo válido
+        filters = ShopFilters(sort='name')
+        first = NumpyBackend().page(filters, limit=4)
+        first.items[-1].delete()
+        self.assertEqual(
+            list(NumpyBackend().page(filters, first.next_cursor, limit=10)),
+            list(ORMBackend().page(filters, first.next_cursor, limit=10))
+        )
+
+    def test_numpy_backend_serves_shop_view(self):
+        """Test 51: La tienda funciona con el motor NumPy seleccionado en settings"""
+        with override_settings(CATALOG_LISTING_BACKEND='catalog.backends.NumpyBackend'):
+            response = self.client.get(reverse('catalog:shop'), {'sort': 'price_low', 'stock': 'in_stock'})
+            searched = self.client.get(reverse('catalog:shop'), {'search': 'camiseta'})
+
+        self.assertEqual(response.status_code, 200)
+        prices = [product.price for product in response.context['products']]
+        self.assertEqual(prices, sorted(prices))
+        self.assertTrue(all(product.stock > 0 for product in response.context['products']))
+        self.assertEqual(searched.status_code, 200)
+        self.assertEqual(len(searched.context['products']), 8)
+
+
+class ConditionalGetTestCase(TestCase):
+    """Pruebas para ETag y Last-Modified en las vistas del catálogo"""
+
+    def setUp(self):
+        self.collection = Collection.objects.create(name="NEON NIGHTS", season="SS25", description="-")
+        self.product = Product.objects.create(
+            name="Camiseta Neon",
+            price=Decimal('55000.00'),
+            stock=3,
+            collection=self.collection
+        )
+
+    def test_matching_etag_returns_304_without_queries(self):
+        """Test 52: Un If-None-Match vigente responde 304 sin consultar la base de datos"""
+        urls = (
+            reverse('catalog:products_api'),
+            reverse('catalog:collections'),
+            reverse('catalog:collection_detail', args=[self.collection.id]),
+            reverse('catalog:product_detail', args=[self.product.id]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                # La primera visita fija la cookie CSRF, que forma parte del ETag
+                self.client.get(url)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('ETag', response)
+                self.assertIn('Last-Modified', response)
+
+                with self.assertNumQueries(0):
+                    cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached.content, b'')
+
+    def test_catalog_writes_change_etag(self):
+        """Test 53: Modificar un producto invalida el ETag anterior"""
+        url = reverse('catalog:products_api')
+        etag = self.client.get(url)['ETag']
+
+        self.product.stock = 10
+        self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['products'][0]['stock'], 10)
+
+    def test_etag_varies_by_language_and_format(self):
+        """Test 54: El ETag de las páginas depende del idioma y del formato pedido"""
+        url = reverse('catalog:collection_detail', args=[self.collection.id])
+        spanish = self.client.get(url, HTTP_ACCEPT_LANGUAGE='es')['ETag']
+        english = self.client.get(url, HTTP_ACCEPT_LANGUAGE='en')['ETag']
+        as_json = self.client.get(url, HTTP_ACCEPT_LANGUAGE='es', HTTP_ACCEPT='application/json')['ETag']
+
+        self.assertEqual(len({spanish, english, as_json}), 3)
+        response = self.client.get(url, HTTP_ACCEPT_LANGUAGE='en', HTTP_IF_NONE_MATCH=spanish)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        """Test 55: If-Modified-Since posterior al último cambio responde 304"""
+        url = reverse('catalog:product_detail', args=[self.product.id])
+        last_modified = self.client.get(url)['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_flash_message_is_not_hidden_by_304(self):
+        """Test 84: Tras agregar al carrito, la página revalidada muestra el mensaje y no responde 304"""
+        url = reverse('catalog:product_detail', args=[self.product.id])
+        user = User.objects.create_user(
+            email='cliente@test.com', first_name='Cliente', last_name='Test',
+            phone_number='+573001234567', password='cliente123'
+        )
+        for client, label in ((Client(), 'invitado'), (Client(), 'usuario')):
+            with self.subTest(client=label):
+                if label == 'usuario':
+                    client.force_login(user)
+                client.get(url)
+                page = client.get(url)
+                self.assertIn('no-cache', page['Cache-Control'])
+                self.assertIn('private', page['Cache-Control'])
+
+                response = client.post(
+                    reverse('orders:add_to_cart', args=[self.product.id]), {'quantity': 1}, HTTP_REFERER=url
+                )
+                self.assertRedirects(response, url, fetch_redirect_response=False)
+                response = client.get(url, HTTP_IF_NONE_MATCH=page['ETag'], HTTP_IF_MODIFIED_SINCE=page['Last-Modified'])
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, f"Se agregaron 1 unidades de {self.product.name}")
+
+                # Ya mostrado el mensaje, la página vuelve a revalidarse con 304
+                response = client.get(url)
+                self.assertNotContains(response, "Se agregaron")
+                self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+class ProductsApiFieldsetTestCase(TestCase):
+    """Pruebas para ?fields= y ?expand= en la API de productos"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Camisetas")
+        self.collection = Collection.objects.create(name="NEON NIGHTS", season="SS25", description="-")
+        for index in range(3):
+            Product.objects.create(
+                name=f"Camiseta {index}",
+                description="Algodón pesado",
+                price=Decimal('55000.00') + index,
+                stock=index,
+                category=self.category,
+                collection=self.collection
+            )
+        self.url = reverse('catalog:products_api')
+
+    def test_fields_trim_payload_and_query(self):
+        """Test 56: ?fields= devuelve solo los campos pedidos y no hace joins"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'name,price,stock', 'sort': 'price_low'})
+
+        products = response.json()['products']
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(products[0]), ['id', 'name', 'price', 'stock'])
+        self.assertEqual([product['price'] for product in products], [55000, 55001, 55002])
+        sql = queries[-1]['sql']
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('description', sql)
+
+    def test_expand_embeds_relations(self):
+        """Test 57: ?expand= incluye las relaciones; sin expandir se devuelve su id"""
+        expanded = self.client.get(self.url, {'fields': 'name', 'expand': 'collection'}).json()['products'][0]
+        ids_only = self.client.get(self.url, {'fields': 'name,category'}).json()['products'][0]
+
+        self.assertEqual(expanded['collection'], {
+            'id': self.collection.id, 'name': 'NEON NIGHTS', 'season': 'SS25', 'status': self.collection.status
+        })
+        self.assertNotIn('category', expanded)
+        self.assertEqual(ids_only['category'], self.category.id)
+
+    def test_default_representation_and_invalid_fields(self):
+        """Test 58: Sin parámetros la respuesta es la completa; campos desconocidos dan 400"""
+        product = self.client.get(self.url).json()['products'][0]
+        self.assertEqual(
+            list(product),
+            ['id', 'name', 'description', 'price', 'stock', 'is_active', 'created_at', 'image', 'category', 'collection']
+        )
+        self.assertEqual(product['category']['name'], 'Camisetas')
+
+        response = self.client.get(self.url, {'fields': 'name,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['error'])
+
+    def test_fieldset_pages_and_streams(self):
+        """Test 59: Los campos pedidos se respetan al paginar y en modo streaming"""
+        first = self.client.get(self.url, {'fields': 'id', 'limit': 2, 'sort': 'price_high'}).json()
+        second = self.client.get(
+            self.url, {'fields': 'id', 'limit': 2, 'sort': 'price_high', 'cursor': first['next_cursor']}
+        ).json()
+        streamed = json.loads(b''.join(
+            self.client.get(self.url, {'fields': 'id,stock', 'stream': 1}).streaming_content
+        ))
+
+        self.assertEqual(len(first['products']) + len(second['products']), 3)
+        self.assertEqual(list(second['products'][0]), ['id'])
+        self.assertEqual(list(streamed['products'][0]), ['id', 'stock'])
+
+
+@override_settings(CATALOG_SYNC_WINDOW=0)
+class ProductsApiDeltaSyncTestCase(TestCase):
+    """Pruebas para la sincronización incremental con ?since="""
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Camisetas")
+        self.products = [
+            Product.objects.create(name=f"Camiseta {index}", price=Decimal('55000.00'), stock=3, category=self.category)
+            for index in range(4)
+        ]
+        self.url = reverse('catalog:products_api')
+
+    def sync(self, token=''):
+        response = self.client.get(self.url, {'since': token, 'fields': 'name,stock'})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_initial_sync_returns_catalog_and_token(self):
+        """Test 60: Un token vacío devuelve todo el catálogo y un token nuevo"""
+        data = self.sync()
+
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(data['removed'], [])
+        self.assertTrue(data['sync_token'])
+
+        unchanged = self.sync(data['sync_token'])
+        self.assertEqual(unchanged['count'], 0)
+        self.assertEqual(unchanged['removed'], [])
+
+    def test_delta_contains_only_changes(self):
+        """Test 61: La respuesta incluye solo los productos modificados y retirados"""
+        token = self.sync()['sync_token']
+
+        changed, deactivated, deleted, untouched = self.products
+        changed.stock = 9
+        changed.save()
+        deactivated.is_active = False
+        deactivated.save()
+        deleted_id = deleted.id
+        deleted.delete()
+
+        data = self.sync(token)
+        self.assertEqual([product['id'] for product in data['products']], [changed.id])
+        self.assertEqual(data['products'][0]['stock'], 9)
+        self.assertEqual(data['removed'], sorted([deactivated.id, deleted_id]))
+        self.assertNotIn(untouched.id, data['removed'])
+
+    def test_bulk_writes_and_parent_edits_are_tracked(self):
+        """Test 62: Las escrituras masivas y los cambios de categoría marcan los productos"""
+        token = self.sync()['sync_token']
+        Product.objects.filter(pk=self.products[0].pk).update(stock=0)
+        Product.objects.filter(pk=self.products[1].pk).update(is_active=False)
+        data = self.sync(token)
+        self.assertEqual([product['id'] for product in data['products']], [self.products[0].id])
+        self.assertEqual(data['removed'], [self.products[1].id])
+
+        token = data['sync_token']
+        self.category.name = "Camisetas oversize"
+        self.category.save()
+        self.assertEqual(self.sync(token)['count'], 3)
+
+    def test_reactivated_product_is_not_removed(self):
+        """Test 63: Un producto reactivado vuelve como cambio y un token inválido da 400"""
+        token = self.sync()['sync_token']
+        product = self.products[0]
+        product.is_active = False
+        product.save()
+        product.is_active = True
+        product.save()
+
+        data = self.sync(token)
+        self.assertEqual(data['removed'], [])
+        self.assertEqual([item['id'] for item in data['products']], [product.id])
+        self.assertEqual(self.client.get(self.url, {'since': 'not-a-token'}).status_code, 400)
+
+
+class ImportCatalogCommandTestCase(TestCase):
+    """Pruebas para el comando import_catalog"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = Path(self.tmp.name) / name
+        path.write_text(content, encoding='utf-8')
+        return str(path)
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_catalog', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_creates_products_and_parents(self):
+        """Test 64: Importar un CSV crea productos, categorías y colecciones en lote"""
+        path = self.write('catalogo.csv', (
+            "nombre,descripcion,precio,existencias,categoria,coleccion,temporada\n"
+            "Buzo Neon,Buzo con capucha,120000,4,Buzos,NEON NIGHTS,SS25\n"
+            "Camiseta Neon,Camiseta básica,60000,0,Camisetas,NEON NIGHTS,SS25\n"
+            "Buzo Sombra,Buzo negro,130000,2,Buzos,,\n"
+        ))
+        out, _ = self.run_import(path, '--batch-size', '2')
+
+        self.assertIn('3 created', out)
+        self.assertIn('rows/sec', out)
+        collection = Collection.objects.get(name="NEON NIGHTS")
+        self.assertEqual(collection.season, 'SS25')
+        self.assertEqual(collection.pieces, 2)
+        self.assertEqual(Category.objects.get(name="Buzos").pieces, 2)
+        self.assertEqual(Product.objects.get(name="Buzo Neon").price, Decimal('120000.00'))
+        self.assertEqual(search.ranked_ids('capucha'), [Product.objects.get(name="Buzo Neon").id])
+
+    def test_reimport_updates_instead_of_duplicating(self):
+        """Test 65: Reimportar actualiza por id o nombre y conserva las columnas ausentes"""
+        category = Category.objects.create(name="Buzos")
+        product = Product.objects.create(
+            name="Buzo Neon", description="Original", price=Decimal('100000.00'), stock=5, category=category
+        )
+        path = self.write('cambios.jsonl', (
+            '{"nombre": "Buzo Neon", "precio": "110000"}\n'
+            f'{{"id": {product.id}, "existencias": 1, "activo": "no"}}\n'
+        ))
+        out, _ = self.run_import(path)
+
+        product.refresh_from_db()
+        self.assertIn('1 updated', out)
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertEqual((product.price, product.stock, product.description), (Decimal('110000.00'), 1, 'Original'))
+        self.assertFalse(product.is_active)
+        self.assertTrue(ProductTombstone.objects.filter(product_id=product.id, reason='deactivated').exists())
+
+    def test_spanish_export_shape_and_invalid_rows(self):
+        """Test 66: Acepta el formato nombre/descripcion/imagen_url y reporta filas inválidas"""
+        path = self.write('productos.json', (
+            '[\n'
+            ' {"nombre": "Procesador", "descripcion": "Ocho núcleos", '
+            '"imagen_url": "http://127.0.0.1:8000/media/productos/cpu.jpg", "detail_url": "http://127.0.0.1:8000/productos/2/"},\n'
+            ' {"nombre": "Sin precio válido", "precio": "gratis"},\n'
+            ' esto no es json\n'
+            ']\n'
+        ))
+        out, err = self.run_import(path, '--default-price', '1500000')
+
+        product = Product.objects.get(name="Procesador")
+        self.assertEqual(product.image.name, 'productos/cpu.jpg')
+        self.assertEqual(product.price, Decimal('1500000.00'))
+        self.assertIn('2 skipped', out)
+        self.assertIn("Line 3: invalid price 'gratis'", err)
+        self.assertIn('Line 4', err)
+
+
+class ImageDerivativesTestCase(TestCase):
+    """Pruebas para las copias redimensionadas de las imágenes del catálogo"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        # Sin pool: el hilo del pool no ve la transacción de la prueba
+        media = override_settings(MEDIA_ROOT=self.tmp.name, CATALOG_IMAGE_WIDTHS=(320, 640), CATALOG_IMAGE_WORKERS=0)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self, name='buzo.png', size=(1000, 500)):
+        buffer = BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def test_upload_builds_derivatives(self):
+        """Test 67: Subir una imagen genera copias WebP/JPEG y guarda sus dimensiones"""
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="Buzo", price=Decimal('90000.00'), image=self.upload())
+        product.refresh_from_db()
+
+        self.assertEqual((product.image_width, product.image_height), (1000, 500))
+        self.assertEqual(product.image_variants['widths'], [320, 640])
+        self.assertEqual(product.image_variants['source'], product.image.name)
+        self.assertTrue(product.image_variants['placeholder'].startswith('data:image/jpeg;base64,'))
+        stem = product.image.name.rsplit('.', 1)[0]
+        for suffix in ('320w.webp', '640w.jpg'):
+            path = Path(self.tmp.name) / 'derivatives' / f'{stem}-{suffix}'
+            self.assertTrue(path.exists(), path)
+        with Image.open(Path(self.tmp.name) / 'derivatives' / f'{stem}-320w.jpg') as image:
+            self.assertEqual(image.size, (320, 160))
+
+    def test_responsive_image_tag(self):
+        """Test 68: La etiqueta emite srcset, sizes, carga diferida y un placeholder"""
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="Buzo", price=Decimal('90000.00'), image=self.upload())
+        product.refresh_from_db()
+        template = Template('{% load catalog_images %}{% responsive_image product sizes="50vw" css_class="w-full" %}')
+
+        html = template.render(Context({'product': product}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('-320w.webp 320w', html)
+        self.assertIn('-640w.jpg 640w', html)
+        self.assertIn('sizes="50vw"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('width="1000" height="500"', html)
+        self.assertIn('data:image/jpeg;base64,', html)
+
+        # Sin copias para la imagen actual se sirve el original
+        product.image_variants = {}
+        html = template.render(Context({'product': product}))
+        self.assertNotIn('srcset', html)
+        self.assertIn(product.image.url, html)
+
+    def test_backfill_command_uses_process_pool(self):
+        """Test 69: El comando de relleno genera las copias faltantes e informa fallos"""
+        product = Product.objects.create(name="Buzo", price=Decimal('90000.00'), image=self.upload(size=(200, 100)))
+        Product.objects.create(name="Sin archivo", price=Decimal('90000.00'), image='products/no-existe.jpg')
+        out, err = StringIO(), StringIO()
+
+        call_command('build_image_derivatives', '--workers', '2', stdout=out, stderr=err)
+
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants['widths'], [200])
+        self.assertIn('Built derivatives for 1 images', out.getvalue())
+        self.assertIn('(1 failed)', out.getvalue())
+        self.assertIn('no-existe.jpg', err.getvalue())
+
+    def test_uploads_use_pool_and_replaced_copies_are_removed(self):
+        """Test 90: Las subidas se procesan en el pool y las copias de la imagen anterior se borran"""
+        derivatives = Path(self.tmp.name) / 'derivatives' / 'products'
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="Buzo", price=Decimal('90000.00'), image=self.upload('viejo.png'))
+        old_files = sorted(path.name for path in derivatives.iterdir())
+        self.assertEqual(len(old_files), 4)
+
+        # Con workers el on_commit solo encola; el resultado se guarda al terminar el trabajo
+        pool = ProcessPoolExecutor(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        with override_settings(CATALOG_IMAGE_WORKERS=1), patch.object(images, '_get_pool', return_value=pool), \
+                patch.object(images, '_finish') as finish:
+            with self.captureOnCommitCallbacks(execute=True):
+                product.image = self.upload('nuevo.png', size=(700, 350))
+                product.save()
+            pool.shutdown(wait=True)
+        (model, pk, source_name, future), _ = finish.call_args
+        self.assertEqual((model, pk, source_name), (Product, product.pk, product.image.name))
+        product.refresh_from_db()
+        self.assertNotEqual(product.image_variants['source'], product.image.name)
+
+        with patch('catalog.images.close_old_connections'):
+            images._finish(model, pk, source_name, future)
+        product.refresh_from_db()
+        self.assertEqual((product.image_width, product.image_variants['widths']), (700, [320, 640]))
+        files = sorted(path.name for path in derivatives.iterdir())
+        self.assertEqual(len(files), 4)
+        self.assertFalse(set(old_files) & set(files))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(list(derivatives.iterdir()), [])
+
+
+class SuggestApiTestCase(TestCase):
+    """Pruebas para las sugerencias de búsqueda con índice de prefijos"""
+
+    def setUp(self):
+        names.clear_indexes()
+        self.collection = Collection.objects.create(name="NEON NIGHTS", season="SS25", description="-")
+        self.category = Category.objects.create(name="Camisetas")
+        self.shirt = Product.objects.create(
+            name="Camiseta Neón", price=Decimal('60000.00'), category=self.category, collection=self.collection
+        )
+        self.truck = Product.objects.create(name="Camión de juguete", price=Decimal('30000.00'))
+        self.url = reverse('catalog:suggest')
+
+    def names(self, query):
+        return [name for _, _, name in suggest.get_suggestion_index().search(query)]
+
+    def test_prefix_matches_are_accent_insensitive(self):
+        """Test 70: Las sugerencias ignoran tildes y mayúsculas y buscan por inicio de palabra"""
+        self.assertEqual(self.names('camion'), ["Camión de juguete"])
+        self.assertEqual(self.names('NEON'), ["NEON NIGHTS", "Camiseta Neón"])
+        self.assertEqual(self.names('cam'), ["Camisetas", "Camiseta Neón", "Camión de juguete"])
+        self.assertEqual(self.names('juguete'), ["Camión de juguete"])
+        self.assertEqual(self.names('   '), [])
+
+    def test_suggestions_skip_database_once_built(self):
+        """Test 71: Con el índice construido las sugerencias no consultan la base de datos"""
+        self.client.get(self.url, {'q': 'ca'})
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'q': 'cami', 'limit': 5})
+
+        suggestions = response.json()['suggestions']
+        self.assertEqual(suggestions[0], {
+            'type': 'category',
+            'id': self.category.id,
+            'name': 'Camisetas',
+            'url': f"{reverse('catalog:shop')}?category={self.category.id}",
+        })
+        self.assertEqual(suggestions[1]['url'], reverse('catalog:product_detail', args=[self.shirt.id]))
+
+    def test_catalog_writes_update_index_incrementally(self):
+        """Test 72: Los cambios del catálogo se aplican al índice sin reconstruirlo"""
+        suggest.get_suggestion_index()
+        self.shirt.name = "Camiseta Sombra"
+        self.shirt.save()
+        self.truck.is_active = False
+        self.truck.save()
+        Category.objects.create(name="Sombreros")
+
+        with patch.object(suggest.SuggestionIndex, 'build', side_effect=AssertionError('full rebuild')):
+            self.assertEqual(self.names('som'), ["Sombreros", "Camiseta Sombra"])
+            self.assertEqual(self.names('camion'), [])
+            self.assertEqual(self.names('neon'), ["NEON NIGHTS"])
+
+
+class FuzzySearchTestCase(TestCase):
+    """Pruebas para la búsqueda tolerante a errores con trigramas"""
+
+    def setUp(self):
+        names.clear_indexes()
+        self.neon = Collection.objects.create(name="NEON NIGHTS", season="SS25", description="-")
+        self.concrete = Collection.objects.create(name="CONCRETE DREAMS", season="FW25", description="-")
+        self.jacket = Product.objects.create(name="Chaqueta Reflectiva", price=Decimal('150000.00'), collection=self.neon)
+        self.hoodie = Product.objects.create(name="Buzo Gris", price=Decimal('90000.00'), collection=self.concrete)
+        self.url = reverse('catalog:shop')
+
+    def test_misspelled_words_are_corrected(self):
+        """Test 73: Las palabras mal escritas se corrigen con la más parecida del catálogo"""
+        index = fuzzy.get_trigram_index()
+        self.assertEqual(index.correct('neon nihgts'), 'neon nights')
+        self.assertEqual(index.correct('CONCRET DREMS'), 'concrete dreams')
+        self.assertEqual(index.correct('chaqeta'), 'chaqueta')
+        # Sin errores, palabras cortas o nada parecido: no hay corrección
+        self.assertIsNone(index.correct('Buzo gris'))
+        self.assertIsNone(index.correct('xq'))
+        self.assertIsNone(index.correct('zzzzzz'))
+
+    def test_shop_falls_back_to_corrected_search(self):
+        """Test 74: Una búsqueda sin resultados se repite con la corrección"""
+        response = self.client.get(self.url, {'search': 'NEON NIHGTS'})
+        self.assertEqual(response.context['corrected_search'], 'neon nights')
+        self.assertEqual(response.context['search_query'], 'NEON NIHGTS')
+        self.assertEqual(list(response.context['products']), [self.jacket])
+        self.assertContains(response, 'neon nights')
+
+        response = self.client.get(self.url, {'search': 'buzo'})
+        self.assertEqual(response.context['corrected_search'], '')
+        self.assertEqual(list(response.context['products']), [self.hoodie])
+
+        response = self.client.get(self.url, {'search': 'zzzzzz'})
+        self.assertEqual(response.context['corrected_search'], '')
+        self.assertEqual(response.context['total_count'], 0)
+
+    def test_catalog_writes_update_trigram_index_incrementally(self):
+        """Test 75: Los cambios del catálogo actualizan el índice sin tocar la versión anterior"""
+        before = fuzzy.get_trigram_index()
+        self.jacket.name = "Chaqueta Holográfica"
+        self.jacket.save()
+        self.hoodie.delete()
+
+        with patch.object(fuzzy.TrigramIndex, 'build', side_effect=AssertionError('full rebuild')):
+            index = fuzzy.get_trigram_index()
+            self.assertEqual(index.correct('holografca'), 'holografica')
+            self.assertIsNone(index.closest('gris'))
+        self.assertIn('gris', before.words)
+        self.assertIn('reflectiva', before.postings['ref'])
+        self.assertNotIn('reflectiva', index.postings.get('ref', ()))
+
+
+class BulkAdjustmentTestCase(TestCase):
+    """Pruebas para el cambio masivo de precio y stock"""
+
+    def setUp(self):
+        self.collection = Collection.objects.create(name="NEON NIGHTS", season="SS25", description="-")
+        self.cheap = Product.objects.create(name="Medias", price=Decimal('10000.00'), stock=3, collection=self.collection)
+        self.jacket = Product.objects.create(name="Chaqueta", price=Decimal('99999.00'), stock=10, collection=self.collection)
+        self.other = Product.objects.create(name="Gorra", price=Decimal('20000.00'), stock=1)
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@urbanloom.com', first_name='Admin', last_name='Test',
+            phone_number='+573001234567', password='admin123'
+        )
+
+    def test_adjust_updates_set_in_one_statement(self):
+        """Test 76: El ajuste cambia precio y stock del conjunto con una sola actualización"""
+        products = Product.objects.filter(collection=self.collection)
+        with CaptureQueriesContext(connection) as queries:
+            rows = products.adjust(price_percent=Decimal('-10'), price_amount=Decimal('100'), stock_delta=-5)
+
+        self.assertEqual(rows, 2)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "catalog_product"') for query in queries), 1)
+        self.cheap.refresh_from_db()
+        self.jacket.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.cheap.price, self.cheap.stock), (Decimal('9100.00'), 0))
+        self.assertEqual((self.jacket.price, self.jacket.stock), (Decimal('90099.10'), 5))
+        self.assertEqual((self.other.price, self.other.stock), (Decimal('20000.00'), 1))
+
+    def test_adjust_rejects_invalid_prices(self):
+        """Test 77: Un precio resultante inválido no cambia ningún producto"""
+        before = get_catalog_version()
+        with self.assertRaises(ValidationError):
+            Product.objects.all().adjust(price_amount=Decimal('-15000'), stock_delta=5)
+
+        self.assertEqual(get_catalog_version(), before)
+        self.assertEqual(
+            sorted(Product.objects.values_list('price', 'stock')),
+            [(Decimal('10000.00'), 3), (Decimal('20000.00'), 1), (Decimal('99999.00'), 10)],
+        )
+        with self.assertRaises(CommandError):
+            call_command('adjust_products', price_percent=Decimal('-100'), stdout=StringIO())
+
+    def test_admin_action_and_command(self):
+        """Test 78: La acción del admin y el comando aplican el ajuste"""
+        self.client.force_login(self.admin_user)
+        url = reverse('admin:catalog_product_changelist')
+        data = {'action': 'adjust_price_and_stock', '_selected_action': [self.cheap.pk, self.other.pk]}
+
+        response = self.client.post(url, data)
+        self.assertContains(response, 'Price change (%)')
+        response = self.client.post(url, {**data, 'apply': '1', 'stock_delta': '7'})
+        self.assertRedirects(response, url)
+        self.assertEqual(
+            list(Product.objects.order_by('pk').values_list('stock', flat=True)), [10, 10, 8]
+        )
+
+        call_command('adjust_products', collection=self.collection.pk, price_percent=Decimal('50'), stdout=StringIO())
+        self.assertEqual(
+            list(Product.objects.order_by('pk').values_list('price', flat=True)),
+            [Decimal('15000.00'), Decimal('149998.50'), Decimal('20000.00')],
+        )
+
+    def test_admin_action_select_across(self):
+        """Test 85: "Seleccionar todo" aplica el ajuste a todo el listado filtrado"""
+        self.client.force_login(self.admin_user)
+        url = reverse('admin:catalog_product_changelist') + f'?collection__id__exact={self.collection.pk}'
+        # La página solo envía las casillas marcadas; select_across extiende el cambio al filtro
+        data = {'action': 'adjust_price_and_stock', 'select_across': '1', '_selected_action': [self.cheap.pk]}
+
+        response = self.client.post(url, data)
+        self.assertContains(response, 'applied to 2 products')
+        self.assertContains(response, f'name="_selected_action" value="{self.cheap.pk}"')
+        response = self.client.post(url, {**data, 'apply': '1', 'stock_delta': '5'})
+        self.assertRedirects(response, url)
+        self.assertEqual(
+            list(Product.objects.order_by('pk').values_list('stock', flat=True)), [8, 15, 1]
+        )
+
+
+class PublishStaticTestCase(TestCase):
+    """Pruebas para la publicación estática de las páginas del catálogo"""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.collection = Collection.objects.create(name="NEON NIGHTS", season="SS25", description="-")
+        self.other_collection = Collection.objects.create(name="CONCRETE DREAMS", season="FW25", description="-")
+        self.product = Product.objects.create(name="Chaqueta Neón", price=Decimal('150000.00'), collection=self.collection)
+        self.other = Product.objects.create(name="Buzo Gris", price=Decimal('90000.00'), collection=self.other_collection)
+        self.hidden = Product.objects.create(name="Oculto", price=Decimal('1000.00'), is_active=False)
+
+    def page(self, language, path):
+        return self.root / language / path.strip('/') / 'index.html'
+
+    def test_command_publishes_active_pages_per_language(self):
+        """Test 79: El comando publica cada página activa en ambos idiomas con copia gzip"""
+        call_command('publish_static', output=str(self.root), stdout=StringIO())
+
+        for language in ('es', 'en'):
+            self.assertTrue(self.page(language, '/catalog/').exists())
+            self.assertTrue(self.page(language, f'/catalog/collections/{self.collection.id}/').exists())
+            page = self.page(language, f'/catalog/products/{self.product.id}/')
+            html = page.read_bytes()
+            self.assertEqual(gzip.decompress(page.with_name('index.html.gz').read_bytes()), html)
+            # Sin token CSRF de otro visitante: lo pone static-csrf.js al enviar
+            self.assertIn(b'name="csrfmiddlewaretoken" value=""', html)
+            self.assertIn(b'js/static-csrf.js', html)
+            self.assertFalse(self.page(language, f'/catalog/products/{self.hidden.id}/').exists())
+        self.assertNotEqual(
+            self.page('es', '/catalog/').read_bytes(), self.page('en', '/catalog/').read_bytes()
+        )
+
+        # Lo que ya no existe desaparece en la siguiente publicación
+        Product.objects.filter(pk=self.other.pk).update(is_active=False)
+        call_command('publish_static', output=str(self.root), stdout=StringIO())
+        self.assertFalse(self.page('es', f'/catalog/products/{self.other.id}/').exists())
+
+    def test_saves_republish_only_affected_pages(self):
+        """Test 80: Guardar un producto vuelve a publicar solo sus páginas"""
+        with override_settings(CATALOG_STATIC_ROOT=str(self.root)):
+            with patch.object(publish, 'publish_page', wraps=publish.publish_page) as publish_page:
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.product.collection = self.other_collection
+                    self.product.price = Decimal('120000.00')
+                    self.product.save()
+
+        self.assertEqual(
+            sorted(call.args[1] for call in publish_page.call_args_list),
+            sorted([
+                '/catalog/',
+                f'/catalog/collections/{self.collection.id}/',
+                f'/catalog/collections/{self.other_collection.id}/',
+                f'/catalog/products/{self.product.id}/',
+            ]),
+        )
+        self.assertIn('120.000', self.page('en', f'/catalog/products/{self.product.id}/').read_text())
+
+    def test_removed_objects_lose_their_pages(self):
+        """Test 81: Desactivar o borrar objetos elimina sus páginas publicadas"""
+        call_command('publish_static', output=str(self.root), stdout=StringIO())
+        with override_settings(CATALOG_STATIC_ROOT=str(self.root)):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.is_active = False
+                self.product.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.other_collection.delete()
+
+        for language in ('es', 'en'):
+            self.assertFalse(self.page(language, f'/catalog/products/{self.product.id}/').exists())
+            self.assertFalse(self.page(language, f'/catalog/collections/{self.other_collection.id}/').exists())
+            self.assertTrue(self.page(language, f'/catalog/products/{self.other.id}/').exists())
+
+
+class ProductsApiResponseCacheTestCase(TestCase):
+    """Pruebas para los cuerpos JSON precomprimidos de products_api"""
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name="Camisetas")
+        for index in range(5):
+            Product.objects.create(
+                name=f"Camiseta {index}", description="Algodón orgánico " * 5,
+                price=Decimal('50000.00') + index, category=self.category,
+            )
+        self.url = reverse('catalog:products_api')
+
+    def test_repeated_requests_serve_stored_bytes(self):
+        """Test 82: Las respuestas repetidas reutilizan los bytes ya codificados y comprimidos"""
+        plain = self.client.get(self.url, {'limit': 3})
+        compressed = self.client.get(self.url, {'limit': 3}, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(json.loads(plain.content)['count'], 3)
+        # Cada codificación es una representación distinta
+        self.assertNotEqual(plain['ETag'], compressed['ETag'])
+
+        with self.assertNumQueries(0), patch('core.response_cache.json.dumps') as dumps, \
+                patch('core.response_cache.gzip.compress') as compress:
+            again = self.client.get(self.url, {'limit': 3}, HTTP_ACCEPT_ENCODING='gzip;q=1.0, identity;q=0.5')
+        dumps.assert_not_called()
+        compress.assert_not_called()
+        self.assertEqual(again.content, compressed.content)
+
+        refused = self.client.get(self.url, {'limit': 3}, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertEqual(refused.content, plain.content)
+
+    def test_catalog_writes_change_cached_body(self):
+        """Test 83: Un cambio del catálogo genera un cuerpo nuevo y los errores no se guardan"""
+        first = self.client.get(self.url, {'category': self.category.id}).json()
+        Product.objects.create(name="Camiseta nueva", price=Decimal('10000.00'), category=self.category)
+        second = self.client.get(self.url, {'category': self.category.id}).json()
+        self.assertEqual(second['count'], first['count'] + 1)
+
+        self.assertEqual(self.client.get(self.url, {'cursor': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'x'}).status_code, 400)
+
+    def test_uncompressed_responses_share_etag(self):
+        """Test 89: ?stream= y ?since= se sirven sin comprimir con el mismo ETag para cualquier Accept-Encoding"""
+        sync_token = self.client.get(self.url, {'since': ''}).json()['sync_token']
+        for params in ({'stream': '1'}, {'since': sync_token}):
+            with self.subTest(params=params):
+                plain = self.client.get(self.url, params)
+                compressed = self.client.get(self.url, params, HTTP_ACCEPT_ENCODING='gzip')
+                self.assertNotIn('Content-Encoding', compressed)
+                self.assertEqual(plain['ETag'], compressed['ETag'])
+                response = self.client.get(self.url, params, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=plain['ETag'])
+                self.assertEqual(response.status_code, 304)
@@ -9,4 +9,5 @@ urlpatterns = [
     path('products/<int:product_id>/', views.product_detail_view, name='product_detail'),
     path('shop/', views.shop_view, name='shop'),
     path('api/products/', views.products_api, name='products_api'),
+    path('api/suggest/', views.suggest_api, name='suggest'),
 ]
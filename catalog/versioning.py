@@ -0,0 +1,63 @@
+"""
+Catalog version counter.
+
+Every write to Product, Collection or Category bumps a version number kept
+in the Django cache. Cached catalog data (facet counts, snapshots, ...) is
+stored under keys that include the version, so a bump invalidates all of it
+at once without tracking individual keys.
+
+Alongside the version, the time of the last write is kept so HTTP responses
+can carry a ``Last-Modified`` header (see ``catalog.conditional``), and
+anonymous pages showing catalog data are purged from the full-page cache.
+"""
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.page_cache import purge_page_cache
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_MODIFIED_KEY = 'catalog:modified'
+
+
+def get_catalog_version():
+    """Return the current catalog version (a cache read, no database query)"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Partir de la hora actual evita reutilizar versiones tras vaciar la caché
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def get_catalog_modified():
+    """Return when the catalog last changed, as an aware UTC datetime"""
+    modified = cache.get(CATALOG_MODIFIED_KEY)
+    if modified is None:
+        # Sin registro no se puede afirmar que nada cambió: se asume "ahora"
+        cache.add(CATALOG_MODIFIED_KEY, int(time.time()), timeout=None)
+        modified = cache.get(CATALOG_MODIFIED_KEY)
+    return datetime.fromtimestamp(modified, tz=timezone.utc)
+
+
+def _increment():
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+    cache.set(CATALOG_MODIFIED_KEY, int(time.time()), timeout=None)
+    purge_page_cache('catalog')
+
+
+def bump_catalog_version():
+    """
+    Invalidate cached catalog data.
+
+    The version is bumped right away, so the writing request sees its own
+    changes, and again on commit, so readers that cached the old rows while
+    the transaction was open do not keep them.
+    """
+    _increment()
+    transaction.on_commit(_increment)
@@ -1,8 +1,33 @@
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Q
-from django.http import JsonResponse
-from .models import Collection, Product, Category
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from core.page_cache import anonymous_page_cache
+from core.response_cache import cached_json_response
+from . import fuzzy
+from .backends import ORMBackend, get_backend
+from .conditional import catalog_condition
+from .facets import price_bucket_ranges
+from .fieldsets import InvalidFieldset, ProductFieldset
+from .filters import ShopFilters
+from .models import Collection, Product
+from .pagination import InvalidCursor, parse_limit
+from .suggest import get_suggestion_index
+from .sync import InvalidSyncToken, changes_since, decode_sync_token
+from .versioning import get_catalog_version
+from decimal import Decimal
+import json
 
+# Rows fetched per database round trip by the streaming export
+STREAM_CHUNK_SIZE = 500
+
+# Suggestions returned by suggest_api by default and at most
+SUGGEST_LIMIT = 8
+MAX_SUGGEST_LIMIT = 20
+
+@anonymous_page_cache('catalog')
+@catalog_condition()
 def collections_view(request):
     """View for displaying all collections page"""
 
@@ -21,19 +46,39 @@ def collections_view(request):
     return render(request, 'catalog/collections.html', context)
 
 
+@catalog_condition()
 def collection_detail_view(request, collection_id):
     """View for displaying individual collection details"""
-    collection = get_object_or_404(Collection, id=collection_id)
-    products = collection.products.filter(is_active=True)
+    backend = get_backend()
+    collection = backend.collection(collection_id)
+    if collection is None:
+        raise Http404("Collection not found")
+
+    # Infinite scroll: each request returns one keyset page
+    filters = ShopFilters(collection=collection_id, sort='name')
+    limit = parse_limit(request.GET.get('limit'))
+    try:
+        page = backend.page(filters, request.GET.get('cursor'), limit)
+    except InvalidCursor:
+        page = backend.page(filters, limit=limit)
 
     context = {
         'collection': collection,
-        'products': products,
+        'products': page,
+        'next_cursor': page.next_cursor,
     }
 
+    # Las páginas siguientes se piden por fetch() desde infinite-scroll.js
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'html': render_to_string('catalog/collection_products.html', context, request=request),
+            'next_cursor': page.next_cursor,
+        })
+
     return render(request, 'catalog/collection_detail.html', context)
 
 
+@catalog_condition()
 def product_detail_view(request, product_id):
     """View to display individual product details"""
     product = get_object_or_404(Product, id=product_id)
@@ -47,117 +92,218 @@ def product_detail_view(request, product_id):
 
 def shop_view(request):
     """View for displaying all products with search and filters"""
-    products = Product.objects.filter(is_active=True)
-    categories = Category.objects.all()
-    collections = Collection.objects.all()
-    
-    # Search functionality
-    search_query = request.GET.get('search', '')
-    if search_query:
-        products = products.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(collection__name__icontains=search_query) |
-            Q(category__name__icontains=search_query)
-        )
-    
-    # Filter by category
-    category_filter = request.GET.get('category', '')
-    if category_filter:
-        products = products.filter(category__id=category_filter)
-    
-    # Filter by collection
-    collection_filter = request.GET.get('collection', '')
-    if collection_filter:
-        products = products.filter(collection__id=collection_filter)
-    
-    # Filter by price range
-    min_price = request.GET.get('min_price', '')
-    max_price = request.GET.get('max_price', '')
-    if min_price:
-        products = products.filter(price__gte=min_price)
-    if max_price:
-        products = products.filter(price__lte=max_price)
-    
-    # Filter by stock availability
-    stock_filter = request.GET.get('stock', '')
-    if stock_filter == 'in_stock':
-        products = products.filter(stock__gt=0)
-    elif stock_filter == 'out_of_stock':
-        products = products.filter(stock=0)
-    
-    # Sort functionality
-    sort_by = request.GET.get('sort', 'name')
-    if sort_by == 'price_low':
-        products = products.order_by('price')
-    elif sort_by == 'price_high':
-        products = products.order_by('-price')
-    elif sort_by == 'newest':
-        products = products.order_by('-created_at')
-    elif sort_by == 'oldest':
-        products = products.order_by('created_at')
-    else:
-        products = products.order_by('name')
+    backend = get_backend()
+
+    # Search, category, collection, price range and stock filters
+    filters = ShopFilters.from_query(request.GET)
+
+    # Sidebar counts for the current filter set (one cached aggregate query)
+    facets = backend.facets(filters)
+
+    # Nothing found: retry with misspelled words corrected ("nihgts" -> "nights")
+    corrected_search = ''
+    if filters.search and not facets['total']:
+        corrected = fuzzy.correct_search(filters.search)
+        if corrected:
+            corrected_filters = filters.with_search(corrected)
+            corrected_facets = backend.facets(corrected_filters)
+            if corrected_facets['total']:
+                filters, facets, corrected_search = corrected_filters, corrected_facets, corrected
+
+    # Keyset pagination: "load more" follows the next cursor
+    limit = parse_limit(request.GET.get('limit'))
+    try:
+        page = backend.page(filters, request.GET.get('cursor'), limit)
+    except InvalidCursor:
+        page = backend.page(filters, limit=limit)
+
+    # "Load more" pide por fetch() solo las tarjetas siguientes (infinite-scroll.js)
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'html': render_to_string('shop/shop_products.html', {'products': page}, request=request),
+            'next_cursor': page.next_cursor,
+        })
+
+    next_page_query = None
+    if page.has_next:
+        params = request.GET.copy()
+        params['cursor'] = page.next_cursor
+        next_page_query = params.urlencode()
+
+    categories = [
+        (category, facets['categories'].get(category.id, 0)) for category in backend.categories()
+    ]
+    collections = [
+        (collection, facets['collections'].get(collection.id, 0)) for collection in backend.collections()
+    ]
+
+    price_buckets = []
+    for (low, high), count in zip(price_bucket_ranges(), facets['price_buckets']):
+        params = request.GET.copy()
+        params.pop('cursor', None)
+        params['min_price'] = low if low is not None else ''
+        params['max_price'] = high - Decimal('0.01') if high is not None else ''
+        price_buckets.append({'min': low, 'max': high, 'count': count, 'query': params.urlencode()})
 
     context = {
-        'products': products,
+        'products': page,
+        'total_count': facets['total'],
+        'next_page_query': next_page_query,
+        'stock_counts': facets['stock'],
+        'price_buckets': price_buckets,
         'categories': categories,
         'collections': collections,
-        'search_query': search_query,
-        'category_filter': category_filter,
-        'collection_filter': collection_filter,
-        'min_price': min_price,
-        'max_price': max_price,
-        'stock_filter': stock_filter,
-        'sort_by': sort_by,
+        'search_query': request.GET.get('search', '').strip(),
+        'corrected_search': corrected_search,
+        'category_filter': str(filters.category) if filters.category is not None else '',
+        'collection_filter': str(filters.collection) if filters.collection is not None else '',
+        'min_price': request.GET.get('min_price', '') if filters.min_price is not None else '',
+        'max_price': request.GET.get('max_price', '') if filters.max_price is not None else '',
+        'stock_filter': filters.stock,
+        'sort_by': filters.sort,
     }
 
     return render(request, 'shop/shop.html', context)
 
 
+def serialize_product(product, request, fieldset=None):
+    """Build the JSON representation of a product used by products_api"""
+    return (fieldset or ProductFieldset()).serialize(product, request)
+
+
+def stream_products(products, request, chunk_size=STREAM_CHUNK_SIZE, fieldset=None):
+    """
+    Yield the products_api envelope piece by piece.
+
+    Rows are read with ``.iterator()`` so only one chunk is held in memory.
+    ``count`` is written after the array, once it is known, which saves the
+    extra COUNT query; JSON clients do not depend on key order.
+    """
+    yield '{"success": true, "products": ['
+    count = 0
+    buffer = []
+    for product in products.iterator(chunk_size=chunk_size):
+        buffer.append(json.dumps(serialize_product(product, request, fieldset), cls=DjangoJSONEncoder))
+        count += 1
+        if len(buffer) >= chunk_size:
+            yield (',' if count > len(buffer) else '') + ','.join(buffer)
+            buffer = []
+    if buffer:
+        yield (',' if count > len(buffer) else '') + ','.join(buffer)
+    yield '], "count": %d}' % count
+
+
+def _serves_cached_body(request):
+    # ?stream= y ?since= no pasan por core.response_cache: siempre sin comprimir
+    return request.GET.get('stream') not in ('1', 'true') and 'since' not in request.GET
+
+
+@catalog_condition(personalized=False, encoded=_serves_cached_body)
 def products_api(request):
     """API endpoint to return products data in JSON format"""
     try:
-        # Get all active products
-        products = Product.objects.filter(is_active=True).select_related('category', 'collection')
-        
-        # Build the response data
-        products_data = []
-        for product in products:
-            product_data = {
-                'id': product.id,
-                'name': product.name,
-                'description': product.description,
-                'price': int(product.price),  # Convert to integer as shown in example
-                'stock': product.stock,
-                'is_active': product.is_active,
-                'created_at': product.created_at.isoformat(),
-                'image': request.build_absolute_uri(product.image.url) if product.image else None,
-                'category': {
-                    'id': product.category.id,
-                    'name': product.category.name,
-                    'status': product.category.status
-                } if product.category else None,
-                'collection': {
-                    'id': product.collection.id,
-                    'name': product.collection.name,
-                    'season': product.collection.season,
-                    'status': product.collection.status
-                } if product.collection else None
+        # Same filters as the shop; search results are ranked by relevance
+        filters = ShopFilters.from_query(request.GET)
+
+        # Sparse fieldsets (?fields= / ?expand=): load and serialize only what was asked for
+        try:
+            fieldset = ProductFieldset.from_query(request.GET)
+        except InvalidFieldset as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=400)
+        load = {'only': fieldset.only(filters.sort), 'related': fieldset.related()}
+
+        # Delta sync (?since=<token>): what changed in the whole active catalog since the token
+        if 'since' in request.GET:
+            try:
+                since = decode_sync_token(request.GET['since'])
+            except InvalidSyncToken as e:
+                return JsonResponse({
+                    'success': False,
+                    'error': str(e)
+                }, status=400)
+            changes = changes_since(ORMBackend().queryset(ShopFilters(), **load), since)
+            products_data = [serialize_product(product, request, fieldset) for product in changes.products]
+            return JsonResponse({
+                'success': True,
+                'count': len(products_data),
+                'products': products_data,
+                'removed': changes.removed,
+                'sync_token': changes.next_token
+            })
+
+        # Streaming mode for large exports (?stream=1), always read from the database
+        if request.GET.get('stream') in ('1', 'true'):
+            return StreamingHttpResponse(
+                stream_products(ORMBackend().listing(filters, **load), request, fieldset=fieldset),
+                content_type='application/json'
+            )
+
+        # Keyset pagination when the client asks for pages (?cursor= / ?limit=)
+        paginated = 'cursor' in request.GET or 'limit' in request.GET
+
+        def build_response_data():
+            backend = get_backend()
+            if paginated:
+                page = backend.page(
+                    filters, request.GET.get('cursor'), parse_limit(request.GET.get('limit')), **load
+                )
+                products = page
+            else:
+                products = backend.listing(filters, **load)
+
+            # Build the response data
+            products_data = [serialize_product(product, request, fieldset) for product in products]
+
+            # Build the final response
+            response_data = {
+                'success': True,
+                'count': len(products_data),
+                'products': products_data
             }
-            products_data.append(product_data)
-        
-        # Build the final response
-        response_data = {
-            'success': True,
-            'count': len(products_data),
-            'products': products_data
-        }
-        
-        return JsonResponse(response_data)
+            if paginated:
+                response_data['next_cursor'] = page.next_cursor
+            return response_data
+
+        # The encoded (and compressed) body is reused until the catalog changes;
+        # image URLs are absolute, so the host is part of the key
+        query = sorted((name, value) for name, values in request.GET.lists() for value in values)
+        key = f'products_api:{get_catalog_version()}:{request.build_absolute_uri("/")}:{query}'
+        try:
+            return cached_json_response(request, key, build_response_data)
+        except InvalidCursor as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=400)
         
     except Exception as e:
         return JsonResponse({
             'success': False,
             'error': str(e)
         }, status=500)
+
+
+@catalog_condition(personalized=False)
+def suggest_api(request):
+    """Typeahead suggestions for the shop search box, answered from memory"""
+    query = request.GET.get('q', '')[:100]
+    limit = min(parse_limit(request.GET.get('limit'), default=SUGGEST_LIMIT), MAX_SUGGEST_LIMIT)
+
+    suggestions = []
+    for kind, pk, name in get_suggestion_index().search(query, limit):
+        if kind == 'product':
+            url = reverse('catalog:product_detail', args=[pk])
+        elif kind == 'collection':
+            url = reverse('catalog:collection_detail', args=[pk])
+        else:
+            url = f"{reverse('catalog:shop')}?category={pk}"
+        suggestions.append({'type': kind, 'id': pk, 'name': name, 'url': url})
+
+    return JsonResponse({
+        'success': True,
+        'query': query,
+        'suggestions': suggestions
+    })
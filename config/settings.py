@@ -53,6 +53,7 @@ MIDDLEWARE = [
     "django.middleware.locale.LocaleMiddleware",
     'core.middleware.LanguageMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'core.middleware.PageCacheMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -92,6 +93,66 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Use a shared backend (Redis/Memcached) in production so every worker sees
+# the same catalog version; `check --deploy` warns about LocMemCache and the
+# snapshot listing backends refuse to start with it when DEBUG is off.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'urban-loom',
+    }
+}
+
+# Seconds anonymous pages stay in the full-page cache (see core.page_cache);
+# catalog writes purge the pages that show catalog data earlier
+PAGE_CACHE_TIMEOUT = 600
+
+# Seconds encoded and precompressed JSON API bodies are kept (see
+# core.response_cache); their keys include the data version
+API_RESPONSE_CACHE_TIMEOUT = 600
+
+
+# Catalog
+
+# Seconds the shop sidebar facet counts stay cached (writes invalidate them earlier)
+CATALOG_FACETS_TIMEOUT = 300
+
+# Where shop, collection and products API listings are answered from:
+# 'catalog.backends.ORMBackend' (database), 'catalog.backends.SnapshotBackend'
+# (in-memory snapshot rebuilt when the catalog version changes) or
+# 'catalog.backends.NumpyBackend' (NumPy arrays built from that snapshot)
+CATALOG_LISTING_BACKEND = 'catalog.backends.ORMBackend'
+
+# Seconds products_api sync tokens lag behind the clock, so writes committed
+# late are still picked up by the next ?since= request
+CATALOG_SYNC_WINDOW = 5
+
+# Widths (px) of the WebP/JPEG copies made of catalog images (see catalog.images)
+CATALOG_IMAGE_WIDTHS = (320, 640, 960, 1280)
+
+# Processes that resize uploaded images after the upload commits (see
+# catalog.images); 0 resizes them right after the commit, in the request
+CATALOG_IMAGE_WORKERS = 2
+
+# Directory the static catalog pages are published to (see catalog.publish);
+# when set, catalog saves re-render the pages they affect
+CATALOG_STATIC_ROOT = None
+
+
+# Orders
+
+# Seconds the stock of a cart stays held between checkout and payment
+# (see orders.reservations)
+STOCK_RESERVATION_TIMEOUT = 15 * 60
+
+# Threads that render check PDFs after checkout (see orders.check_jobs);
+# 0 renders them right after the transaction commits, in the request
+CHECK_PDF_WORKERS = 2
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,30 @@
+"""
+System checks for the caches shared by every worker.
+
+The catalog version, the page cache and the response cache live in the
+default cache. A per-process backend (LocMemCache) keeps a separate copy in
+each worker, so a catalog write is only seen by the worker that handled it.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PER_PROCESS_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+PAGE_CACHE_MIDDLEWARE = 'core.middleware.PageCacheMiddleware'
+
+
+def default_cache_is_per_process():
+    """True when the default cache is not shared between worker processes"""
+    return settings.CACHES.get('default', {}).get('BACKEND') in PER_PROCESS_CACHES
+
+
+@register(Tags.caches, deploy=True)
+def check_page_cache(app_configs, **kwargs):
+    if PAGE_CACHE_MIDDLEWARE in settings.MIDDLEWARE and default_cache_is_per_process():
+        return [Warning(
+            'The page cache is stored in a per-process cache; with several workers '
+            'catalog writes only purge the pages of the worker that made them.',
+            hint='Use a shared cache backend (Redis or Memcached) for CACHES["default"].',
+            id='core.W001',
+        )]
+    return []
@@ -1,5 +1,10 @@
 from django.utils.translation import activate
 from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from . import page_cache
 
 
 class LanguageMiddleware:
@@ -49,3 +54,56 @@ class LanguageMiddleware:
             response.set_cookie('user_language', lang_code, max_age=365*24*60*60)
 
         return response
+
+
+class PageCacheMiddleware:
+    """
+    Middleware que sirve a visitantes anónimos las páginas guardadas por
+    core.page_cache. Debe ir después de LanguageMiddleware: la clave de cada
+    página incluye el idioma activo.
+
+    Se omite la caché cuando hay cookie de sesión o de mensajes (usuario
+    autenticado, carrito o avisos pendientes), y no se guardan respuestas que
+    usan el token CSRF, escriben cookies o no son 200.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or settings.SESSION_COOKIE_NAME in request.COOKIES \
+                or CookieStorage.cookie_name in request.COOKIES:
+            return self.get_response(request)
+
+        response, versions = page_cache.get_page(request)
+        if response is not None:
+            # Las páginas guardadas conservan su ETag/Last-Modified
+            last_modified = parse_http_date_safe(response.get('Last-Modified', ''))
+            response = get_conditional_response(
+                request, etag=response.get('ETag'), last_modified=last_modified, response=response
+            )
+            response['X-Page-Cache'] = 'hit'
+            return response
+
+        response = self.get_response(request)
+        tags = getattr(request, 'page_cache_tags', None)
+        if tags is not None and self.is_shareable(request, response):
+            page_cache.store_page(request, response, tags, versions)
+            response['X-Page-Cache'] = 'miss'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.page_cache_tags = page_cache.view_tags(view_func)
+
+    def is_shareable(self, request, response):
+        """True if ``response`` is the same for every anonymous visitor"""
+        session = getattr(request, 'session', None)
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            and not (session is not None and session.modified)
+            and 'private' not in response.get('Cache-Control', '')
+            and 'no-store' not in response.get('Cache-Control', '')
+        )
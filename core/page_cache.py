@@ -0,0 +1,112 @@
+"""
+Full-page cache for anonymous visitors.
+
+Views marked with ``@anonymous_page_cache(*tags)`` are stored whole by
+``core.middleware.PageCacheMiddleware`` under a key made of the path, the
+normalized query string and the active language. Later anonymous requests
+for the same key are answered from the cache before any view, context
+processor or template runs.
+
+Tags name the data a page depends on. ``purge_page_cache(tag)`` bumps the
+tag's version; entries remember the versions they were stored with and are
+ignored once one of them changes. Catalog writes purge the ``catalog`` tag
+(see ``catalog.versioning``).
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+PAGE_KEY_PREFIX = 'page_cache:page'
+TAG_KEY_PREFIX = 'page_cache:tag'
+
+# Parámetros que no cambian la página: el idioma ya va en la clave
+IGNORED_PARAMS = {'lang', 'fbclid', 'gclid'}
+IGNORED_PARAM_PREFIXES = ('utm_',)
+
+# Tags used by any cached view; a lookup reads all their versions at once
+_tags = set()
+
+
+def anonymous_page_cache(*tags):
+    """Mark a view function or class-based view as cacheable for anonymous visitors"""
+    _tags.update(tags)
+
+    def decorator(view):
+        view.page_cache_tags = tuple(tags)
+        return view
+    return decorator
+
+
+def view_tags(view_func):
+    """Tags of a cacheable view, or None if the view is not cached"""
+    tags = getattr(view_func, 'page_cache_tags', None)
+    if tags is None:
+        tags = getattr(getattr(view_func, 'view_class', None), 'page_cache_tags', None)
+    return tags
+
+
+def page_key(request):
+    """Cache key of the page for ``request``: path, normalized query and language"""
+    params = sorted(
+        (name, value) for name, values in request.GET.lists() for value in values
+        if name not in IGNORED_PARAMS and not name.startswith(IGNORED_PARAM_PREFIXES)
+    )
+    language = getattr(request, 'LANGUAGE_CODE', settings.LANGUAGE_CODE)
+    raw = f'{request.path}?{urlencode(params)}|{language}'
+    return f'{PAGE_KEY_PREFIX}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def _tag_key(tag):
+    return f'{TAG_KEY_PREFIX}:{tag}'
+
+
+def tag_versions(tags):
+    """Current version of each tag, starting unknown tags from the clock"""
+    keys = {_tag_key(tag): tag for tag in tags}
+    versions = {keys[key]: version for key, version in cache.get_many(keys).items()}
+    for tag in set(tags) - versions.keys():
+        # Igual que la versión del catálogo: nunca se reutiliza una versión vieja
+        cache.add(_tag_key(tag), int(time.time() * 1000), timeout=None)
+        versions[tag] = cache.get(_tag_key(tag))
+    return versions
+
+
+def purge_page_cache(*tags):
+    """Invalidate every cached page that depends on any of ``tags``"""
+    for tag in tags:
+        try:
+            cache.incr(_tag_key(tag))
+        except ValueError:
+            tag_versions([tag])
+
+
+def get_page(request):
+    """
+    Return ``(response, versions)`` for ``request``.
+
+    ``response`` is the cached page if it is still current, otherwise None.
+    ``versions`` are the tag versions read now; a page rendered after a miss
+    is stored with them, so a write during the render makes it stale at once.
+    """
+    key = page_key(request)
+    tag_keys = {_tag_key(tag): tag for tag in _tags}
+    values = cache.get_many([key, *tag_keys])
+    versions = {tag: values[tag_key] for tag_key, tag in tag_keys.items() if tag_key in values}
+    entry = values.get(key)
+    if entry is not None and all(versions.get(tag) == version for tag, version in entry['tags'].items()):
+        return entry['response'], versions
+    if len(versions) < len(tag_keys):
+        versions = tag_versions(_tags)
+    return None, versions
+
+
+def store_page(request, response, tags, versions):
+    """Cache ``response`` as depending on ``tags`` at ``versions``"""
+    cache.set(
+        page_key(request),
+        {'tags': {tag: versions[tag] for tag in tags}, 'response': response},
+        settings.PAGE_CACHE_TIMEOUT,
+    )
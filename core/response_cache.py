@@ -0,0 +1,99 @@
+"""
+Serialized, precompressed JSON response bodies.
+
+``cached_json_response`` stores the encoded JSON body of an API response
+together with gzip and Brotli copies under a key that includes the version
+of the data behind it (catalog version, translation file version, ...). A
+hit negotiates ``Accept-Encoding`` and returns the stored bytes as they are,
+so no JSON encoding and no compression runs per request. Entries of old
+versions are never read again and expire on their own.
+
+Brotli copies need the optional ``brotli`` package; without it clients get
+gzip.
+"""
+import gzip
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli se sirve gzip
+    brotli = None
+
+RESPONSE_KEY_PREFIX = 'response_cache'
+
+# Codificaciones que se pueden generar, en orden de preferencia
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Bodies smaller than this are sent uncompressed, as GZipMiddleware does
+MIN_COMPRESS_SIZE = 200
+
+# Larger bodies (full unpaginated exports) are not kept in the cache
+MAX_CACHED_SIZE = 8 * 1024 * 1024
+
+
+def compress(content, level=6):
+    """Return {coding: bytes} with the gzip and, if available, Brotli copies of ``content``"""
+    # mtime=0: mismo contenido, mismos bytes
+    variants = {'gzip': gzip.compress(content, level, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(content, quality=min(level + 3, 11))
+    return variants
+
+
+def negotiate_encoding(request, available=ENCODINGS):
+    """Preferred coding of ``available`` accepted by the client, or None for identity"""
+    accepted = {}
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip().replace(' ', '')
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+    for coding in available:
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+def build_entry(payload):
+    """Encode ``payload`` once and compress it once per coding"""
+    body = json.dumps(payload, cls=DjangoJSONEncoder).encode()
+    return {'identity': body, **(compress(body) if len(body) >= MIN_COMPRESS_SIZE else {})}
+
+
+def serve_entry(request, entry):
+    coding = negotiate_encoding(request, [coding for coding in ENCODINGS if coding in entry])
+    response = HttpResponse(entry[coding or 'identity'], content_type='application/json')
+    if coding:
+        response['Content-Encoding'] = coding
+    response['Content-Length'] = str(len(response.content))
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def cached_json_response(request, key, build):
+    """
+    Response for the JSON payload stored under ``key``.
+
+    ``build()`` returns the payload and only runs on a miss; ``key`` must
+    name every input of the payload, including its data version.
+    """
+    cache_key = f'{RESPONSE_KEY_PREFIX}:{hashlib.md5(key.encode()).hexdigest()}'
+    entry = cache.get(cache_key)
+    if entry is None:
+        entry = build_entry(build())
+        if len(entry['identity']) <= MAX_CACHED_SIZE:
+            cache.set(cache_key, entry, settings.API_RESPONSE_CACHE_TIMEOUT)
+    return serve_entry(request, entry)
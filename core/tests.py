@@ -1,3 +1,153 @@
-from django.test import TestCase
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from catalog import publish
+from catalog.models import Collection, Product
+from . import checks, response_cache
+
+
+class PageCacheTestCase(TestCase):
+    """Pruebas para la caché de páginas completas de visitantes anónimos"""
+
+    def setUp(self):
+        cache.clear()
+        self.collection = Collection.objects.create(name="NEON NIGHTS", season="SS25", description="-")
+        self.url = reverse('catalog:collections')
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        """Test 1: La segunda visita anónima se responde desde la caché sin consultas"""
+        first = self.client.get(self.url, {'utm_source': 'mail'})
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+
+        # Con el ETag guardado la caché también responde 304
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        for url in (reverse('home'), reverse('core:about')):
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+
+    def test_pages_are_cached_per_language(self):
+        """Test 2: Cada idioma y cada consulta tienen su propia página"""
+        spanish = self.client.get(self.url, HTTP_ACCEPT_LANGUAGE='es')
+        english = self.client.get(self.url, HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual(english['X-Page-Cache'], 'miss')
+        self.assertNotEqual(spanish.content, english.content)
+        self.assertEqual(self.client.get(self.url, HTTP_ACCEPT_LANGUAGE='en').content, english.content)
+        self.assertEqual(self.client.get(self.url, {'page': 2})['X-Page-Cache'], 'miss')
+
+    def test_catalog_writes_purge_pages(self):
+        """Test 3: Un cambio en el catálogo invalida las páginas que lo muestran"""
+        self.client.get(self.url)
+        Collection.objects.create(name="CONCRETE DREAMS", season="FW25", description="-")
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'CONCRETE DREAMS')
+
+    def test_sessions_bypass_cache(self):
+        """Test 4: Los usuarios autenticados nunca reciben ni guardan páginas de la caché"""
+        self.client.get(self.url)
+        user = User.objects.create_user(
+            email='cliente@test.com', first_name='Cliente', last_name='Test',
+            phone_number='+573001234567', password='cliente123'
+        )
+        self.client.force_login(user)
+
+        response = self.client.get(self.url)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, 'cart-count')
+
+
+class ResponseCacheTestCase(TestCase):
+    """Pruebas para la negociación de codificación y el caché de translations_api"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def test_encoding_negotiation(self):
+        """Test 5: Se elige la codificación aceptada según las preferencias del cliente"""
+        cases = [
+            ('', None),
+            ('gzip, deflate, br', 'br'),
+            ('br;q=0, gzip', 'gzip'),
+            ('GZIP;q=0.5', 'gzip'),
+            ('*', 'br'),
+            ('*;q=0', None),
+            ('identity', None),
+        ]
+        for header, expected in cases:
+            request = self.factory.get('/', HTTP_ACCEPT_ENCODING=header)
+            self.assertEqual(response_cache.negotiate_encoding(request, ('br', 'gzip')), expected, header)
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertEqual(response_cache.negotiate_encoding(request, available=['gzip']), 'gzip')
+
+    def test_translations_are_built_once_per_file_version(self):
+        """Test 6: translations_api no vuelve a leer el archivo hasta que cambia"""
+        url = reverse('core:translations_api')
+        first = self.client.get(url, HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual(first.json()['lang'], 'en')
+
+        with patch('core.utils.lang.load_translation') as load_translation:
+            second = self.client.get(url, HTTP_ACCEPT_LANGUAGE='en')
+            load_translation.assert_not_called()
+            self.assertEqual(second.content, first.content)
+
+            with patch('core.utils.lang.translation_version', return_value=1):
+                load_translation.return_value = {'ADS_TITLE': 'Nuevo'}
+                third = self.client.get(url, HTTP_ACCEPT_LANGUAGE='en')
+        self.assertEqual(third.json()['translations']['ADS_TITLE'], 'Nuevo')
+
+
+class CsrfCookieTestCase(TestCase):
+    """Pruebas para el token CSRF de los formularios de páginas estáticas"""
+
+    def test_static_form_submits_after_fetching_cookie(self):
+        """Test 7: Sin cookie CSRF, el formulario publicado obtiene una y se envía por POST"""
+        product = Product.objects.create(name="Chaqueta", price=100, stock=5)
+        html = publish.render_page(reverse('catalog:product_detail', args=[product.id]), 'es').decode()
+        self.assertIn(f'data-csrf-url="{reverse("core:csrf_cookie")}"', html)
+
+        client = Client(enforce_csrf_checks=True)
+        response = client.get(reverse('core:csrf_cookie'))
+        self.assertEqual(response.status_code, 204)
+        self.assertIn('no-cache', response['Cache-Control'])
+        token = client.cookies['csrftoken'].value
+
+        url = reverse('orders:add_to_cart', args=[product.id])
+        response = client.post(url, {'quantity': 1, 'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('guest_cart', response.cookies)
+
+
+class SharedCacheCheckTestCase(TestCase):
+    """Pruebas para los checks de caché compartida entre procesos"""
+
+    def test_per_process_cache_is_reported(self):
+        """Test 8: Con LocMemCache se advierte de la caché de páginas y se rechazan los snapshots"""
+        from catalog import checks as catalog_checks
+
+        self.assertEqual([error.id for error in checks.check_page_cache(None)], ['core.W001'])
+        self.assertEqual([error.id for error in catalog_checks.check_catalog_version_cache(None)], ['catalog.W001'])
+        self.assertEqual(catalog_checks.check_listing_backend(None), [])
+        with override_settings(CATALOG_LISTING_BACKEND='catalog.backends.NumpyBackend'):
+            self.assertEqual([error.id for error in catalog_checks.check_listing_backend(None)], ['catalog.E001'])
+            with override_settings(DEBUG=True):
+                self.assertEqual(catalog_checks.check_listing_backend(None), [])
+
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://'}}
+        with override_settings(CACHES=shared, CATALOG_LISTING_BACKEND='catalog.backends.SnapshotBackend'):
+            self.assertEqual(checks.check_page_cache(None), [])
+            self.assertEqual(catalog_checks.check_listing_backend(None), [])
 
-# Create your tests here.
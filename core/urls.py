@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import AboutView, weather_api, ads_api, translations_api
+from .views import AboutView, weather_api, ads_api, translations_api, csrf_cookie
 
 app_name = 'core'
 
@@ -8,4 +8,5 @@ urlpatterns = [
     path('api/weather/', weather_api, name='weather_api'),
     path('api/ads/', ads_api, name='ads_api'),
     path('api/translations/', translations_api, name='translations_api'),
+    path('api/csrf/', csrf_cookie, name='csrf_cookie'),
 ]
\ No newline at end of file
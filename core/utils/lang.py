@@ -4,17 +4,34 @@ from pathlib import Path
 
 LANG_PATH = Path(settings.BASE_DIR) / "resources" / "lang"
 
-def load_translation(lang_code="en"):
-    """
-    Carga un archivo de traducción desde resources/lang/<lang_code>.json.
-    Si no existe, hace fallback a inglés.
-    """
+def translation_path(lang_code="en"):
+    """Ruta del archivo de traducción de lang_code, con fallback a inglés"""
     # Normalizar (ej: es-CO -> es)
     short_code = lang_code.split("-")[0]
 
     file_path = LANG_PATH / f"{short_code}.json"
     if not file_path.exists():
         file_path = LANG_PATH / "en.json"  # fallback
+    return file_path
+
+
+def translation_version(lang_code="en"):
+    """
+    Versión del archivo de traducción (su fecha de modificación), para las
+    cachés que dependen de él. 0 si no existe.
+    """
+    try:
+        return translation_path(lang_code).stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def load_translation(lang_code="en"):
+    """
+    Carga un archivo de traducción desde resources/lang/<lang_code>.json.
+    Si no existe, hace fallback a inglés.
+    """
+    file_path = translation_path(lang_code)
 
     try:
         with open(file_path, "r", encoding="utf-8") as f:
@@ -1,13 +1,18 @@
 from django.shortcuts import render
 from django.views.generic import TemplateView
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import ensure_csrf_cookie
 import requests
 import logging
+from .page_cache import anonymous_page_cache
+from .response_cache import cached_json_response
 
 # Create your views here.
 
 logger = logging.getLogger(__name__)
 
+@anonymous_page_cache()
 class AboutView(TemplateView):
     """Vista para mostrar la página About de Urban Loom"""
     template_name = 'core/about.html'
@@ -188,25 +193,38 @@ def ads_api(request):
 
 def translations_api(request):
     """API endpoint to get translations for JavaScript"""
-    from .utils.lang import load_translation
+    from .utils.lang import load_translation, translation_version
     
     # Get language from request
     lang = getattr(request, "LANGUAGE_CODE", "es")
     if not lang:
         lang = "es"
     
-    # Load translations
-    t = load_translation(lang)
-    
-    # Return only needed translations for ads widget
-    ads_translations = {
-        'ADS_TITLE': t.get('ADS_TITLE', 'Publicidad'),
-        'ADS_VIEW_DETAILS': t.get('ADS_VIEW_DETAILS', 'Ver detalles'),
-        'ADS_NO_DATA': t.get('ADS_NO_DATA', 'Publicidad no disponible')
-    }
-    
-    return JsonResponse({
-        'success': True,
-        'translations': ads_translations,
-        'lang': lang.split("-")[0] if "-" in lang else lang
-    })
+    def build_response_data():
+        # Load translations
+        t = load_translation(lang)
+
+        # Return only needed translations for ads widget
+        ads_translations = {
+            'ADS_TITLE': t.get('ADS_TITLE', 'Publicidad'),
+            'ADS_VIEW_DETAILS': t.get('ADS_VIEW_DETAILS', 'Ver detalles'),
+            'ADS_NO_DATA': t.get('ADS_NO_DATA', 'Publicidad no disponible')
+        }
+
+        return {
+            'success': True,
+            'translations': ads_translations,
+            'lang': lang.split("-")[0] if "-" in lang else lang
+        }
+
+    # Same bytes until the translation file changes
+    return cached_json_response(
+        request, f'translations_api:{lang}:{translation_version(lang)}', build_response_data
+    )
+
+
+@never_cache
+@ensure_csrf_cookie
+def csrf_cookie(request):
+    """Sets the CSRF cookie for forms on pages published by publish_static"""
+    return HttpResponse(status=204)
@@ -1,40 +1,115 @@
 from django.contrib import admin
-from .models import Cart, CartItem, Order, OrderItem
+from django.db.models import DecimalField, ExpressionWrapper, F
+from .models import Cart, CartItem, CheckDocument, Order, OrderItem, StockReservation
 
 # Register your models here.
 
+# Los totales se calculan en la consulta del listado, no fila por fila
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def line_total(quantity, price):
+    return ExpressionWrapper(F(quantity) * F(price), output_field=MONEY)
+
+
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 0
     readonly_fields = ['created_at']
+    autocomplete_fields = ['product']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product', 'cart__user')
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
-    list_display = ['user', 'get_total_items', 'get_total_price', 'created_at']
+    list_display = ['user', 'total_items', 'total_price', 'created_at']
     list_filter = ['created_at']
+    list_select_related = ['user']
     search_fields = ['user__email', 'user__first_name', 'user__last_name']
     inlines = [CartItemInline]
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['total_items', 'total_price', 'created_at', 'updated_at']
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.refresh_totals()
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
-    list_display = ['cart', 'product', 'quantity', 'get_total', 'created_at']
+    list_display = ['cart', 'product', 'quantity', 'total', 'created_at']
     list_filter = ['created_at']
+    list_select_related = ['cart__user', 'product']
     search_fields = ['cart__user__email', 'product__name']
+    autocomplete_fields = ['product']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(line_total=line_total('quantity', 'product__price'))
+
+    # Los items editados aquí actualizan los totales guardados de su carrito
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        Cart.objects.filter(pk=obj.cart_id).refresh_totals()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        Cart.objects.filter(pk=obj.cart_id).refresh_totals()
+
+    def delete_queryset(self, request, queryset):
+        cart_ids = set(queryset.values_list('cart_id', flat=True))
+        super().delete_queryset(request, queryset)
+        Cart.objects.filter(pk__in=cart_ids).refresh_totals()
+
+    @admin.display(description='Total', ordering='line_total')
+    def total(self, item):
+        return item.line_total
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
+    autocomplete_fields = ['product']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'status', 'created_at']
     list_filter = ['status', 'created_at']
+    list_select_related = ['user']
     search_fields = ['user__email', 'user__first_name', 'user__last_name']
     inlines = [OrderItemInline]
     readonly_fields = ['created_at', 'updated_at']
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
-    list_display = ['order', 'product', 'quantity', 'price', 'get_total']
+    list_display = ['order', 'product', 'quantity', 'price', 'total']
+    list_select_related = ['order__user', 'product']
     search_fields = ['order__id', 'product__name']
+    autocomplete_fields = ['product']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(line_total=line_total('quantity', 'price'))
+
+    @admin.display(description='Total', ordering='line_total')
+    def total(self, item):
+        return item.line_total
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['cart', 'product', 'quantity', 'expires_at']
+    list_filter = ['expires_at']
+    list_select_related = ['cart__user', 'product']
+    search_fields = ['cart__user__email', 'product__name']
+    autocomplete_fields = ['product']
+
+@admin.register(CheckDocument)
+class CheckDocumentAdmin(admin.ModelAdmin):
+    list_display = ['check_number', 'order', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    list_select_related = ['order__user']
+    search_fields = ['check_number', 'order__id', 'order__user__email']
+    readonly_fields = ['order', 'check_number', 'amount', 'attempts', 'created_at', 'started_at', 'finished_at']
+
+    def get_queryset(self, request):
+        # El PDF no se muestra en el admin; no se carga en los listados
+        return super().get_queryset(request).defer('pdf')
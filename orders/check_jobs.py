@@ -0,0 +1,94 @@
+"""
+Generación en segundo plano de los PDF de cheques.
+
+Pagar con cheque solo crea una fila ``CheckDocument`` en cola dentro de la
+transacción del checkout; la orden queda pendiente y la respuesta no espera
+a ReportLab. Cuando la transacción confirma, el trabajo pasa a un pool local
+de ``settings.CHECK_PDF_WORKERS`` hilos, que guarda el PDF en la misma fila.
+
+La página de confirmación consulta ``check_status`` hasta que el PDF está
+listo y lo descarga con ``download_check_pdf``. Los trabajos que quedaron en
+cola o a medias por un reinicio del proceso se retoman con el comando
+``run_check_jobs``.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CheckDocument
+
+# Un trabajo "running" más viejo que esto se da por perdido (proceso reiniciado)
+STALE_AFTER = timedelta(minutes=10)
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.CHECK_PDF_WORKERS, thread_name_prefix='check-pdf')
+        return _executor
+
+
+def enqueue_check(order, amount, check_number):
+    """Pone en cola el PDF del cheque de ``order``; se genera cuando la transacción confirma"""
+    job = CheckDocument.objects.create(order=order, amount=amount, check_number=check_number)
+    transaction.on_commit(lambda: submit(job.pk))
+    return job
+
+
+def submit(job_id):
+    if settings.CHECK_PDF_WORKERS:
+        _get_executor().submit(_run_in_worker, job_id)
+    else:
+        run_job(job_id)
+
+
+def _run_in_worker(job_id):
+    # Los hilos del pool tienen su propia conexión; se cierra como al final de una petición
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_job(job_id):
+    """Genera el PDF de un trabajo en cola; devuelve False si otro worker ya lo tomó"""
+    from .payment_processors import CheckPaymentProcessor
+
+    claimed = CheckDocument.objects.filter(pk=job_id, status=CheckDocument.QUEUED).update(
+        status=CheckDocument.RUNNING, started_at=timezone.now(), attempts=F('attempts') + 1
+    )
+    if not claimed:
+        return False
+
+    job = CheckDocument.objects.select_related('order__user').get(pk=job_id)
+    try:
+        pdf = CheckPaymentProcessor()._generate_check_pdf(job.order.user, job.order, job.amount, job.check_number)
+    except Exception as e:
+        CheckDocument.objects.filter(pk=job_id).update(
+            status=CheckDocument.FAILED, error=str(e), finished_at=timezone.now()
+        )
+    else:
+        CheckDocument.objects.filter(pk=job_id).update(
+            status=CheckDocument.DONE, pdf=pdf, error='', finished_at=timezone.now()
+        )
+    return True
+
+
+def run_pending(retry_failed=False):
+    """Genera en este proceso los trabajos en cola (y los perdidos); devuelve cuántos"""
+    lost = CheckDocument.objects.filter(status=CheckDocument.RUNNING, started_at__lt=timezone.now() - STALE_AFTER)
+    if retry_failed:
+        lost = lost | CheckDocument.objects.filter(status=CheckDocument.FAILED)
+    lost.update(status=CheckDocument.QUEUED)
+    job_ids = CheckDocument.objects.filter(status=CheckDocument.QUEUED).order_by('pk').values_list('pk', flat=True)
+    return sum(run_job(job_id) for job_id in list(job_ids))
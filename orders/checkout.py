@@ -0,0 +1,138 @@
+"""
+Proceso de compra (checkout) como una sola transacción.
+
+``place_order`` convierte el carrito de un usuario en una orden pagada con un
+número fijo de consultas, sin importar cuántos productos tenga el carrito:
+
+1. Lee los items con sus productos bloqueados (``select_for_update``) y
+   verifica el stock que no está apartado por otros carritos
+   (ver orders.reservations).
+2. Crea la orden y sus items con ``bulk_create``.
+3. Descuenta el stock con un único UPDATE condicional: solo se aplica si
+   todos los productos siguen teniendo unidades suficientes, así dos
+   compradores simultáneos no pueden vender la misma unidad.
+4. Procesa el pago y guarda la orden una sola vez.
+5. Vacía el carrito y convierte su apartado de stock en la venta.
+
+Si algo falla (stock, pago) la transacción se revierte completa.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+
+from catalog.models import Product
+from .models import Cart, Order, OrderItem
+from .payment_processors import PaymentProcessorFactory
+from .reservations import held_by_others
+
+
+class CheckoutError(Exception):
+    """Error que impide completar la compra; el mensaje se muestra al usuario"""
+
+
+class EmptyCart(CheckoutError):
+    def __init__(self):
+        super().__init__("Tu carrito está vacío.")
+
+
+class InsufficientStock(CheckoutError):
+    def __init__(self, product):
+        self.product = product
+        super().__init__(f"Stock insuficiente para {product.name}")
+
+
+class PaymentFailed(CheckoutError):
+    def __init__(self, result):
+        self.result = result
+        super().__init__(result.message)
+
+
+def decrement_stock(items, held=None):
+    """
+    Descuenta de una vez las cantidades de ``items`` (con product_id y
+    quantity), dejando intactas las unidades de ``held`` ({product_id:
+    unidades apartadas por otros}). Si a algún producto ya no le alcanzan
+    las unidades no se descuenta nada y se devuelven los ids de esos
+    productos.
+    """
+    held = held or {}
+    quantities = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    enough = Q()
+    for product_id, quantity in quantities.items():
+        enough |= Q(pk=product_id, stock__gte=quantity + held.get(product_id, 0))
+
+    with transaction.atomic():
+        updated = Product.objects.filter(enough).update(
+            stock=Case(
+                *[When(pk=product_id, then=F('stock') - quantity) for product_id, quantity in quantities.items()],
+                default=F('stock'),
+                output_field=PositiveIntegerField(),
+            )
+        )
+        if updated == len(quantities):
+            return []
+        # Se revierte solo este UPDATE para leer el stock que había
+        transaction.set_rollback(True)
+    stock = dict(Product.objects.filter(pk__in=quantities).values_list('pk', 'stock'))
+    return [
+        product_id for product_id, quantity in quantities.items()
+        if stock.get(product_id, 0) - held.get(product_id, 0) < quantity
+    ]
+
+
+def place_order(user, cart, shipping_address, payment_method):
+    """
+    Crea y paga la orden del carrito de ``user``; devuelve (orden, resultado del pago).
+
+    Lanza ValueError si el método de pago no existe y CheckoutError si la
+    compra no se puede completar; en ese caso no queda nada escrito.
+    """
+    payment_processor = PaymentProcessorFactory.create(payment_method)
+
+    with transaction.atomic():
+        cart_items = list(cart.items.select_related('product').select_for_update())
+        if not cart_items:
+            raise EmptyCart()
+        held = held_by_others([cart_item.product_id for cart_item in cart_items], cart)
+        for cart_item in cart_items:
+            if cart_item.product.stock - held.get(cart_item.product_id, 0) < cart_item.quantity:
+                raise InsufficientStock(cart_item.product)
+
+        total_amount = sum(
+            (cart_item.quantity * cart_item.product.price for cart_item in cart_items), Decimal('0')
+        )
+        order = Order.objects.create(
+            user=user,
+            status='pending',
+            shipping_address=shipping_address,
+            payment_method=payment_method,
+            total_amount=total_amount
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=cart_item.product,
+                quantity=cart_item.quantity,
+                price=cart_item.product.price
+            )
+            for cart_item in cart_items
+        ])
+        short = decrement_stock(cart_items, held)
+        if short:
+            # Otro comprador se llevó unidades entre la verificación y el UPDATE
+            raise InsufficientStock(next(item.product for item in cart_items if item.product_id in short))
+
+        # El procesador fija el estado de la orden; aquí se guarda una sola vez
+        result = payment_processor.process_payment(user=user, order=order, amount=total_amount)
+        if not result.success:
+            raise PaymentFailed(result)
+        order.transaction_id = result.transaction_id
+        order.save(update_fields=['status', 'transaction_id', 'updated_at'])
+
+        cart.items.all().delete()
+        cart.reservations.all().delete()
+        Cart.objects.filter(pk=cart.pk).refresh_totals()
+    return order, result
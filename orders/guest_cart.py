@@ -0,0 +1,105 @@
+"""
+Carrito de visitantes anónimos en una cookie firmada.
+
+Sin sesión, el carrito vive en la cookie ``guest_cart`` como
+``producto:cantidad`` separados por punto (``12:2.31:1``), firmada para que
+el navegador no pueda alterarla. Agregar, cambiar o quitar productos solo
+reescribe la cookie: no hay sesión ni filas de ``Cart``/``CartItem``.
+
+Al iniciar sesión en ``accounts.views.login_user``, ``merge_guest_cart``
+suma ese carrito al ``Cart`` del usuario con un solo upsert y borra la
+cookie.
+"""
+from django.db import transaction
+
+from catalog.models import Product
+from .models import Cart, CartItem
+from .reservations import available_stock
+
+GUEST_CART_COOKIE = 'guest_cart'
+GUEST_CART_SALT = 'orders.guest_cart'
+GUEST_CART_MAX_AGE = 30 * 24 * 60 * 60
+
+# Mantiene la cookie muy por debajo del límite de 4 KB de los navegadores
+MAX_GUEST_ITEMS = 50
+
+
+def read_guest_cart(request):
+    """{product_id: cantidad} de la cookie; vacío si no hay o la firma no es válida"""
+    value = request.get_signed_cookie(GUEST_CART_COOKIE, default='', salt=GUEST_CART_SALT)
+    items = {}
+    for entry in value.split('.') if value else ():
+        product_id, _, quantity = entry.partition(':')
+        try:
+            product_id, quantity = int(product_id), int(quantity)
+        except ValueError:
+            continue
+        if product_id > 0 and quantity > 0:
+            items[product_id] = quantity
+    return items
+
+
+def write_guest_cart(response, items):
+    """Guarda ``items`` en la cookie de ``response`` (o la borra si quedó vacío)"""
+    value = '.'.join(f'{product_id}:{quantity}' for product_id, quantity in items.items() if quantity > 0)
+    if not value:
+        response.delete_cookie(GUEST_CART_COOKIE, samesite='Lax')
+        return
+    response.set_signed_cookie(
+        GUEST_CART_COOKIE, value, salt=GUEST_CART_SALT,
+        max_age=GUEST_CART_MAX_AGE, httponly=True, samesite='Lax',
+    )
+
+
+class GuestCartItem:
+    """Item del carrito de un visitante, con la interfaz que usan las plantillas de CartItem"""
+
+    def __init__(self, product, quantity):
+        self.product = product
+        self.product_id = product.pk
+        self.quantity = quantity
+
+    @property
+    def id(self):
+        # Las URLs de actualizar/quitar reciben el producto en lugar de un CartItem
+        return self.product_id
+
+    def get_total(self):
+        return self.quantity * self.product.price
+
+
+def guest_cart_items(items):
+    """Items mostrables de ``items``; los productos inactivos o borrados se omiten"""
+    products = Product.objects.filter(pk__in=items, is_active=True).in_bulk()
+    return [GuestCartItem(products[product_id], quantity) for product_id, quantity in items.items() if product_id in products]
+
+
+def merge_guest_cart(request, response, user):
+    """
+    Suma el carrito de la cookie al ``Cart`` de ``user`` y borra la cookie.
+
+    Las cantidades se suman a las que ya tenía el usuario, hasta el stock
+    disponible, y se escriben con un único INSERT ... ON CONFLICT.
+    """
+    items = read_guest_cart(request)
+    if not items:
+        return
+    response.delete_cookie(GUEST_CART_COOKIE, samesite='Lax')
+
+    with transaction.atomic():
+        cart, _ = Cart.objects.get_or_create(user=user)
+        products = list(Product.objects.filter(pk__in=items, is_active=True).only('pk', 'stock'))
+        stock = available_stock(products, cart)
+        current = dict(cart.items.filter(product_id__in=items).values_list('product_id', 'quantity'))
+        merged = []
+        for product in products:
+            before = current.get(product.pk, 0)
+            # Nunca se reduce lo que el usuario ya tenía en su carrito
+            quantity = max(before, min(before + items[product.pk], stock[product.pk]))
+            if quantity != before:
+                merged.append(CartItem(cart=cart, product=product, quantity=quantity))
+        if merged:
+            CartItem.objects.bulk_create(
+                merged, update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity'],
+            )
+            Cart.objects.filter(pk=cart.pk).refresh_totals()
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from orders.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired stock reservations (run periodically, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        released = release_expired()
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired reservations'))
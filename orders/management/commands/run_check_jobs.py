@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from orders.check_jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = 'Render queued check PDFs, including jobs lost when the process restarted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Queue failed jobs again before running')
+
+    def handle(self, *args, **options):
+        rendered = run_pending(retry_failed=options['retry_failed'])
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} check PDFs'))
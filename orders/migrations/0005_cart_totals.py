@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-17 02:04
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def compute_totals(apps, schema_editor):
+    Cart = apps.get_model('orders', 'Cart')
+    CartItem = apps.get_model('orders', 'CartItem')
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    Cart.objects.update(
+        total_items=Coalesce(Subquery(items.annotate(total=Sum('quantity')).values('total')), 0),
+        total_price=Coalesce(
+            Subquery(items.annotate(
+                total=Sum(F('quantity') * F('product__price'), output_field=DecimalField())
+            ).values('total')),
+            Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='total_items',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(compute_totals, migrations.RunPython.noop),
+    ]
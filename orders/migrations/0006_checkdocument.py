@@ -0,0 +1,30 @@
+# Generated by Django 4.2.23 on 2026-10-17 02:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_cart_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_number', models.CharField(max_length=50)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('queued', 'En cola'), ('running', 'Generando'), ('done', 'Listo'), ('failed', 'Falló')], db_index=True, default='queued', max_length=10)),
+                ('pdf', models.BinaryField(null=True)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='check_document', to='orders.order')),
+            ],
+        ),
+    ]
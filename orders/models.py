@@ -1,21 +1,51 @@
 from django.db import models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from accounts.models import User
 from catalog.models import Product
 
 # Create your models here.
+class CartQuerySet(models.QuerySet):
+    def refresh_totals(self):
+        """Recalcula total_items y total_price de los carritos con un solo UPDATE"""
+        items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        money = Cart._meta.get_field('total_price')
+        return self.update(
+            total_items=Coalesce(Subquery(items.annotate(total=Sum('quantity')).values('total')), 0),
+            total_price=Coalesce(
+                Subquery(items.annotate(
+                    total=Sum(F('quantity') * F('product__price'), output_field=DecimalField())
+                ).values('total')),
+                Value(0),
+                output_field=money,
+            ),
+        )
+
+
 class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="cart")
+    # Totales guardados: se recalculan en la misma transacción que cambia los
+    # items (vistas del carrito, checkout, admin) o el precio de un producto
+    total_items = models.PositiveIntegerField(default=0, editable=False)
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+
     def __str__(self):
         return f"Carrito de {self.user.email}"
 
     def get_total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.total_items
 
     def get_total_price(self):
-        return sum(item.get_total() for item in self.items.all())
+        return self.total_price
+
+    def refresh_totals(self):
+        """Recalcula los totales guardados y los vuelve a leer en esta instancia"""
+        Cart.objects.filter(pk=self.pk).refresh_totals()
+        self.refresh_from_db(fields=['total_items', 'total_price'])
 
 
 class CartItem(models.Model):
@@ -34,6 +64,24 @@ class CartItem(models.Model):
         return self.quantity * self.product.price
 
 
+class StockReservation(models.Model):
+    """Unidades de un producto apartadas para un carrito hasta ``expires_at`` (ver orders.reservations)"""
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="reservations")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reservations")
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('cart', 'product')
+        # Las unidades apartadas de un producto se suman solo desde el índice
+        indexes = [
+            models.Index(fields=['product', 'expires_at', 'quantity'], name='reservation_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name} apartadas hasta {self.expires_at:%H:%M}"
+
+
 class Order(models.Model):
     STATUS_CHOICES = (
         ("pending", "Pendiente"),
@@ -77,4 +125,32 @@ class OrderItem(models.Model):
         return self.quantity * self.price
 
     def __str__(self):
-        return f"{self.quantity} x {self.product.name}"
\ No newline at end of file
+        return f"{self.quantity} x {self.product.name}"
+
+
+class CheckDocument(models.Model):
+    """PDF del cheque de una orden, generado en segundo plano (ver orders.check_jobs)"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "En cola"),
+        (RUNNING, "Generando"),
+        (DONE, "Listo"),
+        (FAILED, "Falló"),
+    )
+
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name="check_document")
+    check_number = models.CharField(max_length=50)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    pdf = models.BinaryField(null=True, editable=False)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Cheque {self.check_number} ({self.get_status_display()})"
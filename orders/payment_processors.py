@@ -8,13 +8,14 @@ mediante una interfaz abstracta y múltiples implementaciones concretas.
 Componentes:
 - PaymentProcessor: Interfaz abstracta (clase base abstracta)
 - CardPaymentProcessor: Implementación para pagos con tarjeta
-- CheckPaymentProcessor: Implementación para pagos con cheque (genera PDF)
+- CheckPaymentProcessor: Implementación para pagos con cheque (PDF en segundo plano)
 """
 
 from abc import ABC, abstractmethod
 from typing import Dict, Any
 from decimal import Decimal
 from django.conf import settings
+from django.db.models import F
 from io import BytesIO
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -55,6 +56,9 @@ class PaymentProcessor(ABC):
         """
         Procesa un pago para una orden específica.
         
+        Fija ``order.status`` pero no guarda la orden: orders.checkout la
+        guarda una sola vez dentro de la transacción de la compra.
+        
         Args:
             user: Usuario que realiza el pago
             order: Orden a pagar
@@ -125,16 +129,22 @@ class CardPaymentProcessor(PaymentProcessor):
             )
         
         try:
-            # Descontar del balance del usuario
+            # Descontar del balance del usuario solo si aún alcanza (sin carreras entre pagos)
+            charged = user._meta.model.objects.filter(pk=user.pk, balance__gte=amount).update(
+                balance=F('balance') - amount
+            )
+            if not charged:
+                return PaymentResult(
+                    success=False,
+                    message="Saldo insuficiente para completar el pago"
+                )
             user.balance -= amount
-            user.save()
             
             # Generar ID de transacción
             transaction_id = f"CARD-{order.id}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
             
-            # Actualizar estado de la orden
+            # Actualizar estado de la orden (quien llama guarda la orden)
             order.status = 'paid'
-            order.save()
             
             return PaymentResult(
                 success=True,
@@ -331,11 +341,14 @@ class CheckPaymentProcessor(PaymentProcessor):
     
     def process_payment(self, user, order, amount: Decimal) -> PaymentResult:
         """
-        Procesa el pago generando un PDF con el cheque.
+        Procesa el pago poniendo en cola el PDF del cheque.
         
-        NO descuenta fondos inmediatamente, pero genera el documento
-        necesario para que el usuario complete el pago.
+        NO descuenta fondos inmediatamente. El documento que el usuario
+        necesita para completar el pago se genera en segundo plano
+        (ver orders.check_jobs), así el checkout no espera a ReportLab.
         """
+        from .check_jobs import enqueue_check
+        
         # Validar el pago
         is_valid, error_message = self.validate_payment(user, amount)
         if not is_valid:
@@ -348,18 +361,16 @@ class CheckPaymentProcessor(PaymentProcessor):
             # Generar número de cheque
             check_number = f"CHK-{order.id:06d}-{datetime.now().strftime('%Y%m%d')}"
             
-            # Generar PDF del cheque
-            pdf_data = self._generate_check_pdf(user, order, amount, check_number)
+            # El PDF se genera en segundo plano cuando la compra se confirma
+            enqueue_check(order, amount, check_number)
             
-            # La orden queda en estado "pending" hasta que se valide el cheque
+            # La orden queda en estado "pending" hasta que se valide el cheque (quien llama guarda la orden)
             order.status = 'pending'
-            order.save()
             
             return PaymentResult(
                 success=True,
-                message=f"Cheque generado exitosamente. Número de cheque: {check_number}. Por favor, descargue e imprima el cheque.",
-                transaction_id=check_number,
-                pdf_data=pdf_data
+                message=f"Orden registrada. Número de cheque: {check_number}. Su cheque se está generando; podrá descargarlo en unos segundos.",
+                transaction_id=check_number
             )
             
         except Exception as e:
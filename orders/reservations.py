@@ -0,0 +1,79 @@
+"""
+Apartado temporal de stock entre el checkout y el pago.
+
+Al confirmar la dirección en ``checkout_view`` se apartan las unidades del
+carrito durante ``settings.STOCK_RESERVATION_TIMEOUT`` segundos. Mientras el
+apartado esté vigente esas unidades no se le venden a otro carrito:
+
+    disponible = stock - unidades apartadas vigentes de otros carritos
+
+La suma sale del índice (product, expires_at, quantity) de
+``StockReservation``, sin recorrer carritos. Al pagar, ``orders.checkout``
+descuenta el stock y borra el apartado en la misma transacción. Los
+apartados vencidos ya no cuentan; ``release_expired`` (o el comando
+``release_reservations``) los borra en bloque.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import StockReservation
+
+
+def held_by_others(product_ids, cart=None, now=None):
+    """{product_id: unidades apartadas vigentes} sin contar los apartados de ``cart``"""
+    reservations = StockReservation.objects.filter(product_id__in=product_ids, expires_at__gt=now or timezone.now())
+    if cart is not None:
+        reservations = reservations.exclude(cart=cart)
+    return dict(
+        reservations.order_by().values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total')
+    )
+
+
+def available_stock(products, cart=None):
+    """{product_id: unidades que ``cart`` todavía puede comprar} de ``products``"""
+    held = held_by_others([product.pk for product in products], cart)
+    return {product.pk: max(product.stock - held.get(product.pk, 0), 0) for product in products}
+
+
+def reserve_cart(cart):
+    """
+    Aparta el stock de todos los items de ``cart``, reemplazando su apartado anterior.
+
+    Devuelve ``(expires_at, short)``: ``short`` son los items para los que no
+    alcanza el stock disponible; en ese caso no se aparta nada.
+    """
+    now = timezone.now()
+    release_expired(now)
+    with transaction.atomic():
+        # Bloquea los productos: apartar y pagar el mismo producto no se cruzan
+        cart_items = list(cart.items.select_related('product').select_for_update())
+        held = held_by_others([item.product_id for item in cart_items], cart, now)
+        cart.reservations.all().delete()
+        short = [item for item in cart_items if item.product.stock - held.get(item.product_id, 0) < item.quantity]
+        if short:
+            return None, short
+
+        expires_at = now + timedelta(seconds=settings.STOCK_RESERVATION_TIMEOUT)
+        StockReservation.objects.bulk_create([
+            StockReservation(cart=cart, product_id=item.product_id, quantity=item.quantity, expires_at=expires_at)
+            for item in cart_items
+        ])
+    return expires_at, []
+
+
+def release_cart(cart, product_ids=None):
+    """Libera el apartado de ``cart`` (solo de ``product_ids`` si se indican)"""
+    reservations = cart.reservations.all()
+    if product_ids is not None:
+        reservations = reservations.filter(product_id__in=product_ids)
+    reservations.delete()
+
+
+def release_expired(now=None):
+    """Borra en una sola consulta los apartados vencidos; devuelve cuántos borró"""
+    deleted, _ = StockReservation.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+
+from catalog.models import Product, prices_changed
+from .models import Cart, CartItem
+
+
+def _carts_with(product_ids):
+    return Cart.objects.filter(pk__in=CartItem.objects.filter(product_id__in=product_ids).values('cart_id'))
+
+
+@receiver(prices_changed, sender=Product)
+def reprice_carts(sender, product_ids, **kwargs):
+    """Los carritos con productos que cambiaron de precio recalculan su total"""
+    _carts_with(product_ids).refresh_totals()
+
+
+@receiver(pre_delete, sender=Product)
+def remember_carts(sender, instance, **kwargs):
+    # Los items se borran en cascada; guardamos los carritos para recalcularlos
+    instance._cart_ids = list(CartItem.objects.filter(product=instance).values_list('cart_id', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def refresh_orphaned_carts(sender, instance, **kwargs):
+    cart_ids = getattr(instance, '_cart_ids', [])
+    if cart_ids:
+        Cart.objects.filter(pk__in=cart_ids).refresh_totals()
@@ -1,3 +1,500 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import ShippingAddress, User
+from catalog.models import Category, Collection, Product
+from . import check_jobs, checkout, reservations
+from .guest_cart import GUEST_CART_COOKIE
+from .models import Cart, CartItem, CheckDocument, Order, OrderItem, StockReservation
+from .payment_processors import CheckPaymentProcessor
+
+
+class AdminChangelistTestCase(TestCase):
+    """Pruebas para los listados del admin con totales anotados"""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            email='admin@urbanloom.com',
+            first_name='Admin',
+            last_name='Test',
+            phone_number='+573001234567',
+            password='admin123'
+        )
+        self.client.force_login(self.admin_user)
+        self.collection = Collection.objects.create(name="NEON NIGHTS", season="SS25", description="-")
+        self.category = Category.objects.create(name="Camisetas")
+        self.products = [
+            Product.objects.create(
+                name=f"Producto {index}", price=Decimal('10000.00') * (index + 1),
+                collection=self.collection, category=self.category,
+            )
+            for index in range(3)
+        ]
+        self.count = 0
+
+    def add_customers(self, amount):
+        """Crea clientes con carrito y orden de dos líneas cada uno"""
+        for _ in range(amount):
+            self.count += 1
+            user = User.objects.create_user(
+                email=f'cliente{self.count}@test.com', first_name='Cliente', last_name='Test',
+                phone_number='+573001234567', password='cliente123'
+            )
+            cart = Cart.objects.create(user=user)
+            order = Order.objects.create(user=user, total_amount=Decimal('50000.00'))
+            for quantity, product in enumerate(self.products[:2], start=1):
+                CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+                OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+
+    def changelist_queries(self, name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f'admin:{name}_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_use_fixed_number_of_queries(self):
+        """Test 1: Los listados del admin no hacen consultas por fila"""
+        names = [
+            'orders_cart', 'orders_cartitem', 'orders_order', 'orders_orderitem', 'orders_stockreservation', 'orders_checkdocument',
+            'catalog_product', 'catalog_collection', 'catalog_category',
+        ]
+        self.add_customers(2)
+        few = {name: self.changelist_queries(name) for name in names}
+        self.add_customers(8)
+        many = {name: self.changelist_queries(name) for name in names}
+        self.assertEqual(few, many)
+
+    def test_cart_totals_are_stored_and_sortable(self):
+        """Test 2: El listado muestra los totales guardados del carrito y se puede ordenar por ellos"""
+        self.add_customers(1)
+        cart = Cart.objects.get()
+        CartItem.objects.filter(cart=cart, product=self.products[1]).update(quantity=3)
+        empty = Cart.objects.create(user=User.objects.create_user(
+            email='vacio@test.com', first_name='Vacio', last_name='Test',
+            phone_number='+573001234567', password='vacio123'
+        ))
+
+        Cart.objects.refresh_totals()
+
+        response = self.client.get(reverse('admin:orders_cart_changelist'), {'o': '-2'})
+
+        carts = list(response.context['cl'].result_list)
+        self.assertEqual([row.pk for row in carts], [cart.pk, empty.pk])
+        self.assertEqual(carts[0].total_items, 4)
+        self.assertEqual(carts[0].total_price, Decimal('70000.00'))
+        self.assertEqual(carts[1].total_price, 0)
+
+
+class CheckoutTestCase(TestCase):
+    """Pruebas para el checkout atómico de payment_view"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='cliente@test.com', first_name='Cliente', last_name='Test',
+            phone_number='+573001234567', password='cliente123'
+        )
+        self.user.balance = Decimal('1000000.00')
+        self.user.save()
+        self.address = ShippingAddress.objects.create(
+            user=self.user, street='Calle 10 # 43-12', city='Medellín',
+            state_or_province='Antioquia', postal_code='050021'
+        )
+        self.cart = Cart.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        session = self.client.session
+        session['selected_shipping_address'] = self.address.id
+        session.save()
+        self.url = reverse('orders:payment')
+        self.card = {
+            'payment_method': 'card', 'card_number': '4111 1111 1111 1111',
+            'card_name': 'Cliente Test', 'expiry_date': '12/30', 'cvv': '123',
+        }
+
+    def fill_cart(self, amount, stock=10, quantity=2):
+        products = [
+            Product.objects.create(name=f"Producto {self.cart.items.count() + index}", price=Decimal('10000.00'), stock=stock)
+            for index in range(amount)
+        ]
+        CartItem.objects.bulk_create([CartItem(cart=self.cart, product=product, quantity=quantity) for product in products])
+        return products
+
+    def pay(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, self.card)
+        return response, len(queries)
+
+    def test_checkout_uses_fixed_number_of_queries(self):
+        """Test 3: El checkout hace las mismas consultas con 2 o con 8 productos"""
+        products = self.fill_cart(2)
+        response, few = self.pay()
+        order = Order.objects.get()
+        self.assertRedirects(response, reverse('orders:order_confirmation', args=[order.id]))
+        self.assertEqual((order.status, order.total_amount), ('paid', Decimal('40000.00')))
+        self.assertTrue(order.transaction_id.startswith('CARD-'))
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual([product.stock for product in Product.objects.filter(pk__in=[p.pk for p in products])], [8, 8])
+        self.assertFalse(self.cart.items.exists())
+        self.assertEqual(Cart.objects.get().total_items, 0)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.balance, Decimal('960000.00'))
+
+        self.fill_cart(8)
+        session = self.client.session
+        session['selected_shipping_address'] = self.address.id
+        session.save()
+        response, many = self.pay()
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(few, many)
+
+    def test_failed_checkout_writes_nothing(self):
+        """Test 4: Sin stock o sin saldo no queda orden, ni descuento de stock, ni carrito vacío"""
+        short, enough = self.fill_cart(1, stock=1) + self.fill_cart(1)
+        response, _ = self.pay()
+        self.assertRedirects(response, reverse('orders:cart'), fetch_redirect_response=False)
+
+        self.user.balance = Decimal('100.00')
+        self.user.save()
+        Product.objects.filter(pk=short.pk).update(stock=5)
+        response, _ = self.pay()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Saldo insuficiente')
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(sorted(Product.objects.values_list('stock', flat=True)), [5, 10])
+        self.assertEqual(self.cart.items.count(), 2)
+
+    def test_conditional_stock_update_prevents_oversell(self):
+        """Test 5: Si otro comprador se lleva las unidades, la compra se revierte completa"""
+        first, second = self.fill_cart(2, stock=3)
+        real_decrement = checkout.decrement_stock
+
+        def concurrent_buyer(items, held):
+            # Otra compra descuenta stock entre la verificación y el UPDATE
+            Product.objects.filter(pk=second.pk).update(stock=1)
+            return real_decrement(items, held)
+
+        with patch.object(checkout, 'decrement_stock', side_effect=concurrent_buyer):
+            with self.assertRaisesMessage(checkout.InsufficientStock, second.name):
+                checkout.place_order(self.user, self.cart, self.address, 'card')
+
+        self.assertFalse(Order.objects.exists())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.stock, second.stock), (3, 3))
+
+    def test_checkout_republishes_static_product_pages(self):
+        """Test 15: Pagar una orden vuelve a publicar la página estática con el stock descontado"""
+        product, = self.fill_cart(1, stock=5)
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        page = Path(root, 'es', 'catalog', 'products', str(product.id), 'index.html')
+        call_command('publish_static', output=root, stdout=StringIO())
+        self.assertIn('¡Solo quedan 5 unidades!', page.read_text())
+
+        with override_settings(CATALOG_STATIC_ROOT=root):
+            with self.captureOnCommitCallbacks(execute=True):
+                response, _ = self.pay()
+
+        self.assertRedirects(response, reverse('orders:order_confirmation', args=[Order.objects.get().id]))
+        self.assertIn('¡Solo quedan 3 unidades!', page.read_text())
+
+
+class StockReservationTestCase(TestCase):
+    """Pruebas para el apartado de stock entre checkout y pago"""
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Chaqueta", price=Decimal('5000.00'), stock=3)
+        self.buyer, self.cart, self.address = self.shopper('comprador@test.com', quantity=2)
+        self.other, self.other_cart, self.other_address = self.shopper('otro@test.com', quantity=2)
+
+    def shopper(self, email, quantity):
+        user = User.objects.create_user(
+            email=email, first_name='Cliente', last_name='Test',
+            phone_number='+573001234567', password='cliente123'
+        )
+        address = ShippingAddress.objects.create(
+            user=user, street='Calle 10 # 43-12', city='Medellín',
+            state_or_province='Antioquia', postal_code='050021'
+        )
+        user.refresh_from_db()
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=self.product, quantity=quantity)
+        return user, cart, address
+
+    def checkout(self, user, address):
+        self.client.force_login(user)
+        return self.client.post(reverse('orders:checkout'), {'shipping_address': address.id})
+
+    def test_checkout_holds_stock_for_other_shoppers(self):
+        """Test 6: El checkout aparta unidades que otro carrito ya no puede apartar ni agregar"""
+        response = self.checkout(self.buyer, self.address)
+        self.assertRedirects(response, reverse('orders:payment'), fetch_redirect_response=False)
+        reservation = StockReservation.objects.get()
+        self.assertEqual((reservation.cart, reservation.quantity), (self.cart, 2))
+        self.assertEqual(reservations.available_stock([self.product], self.other_cart), {self.product.pk: 1})
+        self.assertEqual(reservations.available_stock([self.product], self.cart), {self.product.pk: 3})
+
+        response = self.checkout(self.other, self.other_address)
+        self.assertRedirects(response, reverse('orders:cart'), fetch_redirect_response=False)
+        self.assertFalse(self.other_cart.reservations.exists())
+
+        self.other_cart.items.all().delete()
+        self.client.post(reverse('orders:add_to_cart', args=[self.product.id]), {'quantity': 5})
+        self.assertEqual(self.other_cart.items.get().quantity, 1)
+        CartItem.objects.filter(cart=self.other_cart).update(quantity=2)
+
+        with self.assertRaises(checkout.InsufficientStock):
+            checkout.place_order(self.other, self.other_cart, self.other_address, 'card')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+
+    def test_payment_converts_hold(self):
+        """Test 7: Al pagar se descuenta el stock y el apartado desaparece en la misma transacción"""
+        self.checkout(self.buyer, self.address)
+        response = self.client.get(reverse('orders:payment'))
+        self.assertEqual(response.context['reservation_expires_at'], StockReservation.objects.get().expires_at)
+
+        order, result = checkout.place_order(self.buyer, self.cart, self.address, 'card')
+
+        self.assertTrue(result.success)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(reservations.available_stock([self.product], self.other_cart), {self.product.pk: 1})
+
+    def test_expired_holds_are_ignored_and_swept(self):
+        """Test 8: Los apartados vencidos no cuentan y se borran en bloque"""
+        self.checkout(self.buyer, self.address)
+        third = Product.objects.create(name="Gorra", price=Decimal('20000.00'), stock=5)
+        CartItem.objects.create(cart=self.other_cart, product=third, quantity=1)
+        self.checkout(self.other, self.other_address)
+        self.assertFalse(self.other_cart.reservations.exists())
+
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(reservations.available_stock([self.product], self.other_cart), {self.product.pk: 3})
+
+        self.checkout(self.other, self.other_address)
+        self.assertEqual(StockReservation.objects.filter(cart=self.other_cart).count(), 2)
+        self.assertFalse(self.cart.reservations.exists())
+
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        with self.assertNumQueries(1):
+            self.assertEqual(reservations.release_expired(), 2)
+        out = StringIO()
+        call_command('release_reservations', stdout=out)
+        self.assertIn('Released 0 expired reservations', out.getvalue())
+
+
+class CartTotalsTestCase(TestCase):
+    """Pruebas para los totales guardados del carrito y cart_count"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='cliente@test.com', first_name='Cliente', last_name='Test',
+            phone_number='+573001234567', password='cliente123'
+        )
+        self.client.force_login(self.user)
+        self.shirt = Product.objects.create(name="Camiseta", price=Decimal('30000.00'), stock=10)
+        self.cap = Product.objects.create(name="Gorra", price=Decimal('15000.00'), stock=10)
+
+    def totals(self):
+        cart = Cart.objects.get(user=self.user)
+        return cart.total_items, cart.total_price
+
+    def test_cart_views_keep_totals(self):
+        """Test 9: Agregar, actualizar y quitar items mantiene los totales y cart_count los lee de una vez"""
+        self.client.post(reverse('orders:add_to_cart', args=[self.shirt.id]), {'quantity': 2})
+        self.client.post(reverse('orders:add_to_cart', args=[self.cap.id]), {'quantity': 1})
+        self.assertEqual(self.totals(), (3, Decimal('75000.00')))
+
+        cap_item = CartItem.objects.get(product=self.cap)
+        self.client.post(reverse('orders:update_cart_item', args=[cap_item.id]), {'quantity': 4})
+        self.assertEqual(self.totals(), (6, Decimal('120000.00')))
+        shirt_item = CartItem.objects.get(product=self.shirt)
+        self.client.post(reverse('orders:remove_from_cart', args=[shirt_item.id]))
+        self.assertEqual(self.totals(), (4, Decimal('60000.00')))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('orders:cart_count'))
+        self.assertEqual(response.json(), {'count': 4})
+        self.assertEqual([query['sql'] for query in queries if 'orders_' in query['sql']], [queries[-1]['sql']])
+        self.assertNotIn('orders_cartitem', queries[-1]['sql'])
+        self.assertIn('private', response['Cache-Control'])
+
+        response = self.client.get(reverse('orders:cart_count'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_price_changes_reprice_carts(self):
+        """Test 10: Cambiar precios o borrar productos recalcula los carritos que los contienen"""
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.shirt, quantity=2)
+        CartItem.objects.create(cart=cart, product=self.cap, quantity=1)
+        cart.refresh_totals()
+        self.assertEqual((cart.total_items, cart.total_price), (3, Decimal('75000.00')))
+
+        self.shirt.price = Decimal('25000.00')
+        self.shirt.save()
+        self.assertEqual(self.totals(), (3, Decimal('65000.00')))
+
+        Product.objects.filter(pk=self.cap.pk).adjust(price_percent=Decimal('100'))
+        self.assertEqual(self.totals(), (3, Decimal('80000.00')))
+
+        self.shirt.price = Decimal('10000.00')
+        Product.objects.bulk_update([self.shirt], ['price'])
+        self.assertEqual(self.totals(), (3, Decimal('50000.00')))
+
+        self.cap.delete()
+        self.assertEqual(self.totals(), (2, Decimal('20000.00')))
+
+
+class GuestCartTestCase(TestCase):
+    """Pruebas para el carrito de visitantes en cookie firmada y su unión al iniciar sesión"""
+
+    def setUp(self):
+        self.shirt = Product.objects.create(name="Camiseta", price=Decimal('30000.00'), stock=5)
+        self.cap = Product.objects.create(name="Gorra", price=Decimal('15000.00'), stock=10)
+        self.user = User.objects.create_user(
+            email='cliente@test.com', first_name='Cliente', last_name='Test',
+            phone_number='+573001234567', password='cliente123'
+        )
+
+    def test_guest_cart_lives_in_cookie(self):
+        """Test 11: El visitante agrega, cambia y quita productos sin escribir en la base de datos"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('orders:add_to_cart', args=[self.shirt.id]), {'quantity': 2})
+            self.client.post(reverse('orders:add_to_cart', args=[self.cap.id]), {'quantity': 1})
+            self.client.post(reverse('orders:update_cart_item', args=[self.cap.id]), {'quantity': 3})
+            self.client.post(reverse('orders:add_to_cart', args=[self.shirt.id]), {'quantity': 9})
+        self.assertFalse([query for query in queries if not query['sql'].startswith('SELECT')])
+        self.assertFalse(Cart.objects.exists())
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+
+        response = self.client.get(reverse('orders:cart'))
+        self.assertEqual((response.context['total_items'], response.context['total_price']), (8, Decimal('195000.00')))
+        self.assertEqual(self.client.get(reverse('orders:cart_count')).json(), {'count': 8})
+
+        self.client.post(reverse('orders:remove_from_cart', args=[self.shirt.id]))
+        self.assertEqual(self.client.get(reverse('orders:cart_count')).json(), {'count': 3})
+
+        # Una cookie alterada se ignora
+        self.client.cookies[GUEST_CART_COOKIE] = self.client.cookies[GUEST_CART_COOKIE].value.replace(':3', ':30')
+        self.assertEqual(self.client.get(reverse('orders:cart_count')).json(), {'count': 0})
+
+    def test_login_merges_guest_cart_in_one_upsert(self):
+        """Test 12: Al iniciar sesión el carrito del visitante se suma al guardado con un solo upsert"""
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.shirt, quantity=2)
+        hidden = Product.objects.create(name="Retirado", price=Decimal('1000.00'), stock=5, is_active=False)
+        self.client.post(reverse('orders:add_to_cart', args=[self.shirt.id]), {'quantity': 4})
+        self.client.post(reverse('orders:add_to_cart', args=[self.cap.id]), {'quantity': 2})
+        self.assertEqual(CartItem.objects.count(), 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('login'), {'username': 'cliente@test.com', 'password': 'cliente123'})
+        self.assertRedirects(response, reverse('profile'), fetch_redirect_response=False)
+        writes = [query['sql'] for query in queries if query['sql'].startswith('INSERT INTO "orders_cartitem"')]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('ON CONFLICT', writes[0])
+
+        self.assertEqual(dict(cart.items.values_list('product__name', 'quantity')), {'Camiseta': 5, 'Gorra': 2})
+        self.assertFalse(cart.items.filter(product=hidden).exists())
+        cart.refresh_from_db()
+        self.assertEqual((cart.total_items, cart.total_price), (7, Decimal('180000.00')))
+        self.assertEqual(self.client.cookies[GUEST_CART_COOKIE].value, '')
+
+
+@override_settings(CHECK_PDF_WORKERS=0)
+class CheckJobTestCase(TestCase):
+    """Pruebas para la generación en segundo plano del PDF del cheque"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='cliente@test.com', first_name='Cliente', last_name='Test',
+            phone_number='+573001234567', password='cliente123'
+        )
+        self.address = ShippingAddress.objects.create(
+            user=self.user, street='Calle 10 # 43-12', city='Medellín',
+            state_or_province='Antioquia', postal_code='050021'
+        )
+        cart = Cart.objects.create(user=self.user)
+        product = Product.objects.create(name="Chaqueta", price=Decimal('150000.00'), stock=5)
+        CartItem.objects.create(cart=cart, product=product, quantity=1)
+        self.client.force_login(self.user)
+        session = self.client.session
+        session['selected_shipping_address'] = self.address.id
+        session.save()
+
+    def test_checkout_queues_check_and_serves_it_when_ready(self):
+        """Test 13: Pagar con cheque no genera el PDF en la petición; el estado y la descarga lo sirven al terminar"""
+        with patch.object(CheckPaymentProcessor, '_generate_check_pdf', wraps=CheckPaymentProcessor()._generate_check_pdf) as render:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = self.client.post(reverse('orders:payment'), {'payment_method': 'check'})
+            order = Order.objects.get()
+            self.assertRedirects(response, reverse('orders:order_confirmation', args=[order.id]), fetch_redirect_response=False)
+            self.assertEqual(order.status, 'pending')
+            self.assertFalse(render.called)
+
+            status_url = reverse('orders:check_status', args=[order.id])
+            self.assertEqual(self.client.get(status_url).json(), {'status': 'queued'})
+            response = self.client.get(reverse('orders:download_check_pdf', args=[order.id]))
+            self.assertRedirects(response, reverse('orders:order_confirmation', args=[order.id]), fetch_redirect_response=False)
+            self.assertContains(self.client.get(reverse('orders:order_confirmation', args=[order.id])), status_url)
+
+            for callback in callbacks:
+                callback()
+            self.assertEqual(render.call_count, 1)
+
+        download_url = reverse('orders:download_check_pdf', args=[order.id])
+        self.assertEqual(self.client.get(status_url).json(), {'status': 'done', 'download_url': download_url})
+        response = self.client.get(download_url)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+        self.client.force_login(User.objects.create_user(
+            email='otro@test.com', first_name='Otro', last_name='Test',
+            phone_number='+573001234567', password='otro123'
+        ))
+        self.assertEqual(self.client.get(status_url).status_code, 404)
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+
+    def test_failed_and_lost_jobs_are_retried(self):
+        """Test 14: Un trabajo se toma una sola vez; los fallidos y los perdidos se reintentan con el comando"""
+        order = Order.objects.create(user=self.user, total_amount=Decimal('150000.00'), payment_method='check')
+        failed = CheckDocument.objects.create(order=order, amount=order.total_amount, check_number='CHK-1')
+        with patch.object(CheckPaymentProcessor, '_generate_check_pdf', side_effect=RuntimeError('sin fuente')):
+            self.assertTrue(check_jobs.run_job(failed.pk))
+        self.assertFalse(check_jobs.run_job(failed.pk))
+        failed.refresh_from_db()
+        self.assertEqual((failed.status, failed.error, failed.attempts), ('failed', 'sin fuente', 1))
+
+        lost_order = Order.objects.create(user=self.user, total_amount=Decimal('1000.00'), payment_method='check')
+        lost = CheckDocument.objects.create(
+            order=lost_order, amount=lost_order.total_amount, check_number='CHK-2',
+            status=CheckDocument.RUNNING, started_at=timezone.now() - timedelta(hours=1),
+        )
+
+        out = StringIO()
+        call_command('run_check_jobs', stdout=out)
+        self.assertIn('Rendered 1 check PDFs', out.getvalue())
+        call_command('run_check_jobs', retry_failed=True, stdout=out)
+        self.assertIn('Rendered 1 check PDFs', out.getvalue())
+
+        self.assertEqual(
+            sorted(CheckDocument.objects.values_list('check_number', 'status', 'attempts')),
+            [('CHK-1', 'done', 2), ('CHK-2', 'done', 1)],
+        )
+        self.assertEqual(lost.pk, CheckDocument.objects.get(check_number='CHK-2').pk)
@@ -1,18 +1,35 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from django.views.decorators.http import require_POST
-from .models import Cart, CartItem, Order, OrderItem
+from django.utils import timezone
+from .checkout import CheckoutError, PaymentFailed, place_order
+from .models import Cart, CartItem, CheckDocument, Order, OrderItem
+from .guest_cart import MAX_GUEST_ITEMS, guest_cart_items, read_guest_cart, write_guest_cart
+from .reservations import available_stock, release_cart, reserve_cart
 from catalog.models import Product
 
 # Create your views here.
 
-@login_required
 def cart_view(request):
     """Vista para mostrar el carrito de compras"""
+    if not request.user.is_authenticated:
+        # Carrito de visitante: se lee de la cookie firmada (ver orders.guest_cart)
+        cart_items = guest_cart_items(read_guest_cart(request))
+        context = {
+            'cart': None,
+            'cart_items': cart_items,
+            'total_items': sum(item.quantity for item in cart_items),
+            'total_price': sum(item.get_total() for item in cart_items),
+        }
+        return render(request, 'orders/cart.html', context)
+
     cart, created = Cart.objects.get_or_create(user=request.user)
-    cart_items = cart.items.all()
+    cart_items = cart.items.select_related('product')
     
     context = {
         'cart': cart,
@@ -24,7 +41,21 @@ def cart_view(request):
     return render(request, 'orders/cart.html', context)
 
 
-@login_required
+def _added_quantity(request, product, current, quantity, stock):
+    """Cantidad de ``product`` en el carrito tras agregar ``quantity``, avisando si se limita al stock"""
+    if current + quantity <= stock:
+        messages.success(request, f"Se agregaron {quantity} unidades de {product.name} al carrito.")
+        return current + quantity
+    if not current:
+        messages.warning(request, f"Solo hay {stock} unidades disponibles de {product.name}.")
+        return stock
+    if stock > current:
+        messages.warning(request, f"Solo se pudieron agregar {stock - current} unidades de {product.name}. Stock máximo alcanzado.")
+        return stock
+    messages.warning(request, f"Ya tienes el stock completo de {product.name} en tu carrito.")
+    return current
+
+
 @require_POST
 def add_to_cart(request, product_id):
     """Vista para agregar productos al carrito"""
@@ -38,92 +69,131 @@ def add_to_cart(request, product_id):
     except (ValueError, TypeError):
         quantity = 1
     
-    if product.stock <= 0:
-        messages.error(request, f"El producto {product.name} está agotado.")
-        return redirect(request.META.get('HTTP_REFERER', '/'))
-    
-    cart, created = Cart.objects.get_or_create(user=request.user)
-    cart_item, created = CartItem.objects.get_or_create(
-        cart=cart, 
-        product=product,
-        defaults={'quantity': quantity}
-    )
-    
-    if not created:
-        # Verificar que no exceda el stock disponible
-        new_quantity = cart_item.quantity + quantity
-        if new_quantity <= product.stock:
-            cart_item.quantity = new_quantity
-            cart_item.save()
-            messages.success(request, f"Se agregaron {quantity} unidades de {product.name} al carrito.")
-        else:
-            available = product.stock - cart_item.quantity
-            if available > 0:
-                cart_item.quantity = product.stock
-                cart_item.save()
-                messages.warning(request, f"Solo se pudieron agregar {available} unidades de {product.name}. Stock máximo alcanzado.")
-            else:
-                messages.warning(request, f"Ya tienes el stock completo de {product.name} en tu carrito.")
-    else:
-        # Verificar que la cantidad inicial no exceda el stock
-        if quantity > product.stock:
-            cart_item.quantity = product.stock
-            cart_item.save()
-            messages.warning(request, f"Solo hay {product.stock} unidades disponibles de {product.name}.")
+    if not request.user.is_authenticated:
+        # Visitante: solo se reescribe la cookie, sin tocar la base de datos
+        items = read_guest_cart(request)
+        stock = available_stock([product])[product.pk]
+        if stock <= 0:
+            messages.error(request, f"El producto {product.name} está agotado.")
+        elif product.pk not in items and len(items) >= MAX_GUEST_ITEMS:
+            messages.warning(request, "Tu carrito está lleno. Inicia sesión para agregar más productos.")
         else:
-            messages.success(request, f"Se agregaron {quantity} unidades de {product.name} al carrito.")
+            items[product.pk] = _added_quantity(request, product, items.get(product.pk, 0), quantity, stock)
+        response = redirect(request.META.get('HTTP_REFERER', '/'))
+        write_guest_cart(response, items)
+        return response
+    
+    with transaction.atomic():
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        # Las unidades apartadas por otros carritos en checkout no están a la venta
+        stock = available_stock([product], cart)[product.pk]
+        
+        if stock <= 0:
+            messages.error(request, f"El producto {product.name} está agotado.")
+            return redirect(request.META.get('HTTP_REFERER', '/'))
+        
+        current = CartItem.objects.filter(cart=cart, product=product).values_list('quantity', flat=True).first() or 0
+        new_quantity = _added_quantity(request, product, current, quantity, stock)
+        if new_quantity != current:
+            CartItem.objects.update_or_create(cart=cart, product=product, defaults={'quantity': new_quantity})
+            # Totales guardados del carrito, en la misma transacción que el item
+            Cart.objects.filter(pk=cart.pk).refresh_totals()
     
     return redirect(request.META.get('HTTP_REFERER', '/'))
 
 
-@login_required
+def _guest_update(request, product_id, new_quantity):
+    """Cambia la cantidad de un producto del carrito de visitante (0 lo quita)"""
+    items = read_guest_cart(request)
+    product = Product.objects.filter(pk=product_id).first() if product_id in items else None
+    if product is not None:
+        if new_quantity <= 0:
+            del items[product_id]
+            messages.success(request, f"Se eliminó {product.name} del carrito.")
+        else:
+            stock = available_stock([product])[product.pk]
+            if new_quantity > stock:
+                messages.warning(request, f"Solo hay {stock} unidades disponibles de {product.name}.")
+                new_quantity = stock
+            items[product_id] = new_quantity
+            messages.success(request, f"Cantidad actualizada para {product.name}.")
+    response = redirect('orders:cart')
+    write_guest_cart(response, items)
+    return response
+
+
 @require_POST
 def update_cart_item(request, item_id):
-    """Vista para actualizar la cantidad de un item del carrito"""
-    cart_item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
-    
+    """
+    Vista para actualizar la cantidad de un item del carrito.
+    Para visitantes ``item_id`` es el id del producto (ver orders.guest_cart).
+    """
     try:
         new_quantity = int(request.POST.get('quantity', 1))
-        
-        if new_quantity <= 0:
-            return remove_from_cart(request, item_id)
-        
-        if new_quantity > cart_item.product.stock:
-            messages.warning(request, f"Solo hay {cart_item.product.stock} unidades disponibles de {cart_item.product.name}.")
-            new_quantity = cart_item.product.stock
+    except ValueError:
+        messages.error(request, "Cantidad inválida.")
+        return redirect('orders:cart')
+    
+    if not request.user.is_authenticated:
+        return _guest_update(request, item_id, new_quantity)
+    
+    if new_quantity <= 0:
+        return remove_from_cart(request, item_id)
+    
+    with transaction.atomic():
+        cart_item = get_object_or_404(CartItem.objects.select_related('product', 'cart'), id=item_id, cart__user=request.user)
+        stock = available_stock([cart_item.product], cart_item.cart)[cart_item.product_id]
+        if new_quantity > stock:
+            messages.warning(request, f"Solo hay {stock} unidades disponibles de {cart_item.product.name}.")
+            new_quantity = stock
         
         cart_item.quantity = new_quantity
         cart_item.save()
-        messages.success(request, f"Cantidad actualizada para {cart_item.product.name}.")
-        
-    except ValueError:
-        messages.error(request, "Cantidad inválida.")
+        # El apartado ya no corresponde al carrito; se vuelve a apartar en el checkout
+        release_cart(cart_item.cart, [cart_item.product_id])
+        Cart.objects.filter(pk=cart_item.cart_id).refresh_totals()
+    messages.success(request, f"Cantidad actualizada para {cart_item.product.name}.")
     
     return redirect('orders:cart')
 
 
-@login_required
 @require_POST
 def remove_from_cart(request, item_id):
-    """Vista para remover un item del carrito"""
-    cart_item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
-    product_name = cart_item.product.name
-    cart_item.delete()
+    """
+    Vista para remover un item del carrito.
+    Para visitantes ``item_id`` es el id del producto (ver orders.guest_cart).
+    """
+    if not request.user.is_authenticated:
+        return _guest_update(request, item_id, 0)
+    
+    with transaction.atomic():
+        cart_item = get_object_or_404(CartItem.objects.select_related('product', 'cart'), id=item_id, cart__user=request.user)
+        product_name = cart_item.product.name
+        cart_item.delete()
+        release_cart(cart_item.cart, [cart_item.product_id])
+        Cart.objects.filter(pk=cart_item.cart_id).refresh_totals()
     messages.success(request, f"Se eliminó {product_name} del carrito.")
     
     return redirect('orders:cart')
 
 
-@login_required
 def cart_count(request):
     """Vista AJAX para obtener el conteo de items del carrito"""
-    try:
-        cart = Cart.objects.get(user=request.user)
-        count = cart.get_total_items()
-    except Cart.DoesNotExist:
-        count = 0
-    
-    return JsonResponse({'count': count})
+    if request.user.is_authenticated:
+        # Una sola lectura por el índice único de user; el total ya está guardado
+        count = Cart.objects.filter(user=request.user).values_list('total_items', flat=True).first() or 0
+        owner = request.user.pk
+    else:
+        count = sum(read_guest_cart(request).values())
+        owner = 'guest'
+    
+    # El navegador guarda la respuesta de cada usuario y la revalida con el ETag
+    etag = f'"{owner}-{count}"'
+    response = get_conditional_response(request, etag=etag) or JsonResponse({'count': count})
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
 
 
 @login_required
@@ -147,11 +217,18 @@ def checkout_view(request):
         if not shipping_address_id:
             messages.error(request, "Debe seleccionar una dirección de envío.")
         else:
+            # Apartar el stock del carrito mientras el usuario paga
+            expires_at, short = reserve_cart(cart)
+            if short:
+                for cart_item in short:
+                    messages.error(request, f"Stock insuficiente para {cart_item.product.name}")
+                return redirect('orders:cart')
+
             # Guardar la dirección seleccionada en la sesión
             request.session['selected_shipping_address'] = shipping_address_id
             return redirect('orders:payment')
     
-    cart_items = cart.items.all()
+    cart_items = cart.items.select_related('product')
     
     context = {
         'cart': cart,
@@ -168,7 +245,6 @@ def checkout_view(request):
 def payment_view(request):
     """Vista para procesar el pago usando Inversión de Dependencias"""
     from .payment_processors import PaymentProcessorFactory
-    from decimal import Decimal
     
     try:
         cart = Cart.objects.get(user=request.user)
@@ -226,7 +302,7 @@ def payment_view(request):
         if errors:
             for error in errors:
                 messages.error(request, error)
-            cart_items = cart.items.all()
+            cart_items = cart.items.select_related('product')
             context = {
                 'cart': cart,
                 'cart_items': cart_items,
@@ -243,93 +319,40 @@ def payment_view(request):
             }
             return render(request, 'orders/payment.html', context)
         
-        # Calcular el total
-        total_amount = Decimal(str(cart.get_total_price()))
-        
-        # Crear la orden (inicialmente en estado pending)
-        order = Order.objects.create(
-            user=request.user,
-            status='pending',
-            shipping_address=shipping_address,
-            payment_method=payment_method,
-            total_amount=total_amount
-        )
-        
-        # Crear los items de la orden y verificar stock
-        for cart_item in cart.items.all():
-            # Verificar stock disponible
-            if cart_item.product.stock < cart_item.quantity:
-                messages.error(request, f"Stock insuficiente para {cart_item.product.name}")
-                order.delete()
-                return redirect('orders:cart')
-            
-            # Crear item de la orden
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
-            )
-        
-        # INVERSIÓN DE DEPENDENCIAS: Usar el factory para obtener el procesador adecuado
+        # Orden, items, stock y pago en una sola transacción (ver orders.checkout)
         try:
-            payment_processor = PaymentProcessorFactory.create(payment_method)
-            
-            # Procesar el pago usando la interfaz abstracta
-            result = payment_processor.process_payment(
-                user=request.user,
-                order=order,
-                amount=total_amount
-            )
-            
-            if result.success:
-                # Guardar el ID de transacción
-                order.transaction_id = result.transaction_id
-                order.save()
-                
-                # Actualizar stock de productos
-                for cart_item in cart.items.all():
-                    cart_item.product.stock -= cart_item.quantity
-                    cart_item.product.save()
-                
-                # Limpiar el carrito
-                cart.items.all().delete()
-                
-                # Limpiar la sesión
-                if 'selected_shipping_address' in request.session:
-                    del request.session['selected_shipping_address']
-                
-                messages.success(request, result.message)
-                
-                # Si hay PDF (cheque), guardarlo en la sesión para descarga
-                if result.pdf_data:
-                    request.session['check_pdf'] = result.pdf_data.hex()
-                    request.session['check_order_id'] = order.id
-                
-                return redirect('orders:order_confirmation', order_id=order.id)
-            else:
-                # El pago falló, eliminar la orden
-                order.delete()
-                messages.error(request, result.message)
-                
-                cart_items = cart.items.all()
-                context = {
-                    'cart': cart,
-                    'cart_items': cart_items,
-                    'shipping_address': shipping_address,
-                    'total_items': cart.get_total_items(),
-                    'total_price': cart.get_total_price(),
-                    'available_methods': available_methods,
-                    'user_balance': request.user.balance,
-                }
-                return render(request, 'orders/payment.html', context)
-                
+            order, result = place_order(request.user, cart, shipping_address, payment_method)
         except ValueError as e:
-            order.delete()
             messages.error(request, str(e))
             return redirect('orders:checkout')
+        except PaymentFailed as e:
+            # El pago falló: la transacción se revirtió y el carrito sigue intacto
+            messages.error(request, str(e))
+            request.user.refresh_from_db(fields=['balance'])
+            cart_items = cart.items.select_related('product')
+            context = {
+                'cart': cart,
+                'cart_items': cart_items,
+                'shipping_address': shipping_address,
+                'total_items': cart.get_total_items(),
+                'total_price': cart.get_total_price(),
+                'available_methods': available_methods,
+                'user_balance': request.user.balance,
+            }
+            return render(request, 'orders/payment.html', context)
+        except CheckoutError as e:
+            messages.error(request, str(e))
+            return redirect('orders:cart')
+
+        # Limpiar la sesión
+        if 'selected_shipping_address' in request.session:
+            del request.session['selected_shipping_address']
+
+        messages.success(request, result.message)
+
+        return redirect('orders:order_confirmation', order_id=order.id)
     
-    cart_items = cart.items.all()
+    cart_items = cart.items.select_related('product')
     
     context = {
         'cart': cart,
@@ -339,6 +362,9 @@ def payment_view(request):
         'total_price': cart.get_total_price(),
         'available_methods': available_methods,
         'user_balance': request.user.balance,
+        'reservation_expires_at': cart.reservations.filter(expires_at__gt=timezone.now()).values_list(
+            'expires_at', flat=True
+        ).first(),
     }
     
     return render(request, 'orders/payment.html', context)
@@ -349,41 +375,51 @@ def order_confirmation_view(request, order_id):
     """Vista para mostrar la confirmación de la orden"""
     order = get_object_or_404(Order, id=order_id, user=request.user)
     
-    # Verificar si hay un PDF de cheque disponible
-    has_check_pdf = (
-        'check_pdf' in request.session and 
-        request.session.get('check_order_id') == order.id
-    )
+    # Cheque generado en segundo plano: la página consulta check_status hasta que esté listo
+    check_document = CheckDocument.objects.filter(order=order).defer('pdf').first()
     
     context = {
         'order': order,
         'order_items': order.items.all(),
         'total_amount': order.calculate_total(),
-        'has_check_pdf': has_check_pdf,
+        'check_document': check_document,
     }
     
     return render(request, 'orders/order_confirmation.html', context)
 
 
+@login_required
+def check_status(request, order_id):
+    """Vista AJAX con el estado del PDF del cheque de una orden"""
+    check_document = get_object_or_404(
+        CheckDocument.objects.only('status', 'order_id'), order_id=order_id, order__user=request.user
+    )
+    data = {'status': check_document.status}
+    if check_document.status == CheckDocument.DONE:
+        data['download_url'] = reverse('orders:download_check_pdf', args=[order_id])
+    response = JsonResponse(data)
+    patch_cache_control(response, private=True, no_store=True)
+    return response
+
+
 @login_required
 def download_check_pdf(request, order_id):
     """Vista para descargar el PDF del cheque"""
     from django.http import HttpResponse
     
-    order = get_object_or_404(Order, id=order_id, user=request.user)
+    check_document = CheckDocument.objects.filter(
+        order_id=order_id, order__user=request.user, status=CheckDocument.DONE
+    ).first()
     
-    # Verificar que el PDF esté disponible en la sesión
-    if 'check_pdf' not in request.session or request.session.get('check_order_id') != order.id:
+    # Verificar que el PDF ya se haya generado
+    if check_document is None:
+        get_object_or_404(Order, id=order_id, user=request.user)
         messages.error(request, "El PDF del cheque no está disponible.")
-        return redirect('orders:order_confirmation', order_id=order.id)
-    
-    # Recuperar el PDF de la sesión
-    pdf_hex = request.session.get('check_pdf')
-    pdf_data = bytes.fromhex(pdf_hex)
+        return redirect('orders:order_confirmation', order_id=order_id)
     
     # Crear la respuesta HTTP con el PDF
-    response = HttpResponse(pdf_data, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="cheque_orden_{order.id}.pdf"'
+    response = HttpResponse(bytes(check_document.pdf), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="cheque_orden_{order_id}.pdf"'
     
     return response
 
@@ -0,0 +1,37 @@
+/**
+ * Check Status - Polls the check PDF job of the order confirmation page
+ * until the file is ready to download (see orders.check_jobs)
+ */
+
+const CHECK_POLL_INTERVAL = 2000;
+const CHECK_POLL_LIMIT = 60;
+
+function showCheckState(container, status) {
+    const state = status === 'done' || status === 'failed' ? status : 'pending';
+    container.querySelectorAll('[data-check-state]').forEach(element => {
+        element.classList.toggle('hidden', element.dataset.checkState !== state);
+    });
+    container.dataset.status = status;
+    return state !== 'pending';
+}
+
+function pollCheckStatus(container, attempt = 0) {
+    if (attempt >= CHECK_POLL_LIMIT) {
+        return;
+    }
+    fetch(container.dataset.statusUrl, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json())
+        .then(data => {
+            if (!showCheckState(container, data.status)) {
+                setTimeout(() => pollCheckStatus(container, attempt + 1), CHECK_POLL_INTERVAL);
+            }
+        })
+        .catch(() => setTimeout(() => pollCheckStatus(container, attempt + 1), CHECK_POLL_INTERVAL));
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('check-document');
+    if (container && !showCheckState(container, container.dataset.status)) {
+        setTimeout(() => pollCheckStatus(container), CHECK_POLL_INTERVAL);
+    }
+});
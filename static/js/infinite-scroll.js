@@ -0,0 +1,86 @@
+/**
+ * Infinite Scroll - Loads the next keyset page of a product grid
+ * when the sentinel element enters the viewport, or when a
+ * "load more" link is clicked, and appends it to the grid
+ */
+
+function loadNextPage(sentinel, observer) {
+    const cursor = sentinel.dataset.nextCursor;
+    if (!cursor || sentinel.dataset.loading === 'true') {
+        return;
+    }
+    sentinel.dataset.loading = 'true';
+
+    const url = new URL(window.location.href);
+    url.searchParams.set('cursor', cursor);
+
+    fetch(url, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json())
+        .then(data => {
+            const grid = document.getElementById(sentinel.dataset.target);
+            grid.insertAdjacentHTML('beforeend', data.html);
+
+            if (data.next_cursor) {
+                sentinel.dataset.nextCursor = data.next_cursor;
+            } else {
+                observer.disconnect();
+                sentinel.remove();
+            }
+        })
+        .catch(error => console.error('Error loading products:', error))
+        .finally(() => {
+            sentinel.dataset.loading = 'false';
+        });
+}
+
+function loadMore(link) {
+    if (link.dataset.loading === 'true') {
+        return;
+    }
+    link.dataset.loading = 'true';
+
+    fetch(link.href, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json())
+        .then(data => {
+            const grid = document.getElementById(link.dataset.loadMore);
+            grid.insertAdjacentHTML('beforeend', data.html);
+
+            if (data.next_cursor) {
+                const url = new URL(link.href);
+                url.searchParams.set('cursor', data.next_cursor);
+                link.href = url;
+            } else {
+                link.remove();
+            }
+        })
+        .catch(error => console.error('Error loading products:', error))
+        .finally(() => {
+            link.dataset.loading = 'false';
+        });
+}
+
+// Initialize on page load
+document.addEventListener('DOMContentLoaded', function() {
+    // Sin JavaScript el enlace sigue llevando a la página siguiente
+    document.querySelectorAll('a[data-load-more]').forEach(function(link) {
+        link.addEventListener('click', function(event) {
+            event.preventDefault();
+            loadMore(link);
+        });
+    });
+
+    const sentinel = document.getElementById('collection-products-sentinel');
+    if (!sentinel || !('IntersectionObserver' in window)) {
+        return;
+    }
+
+    const observer = new IntersectionObserver(function(entries) {
+        entries.forEach(function(entry) {
+            if (entry.isIntersecting) {
+                loadNextPage(sentinel, observer);
+            }
+        });
+    }, { rootMargin: '400px' });
+
+    observer.observe(sentinel);
+});
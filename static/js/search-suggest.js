@@ -0,0 +1,84 @@
+/**
+ * Search Suggest - Typeahead for inputs with data-suggest-url,
+ * answered by the catalog suggestion index
+ */
+
+const SUGGEST_DELAY = 120;
+
+function renderSuggestions(list, suggestions, labels) {
+    list.innerHTML = '';
+    suggestions.forEach(suggestion => {
+        const link = document.createElement('a');
+        link.href = suggestion.url;
+        link.className = 'block px-4 py-2 text-sm text-white hover:bg-white/10';
+        link.textContent = suggestion.name;
+
+        const kind = document.createElement('span');
+        kind.className = 'block text-xs text-gray-400 uppercase';
+        kind.textContent = labels[suggestion.type] || suggestion.type;
+        link.appendChild(kind);
+
+        list.appendChild(link);
+    });
+    list.classList.toggle('hidden', suggestions.length === 0);
+}
+
+function initSuggest(input) {
+    const list = document.createElement('div');
+    list.className = 'hidden absolute z-50 mt-2 w-full bg-gray-900 border border-gray-700 rounded-xl shadow-xl overflow-hidden';
+    list.style.top = '100%';
+    list.style.left = '0';
+    list.setAttribute('role', 'listbox');
+    input.parentElement.appendChild(list);
+    input.setAttribute('autocomplete', 'off');
+
+    const labels = {
+        product: input.dataset.labelProduct,
+        collection: input.dataset.labelCollection,
+        category: input.dataset.labelCategory,
+    };
+    let timer = null;
+    let controller = null;
+
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(() => {
+            const query = input.value.trim();
+            if (!query) {
+                renderSuggestions(list, [], labels);
+                return;
+            }
+            // Solo importa la respuesta de la última tecla
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+
+            const url = new URL(input.dataset.suggestUrl, window.location.origin);
+            url.searchParams.set('q', query);
+            fetch(url, { signal: controller.signal })
+                .then(response => response.json())
+                .then(data => renderSuggestions(list, data.suggestions || [], labels))
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        console.error('Error loading suggestions:', error);
+                    }
+                });
+        }, SUGGEST_DELAY);
+    });
+
+    input.addEventListener('keydown', event => {
+        if (event.key === 'Escape') {
+            renderSuggestions(list, [], labels);
+        }
+    });
+    document.addEventListener('click', event => {
+        if (!input.parentElement.contains(event.target)) {
+            renderSuggestions(list, [], labels);
+        }
+    });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('input[data-suggest-url]').forEach(initSuggest);
+});
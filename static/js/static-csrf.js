@@ -0,0 +1,32 @@
+/**
+ * Static CSRF - Pages published by publish_static carry no CSRF token;
+ * forms take it from the csrftoken cookie when they are submitted
+ */
+
+const csrfCookieUrl = document.currentScript.dataset.csrfUrl;
+
+function getCsrfCookie() {
+    const match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+    return match ? decodeURIComponent(match[1]) : null;
+}
+
+document.addEventListener('submit', event => {
+    const form = event.target;
+    const input = form.querySelector('input[name="csrfmiddlewaretoken"]');
+    if (!input || input.value) {
+        return;
+    }
+    const token = getCsrfCookie();
+    if (token) {
+        input.value = token;
+        return;
+    }
+    // Sin cookie el visitante no ha pasado por Django: se pide una y se reenvía el formulario
+    event.preventDefault();
+    fetch(csrfCookieUrl, { credentials: 'same-origin' }).then(() => {
+        input.value = getCsrfCookie() || '';
+        if (input.value) {
+            form.submit();
+        }
+    });
+});
@@ -1,6 +1,8 @@
 from django.views.generic import TemplateView
 from catalog.models import Collection
+from core.page_cache import anonymous_page_cache
 
+@anonymous_page_cache('catalog')
 class HomeView(TemplateView):
     template_name = 'storefront/home.html'
     